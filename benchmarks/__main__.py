@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+    Run all the benchmarks from the repository root:
+
+        python -m benchmarks [bench_ticker options]
+
+    Options are passed to `bench_ticker`, so `--compare` fails the run on regressions.
+"""
+import sys
+
+from benchmarks import bench_decoder, bench_json, bench_memory, bench_ticker
+
+
+def main(args=None):
+    print("# Ticker receive path\n")
+    status = bench_ticker.main(args)
+
+    print("\n# Decoder against the legacy implementation\n")
+    bench_decoder.main()
+
+    print("\n# Memory of dict and object ticks\n")
+    bench_memory.main()
+
+    print("\n# JSON codecs\n")
+    bench_json.main()
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_decoder.py
+
+    Micro-benchmark of the ticker binary decoder against the previous
+    slice-and-unpack implementation.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_decoder
+"""
+import sys
+import struct
+import random
+import timeit
+from datetime import datetime
+
+from kiteconnect import KiteTicker
+from benchmarks.packets import index_packet, ltp_packet, quote_packet, ticker_frame
+
+
+class LegacyDecoder(KiteTicker):
+    """Decoder which unpacks every field from a sliced copy of the packet."""
+
+    def _parse_binary(self, bin):
+        """Parse binary data to a (list of) ticks structure."""
+        packets = self._split_packets(bin)  # split data to individual ticks packet
+        data = []
+
+        for packet in packets:
+            instrument_token = self._unpack_int(packet, 0, 4)
+            segment = instrument_token & 0xff  # Retrive segment constant from instrument_token
+
+            # Add price divisor based on segment
+            if segment == self.EXCHANGE_MAP["cds"]:
+                divisor = 10000000.0
+            elif segment == self.EXCHANGE_MAP["bcd"]:
+                divisor = 10000.0
+            else:
+                divisor = 100.0
+
+            # All indices are not tradable
+            tradable = False if segment == self.EXCHANGE_MAP["indices"] else True
+
+            # LTP packets
+            if len(packet) == 8:
+                data.append({
+                    "tradable": tradable,
+                    "mode": self.MODE_LTP,
+                    "instrument_token": instrument_token,
+                    "last_price": self._unpack_int(packet, 4, 8) / divisor
+                })
+            # Indices quote and full mode
+            elif len(packet) == 28 or len(packet) == 32:
+                mode = self.MODE_QUOTE if len(packet) == 28 else self.MODE_FULL
+
+                d = {
+                    "tradable": tradable,
+                    "mode": mode,
+                    "instrument_token": instrument_token,
+                    "last_price": self._unpack_int(packet, 4, 8) / divisor,
+                    "ohlc": {
+                        "high": self._unpack_int(packet, 8, 12) / divisor,
+                        "low": self._unpack_int(packet, 12, 16) / divisor,
+                        "open": self._unpack_int(packet, 16, 20) / divisor,
+                        "close": self._unpack_int(packet, 20, 24) / divisor
+                    }
+                }
+
+                # Compute the change price using close price and last price
+                d["change"] = 0
+                if (d["ohlc"]["close"] != 0):
+                    d["change"] = (d["last_price"] - d["ohlc"]["close"]) * 100 / d["ohlc"]["close"]
+
+                # Full mode with timestamp
+                if len(packet) == 32:
+                    try:
+                        timestamp = datetime.fromtimestamp(self._unpack_int(packet, 28, 32))
+                    except Exception:
+                        timestamp = None
+
+                    d["exchange_timestamp"] = timestamp
+
+                data.append(d)
+            # Quote and full mode
+            elif len(packet) == 44 or len(packet) == 184:
+                mode = self.MODE_QUOTE if len(packet) == 44 else self.MODE_FULL
+
+                d = {
+                    "tradable": tradable,
+                    "mode": mode,
+                    "instrument_token": instrument_token,
+                    "last_price": self._unpack_int(packet, 4, 8) / divisor,
+                    "last_traded_quantity": self._unpack_int(packet, 8, 12),
+                    "average_traded_price": self._unpack_int(packet, 12, 16) / divisor,
+                    "volume_traded": self._unpack_int(packet, 16, 20),
+                    "total_buy_quantity": self._unpack_int(packet, 20, 24),
+                    "total_sell_quantity": self._unpack_int(packet, 24, 28),
+                    "ohlc": {
+                        "open": self._unpack_int(packet, 28, 32) / divisor,
+                        "high": self._unpack_int(packet, 32, 36) / divisor,
+                        "low": self._unpack_int(packet, 36, 40) / divisor,
+                        "close": self._unpack_int(packet, 40, 44) / divisor
+                    }
+                }
+
+                # Compute the change price using close price and last price
+                d["change"] = 0
+                if (d["ohlc"]["close"] != 0):
+                    d["change"] = (d["last_price"] - d["ohlc"]["close"]) * 100 / d["ohlc"]["close"]
+
+                # Parse full mode
+                if len(packet) == 184:
+                    try:
+                        last_trade_time = datetime.fromtimestamp(self._unpack_int(packet, 44, 48))
+                    except Exception:
+                        last_trade_time = None
+
+                    try:
+                        timestamp = datetime.fromtimestamp(self._unpack_int(packet, 60, 64))
+                    except Exception:
+                        timestamp = None
+
+                    d["last_trade_time"] = last_trade_time
+                    d["oi"] = self._unpack_int(packet, 48, 52)
+                    d["oi_day_high"] = self._unpack_int(packet, 52, 56)
+                    d["oi_day_low"] = self._unpack_int(packet, 56, 60)
+                    d["exchange_timestamp"] = timestamp
+
+                    # Market depth entries.
+                    depth = {
+                        "buy": [],
+                        "sell": []
+                    }
+
+                    # Compile the market depth lists.
+                    for i, p in enumerate(range(64, len(packet), 12)):
+                        depth["sell" if i >= 5 else "buy"].append({
+                            "quantity": self._unpack_int(packet, p, p + 4),
+                            "price": self._unpack_int(packet, p + 4, p + 8) / divisor,
+                            "orders": self._unpack_int(packet, p + 8, p + 10, byte_format="H")
+                        })
+
+                    d["depth"] = depth
+
+                data.append(d)
+
+        return data
+
+    def _unpack_int(self, bin, start, end, byte_format="I"):
+        """Unpack binary data as unsgined interger."""
+        return struct.unpack(">" + byte_format, bin[start:end])[0]
+
+    def _split_packets(self, bin):
+        """Split the data to individual packets of ticks."""
+        # Ignore heartbeat data.
+        if len(bin) < 2:
+            return []
+
+        number_of_packets = self._unpack_int(bin, 0, 2, byte_format="H")
+        packets = []
+
+        j = 2
+        for i in range(number_of_packets):
+            packet_length = self._unpack_int(bin, j, j + 2, byte_format="H")
+            packets.append(bin[j + 2: j + 2 + packet_length])
+            j = j + 2 + packet_length
+
+        return packets
+
+
+def full_frame(count, seed=1):
+    """Frame of `count` full mode packets with randomised values."""
+    rnd = random.Random(seed)
+    packets = []
+    for i in range(count):
+        price = rnd.randint(10000, 500000)
+        depth = [(rnd.randint(1, 5000), price - rnd.randint(0, 500), rnd.randint(1, 50)) for _ in range(10)]
+        packets.append(quote_packet(
+            (i << 8) | 1, price, (price, price + 100, price - 100, price - 50),
+            volume_traded=rnd.randint(0, 10 ** 7), total_buy_quantity=rnd.randint(0, 10 ** 6),
+            total_sell_quantity=rnd.randint(0, 10 ** 6), last_trade_time=1700000000,
+            oi=rnd.randint(0, 10 ** 6), exchange_timestamp=1700000001, depth=depth))
+    return ticker_frame(packets)
+
+
+def mixed_frame(count, seed=1):
+    """Frame cycling through every packet length."""
+    rnd = random.Random(seed)
+    packets = []
+    for i in range(count):
+        price = rnd.randint(10000, 500000)
+        ohlc = (price, price + 100, price - 100, price - 50)
+        packets.append([
+            ltp_packet((i << 8) | 1, price),
+            index_packet((i << 8) | 9, price, ohlc),
+            index_packet((i << 8) | 9, price, ohlc, exchange_timestamp=1700000001),
+            quote_packet((i << 8) | 3, price, ohlc),
+            quote_packet((i << 8) | 6, price, ohlc, exchange_timestamp=1700000001),
+        ][i % 5])
+    return ticker_frame(packets)
+
+
+def bench(name, decoder, frame, ticks, repeat=5, number=20):
+    best = min(timeit.repeat(lambda: decoder._parse_binary(frame), repeat=repeat, number=number)) / number
+    print("{:<10} {:<8} {:>10.3f} ms/frame {:>12,.0f} ticks/s".format(name, type(decoder).__name__,
+                                                                      best * 1000, ticks / best))
+    return best
+
+
+def main(ticks=3000):
+    current = KiteTicker("api_key", "access_token")
+    legacy = LegacyDecoder("api_key", "access_token")
+
+    for name, frame in [("full", full_frame(ticks)), ("mixed", mixed_frame(ticks))]:
+        # Both decoders must agree before comparing their speed
+        assert current._parse_binary(frame) == legacy._parse_binary(frame)
+
+        old = bench(name, legacy, frame, ticks)
+        new = bench(name, current, frame, ticks)
+        print("{:<10} speedup {:.2f}x".format(name, old / new))
+
+    # Full mode ticks where depth is never read
+    lazy = KiteTicker("api_key", "access_token", lazy_depth=True)
+    frame = full_frame(ticks)
+    best = min(timeit.repeat(lambda: lazy._parse_binary(frame), repeat=5, number=20)) / 20
+    print("{:<10} {:<8} {:>10.3f} ms/frame {:>12,.0f} ticks/s".format("full", "lazy_depth", best * 1000, ticks / best))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
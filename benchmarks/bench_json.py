@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_json.py
+
+    Benchmark of the JSON codecs (`kiteconnect.codec`) decoding API responses
+    and encoding JSON request bodies.
+
+    Responses are large synthetic `orders()`, `quote()` and `positions()`
+    responses, along with the mock responses of the unit tests
+    (tests/mock_responses) in a source checkout which has them. The benchmark
+    runs without them.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_json [scale]
+"""
+import os
+import sys
+import glob
+import json
+import random
+import timeit
+
+from kiteconnect.codec import get_codec
+
+MOCK_RESPONSES = os.path.join(os.path.dirname(__file__), "..", "tests", "mock_responses")
+
+
+def order(rnd, i):
+    price = round(rnd.uniform(10, 5000), 2)
+    return {
+        "placed_by": "AB1234", "order_id": str(220115000000000 + i), "exchange_order_id": str(1100000000000000 + i),
+        "parent_order_id": None, "status": rnd.choice(["COMPLETE", "OPEN", "CANCELLED", "REJECTED"]),
+        "status_message": None, "status_message_raw": None, "order_timestamp": "2022-01-15 10:15:02",
+        "exchange_update_timestamp": "2022-01-15 10:15:02", "exchange_timestamp": "2022-01-15 10:15:02",
+        "variety": "regular", "exchange": "NSE", "tradingsymbol": "SYM{}".format(i % 500),
+        "instrument_token": (i % 500) << 8 | 1, "order_type": "LIMIT", "transaction_type": "BUY", "validity": "DAY",
+        "product": "CNC", "quantity": 10, "disclosed_quantity": 0, "price": price, "trigger_price": 0,
+        "average_price": price, "filled_quantity": 10, "pending_quantity": 0, "cancelled_quantity": 0,
+        "market_protection": 0, "meta": {}, "tag": None, "guid": "01XYZ{}".format(i)
+    }
+
+
+def quote(rnd, i):
+    price = round(rnd.uniform(10, 5000), 2)
+    depth = [{"price": price, "quantity": rnd.randint(1, 1000), "orders": rnd.randint(1, 20)} for _ in range(5)]
+    return {
+        "instrument_token": i << 8 | 1, "timestamp": "2022-01-15 10:15:02", "last_trade_time": "2022-01-15 10:15:01",
+        "last_price": price, "last_quantity": 5, "buy_quantity": 1000, "sell_quantity": 2000, "volume": 100000,
+        "average_price": price, "oi": 0, "oi_day_high": 0, "oi_day_low": 0, "net_change": 0, "lower_circuit_limit": 1,
+        "upper_circuit_limit": 10000, "ohlc": {"open": price, "high": price, "low": price, "close": price},
+        "depth": {"buy": depth, "sell": depth}
+    }
+
+
+def position(rnd, i):
+    price = round(rnd.uniform(10, 5000), 2)
+    fields = ["quantity", "overnight_quantity", "multiplier", "average_price", "close_price", "last_price", "value",
+              "pnl", "m2m", "unrealised", "realised", "buy_quantity", "buy_price", "buy_value", "buy_m2m",
+              "sell_quantity", "sell_price", "sell_value", "sell_m2m", "day_buy_quantity", "day_buy_price",
+              "day_buy_value", "day_sell_quantity", "day_sell_price", "day_sell_value"]
+    p = dict((f, price) for f in fields)
+    p.update({"tradingsymbol": "SYM{}".format(i), "exchange": "NSE", "instrument_token": i << 8 | 1,
+              "product": "MIS"})
+    return p
+
+
+def responses(scale=1):
+    """Name and encoded body of every response to benchmark."""
+    rnd = random.Random(1)
+    bodies = []
+
+    for path in sorted(glob.glob(os.path.join(MOCK_RESPONSES, "*.json"))):
+        with open(path, "rb") as f:
+            bodies.append((os.path.basename(path), f.read()))
+
+    synthetic = [
+        ("orders x{}".format(2000 * scale), [order(rnd, i) for i in range(2000 * scale)]),
+        ("quote x{}".format(500 * scale), dict(("NSE:SYM{}".format(i), quote(rnd, i)) for i in range(500 * scale))),
+        ("positions x{}".format(200 * scale), {"net": [position(rnd, i) for i in range(200 * scale)],
+                                               "day": [position(rnd, i) for i in range(200 * scale)]})
+    ]
+    for name, data in synthetic:
+        bodies.append((name, json.dumps({"status": "success", "data": data}).encode("utf-8")))
+
+    return bodies
+
+
+def codecs():
+    """Codecs which are installed."""
+    installed = []
+    for name in ["json", "orjson", "ujson"]:
+        try:
+            installed.append(get_codec(name))
+        except ImportError:
+            print("{} is not installed, skipping it.".format(name))
+    return installed
+
+
+def best(function, repeat=5):
+    elapsed = timeit.timeit(function, number=1)
+    number = max(1, int(0.05 / max(elapsed, 1e-9)))
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+
+def main(scale=1):
+    installed = codecs()
+    bodies = responses(scale)
+
+    print("{:<28} {:>10} ".format("decode", "KiB") + "".join("{:>16}".format(c.name) for c in installed))
+    for name, body in bodies:
+        times = [best(lambda: codec.decode(body)) for codec in installed]
+        print("{:<28} {:>10.1f} ".format(name, len(body) / 1024.0) + "".join(
+            "{:>9.3f}ms {:>4.1f}x".format(t * 1000, times[0] / t) for t in times))
+
+    # Request body of a basket of orders for `basket_order_margins`
+    basket = [{"exchange": "NSE", "tradingsymbol": "SYM{}".format(i), "transaction_type": "BUY",
+               "variety": "regular", "product": "CNC", "order_type": "LIMIT", "quantity": 10, "price": 100.5}
+              for i in range(50 * scale)]
+
+    times = [best(lambda: codec.encode(basket)) for codec in installed]
+    print("\n{:<28} {:>10} ".format("encode", "") + "".join("{:>16}".format(c.name) for c in installed))
+    print("{:<28} {:>10} ".format("basket x{}".format(len(basket)), "") + "".join(
+        "{:>9.3f}ms {:>4.1f}x".format(t * 1000, times[0] / t) for t in times))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_memory.py
+
+    Memory and allocation benchmark of dict ticks against `Tick` objects
+    for a process which keeps the last full mode tick of every instrument.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_memory [instruments]
+"""
+import gc
+import sys
+import timeit
+import tracemalloc
+
+from kiteconnect import KiteTicker
+from benchmarks.bench_decoder import full_frame
+
+
+def measure(ticker, frame):
+    """Decode `frame` and keep the latest tick per token, returns (bytes, allocated blocks) held."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    latest = {}
+    for tick in ticker._parse_ticks(frame):
+        latest[tick["instrument_token"]] = tick
+
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+    return latest, size, blocks
+
+
+def main(instruments=3000):
+    frame = full_frame(instruments)
+
+    print("{:<8} {:>14} {:>14} {:>16} {:>12}".format("format", "bytes/tick", "blocks/tick", "retained (KiB)",
+                                                     "ms/frame"))
+    for tick_format in [KiteTicker.TICK_FORMAT_DICT, KiteTicker.TICK_FORMAT_OBJECT]:
+        ticker = KiteTicker("api_key", "access_token", tick_format=tick_format)
+        latest, size, blocks = measure(ticker, frame)
+        elapsed = min(timeit.repeat(lambda: ticker._parse_ticks(frame), repeat=5, number=5)) / 5
+
+        print("{:<8} {:>14,.0f} {:>14,.1f} {:>16,.0f} {:>12.3f}".format(
+            tick_format, size / float(len(latest)), blocks / float(len(latest)), size / 1024.0, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_ticker.py
+
+    Benchmark suite of the ticker receive path: packet splitting, decoding of
+    every packet type, text messages and end to end `_on_message` dispatch.
+
+    Every case reports the throughput in ticks (or messages) per second and the
+    number of memory blocks allocated and kept per tick. Results can be saved and
+    compared against a previous run to catch regressions before a release.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_ticker [--packets 500] [--save results.json]
+        python -m benchmarks.bench_ticker --compare results.json [--tolerance 0.1]
+"""
+import gc
+import sys
+import json
+import random
+import timeit
+import argparse
+import tracemalloc
+
+from kiteconnect import KiteTicker
+from benchmarks.packets import index_packet, ltp_packet, quote_packet, ticker_frame
+
+EXCHANGE_TIMESTAMP = 1700000001
+
+
+def packet(kind, index, rnd):
+    """Packet of a kind (ltp, index_quote, index_full, quote or full) for the `index`th instrument."""
+    price = rnd.randint(10000, 500000)
+    ohlc = (price, price + 100, price - 100, price - 50)
+    if kind == "ltp":
+        return ltp_packet((index << 8) | 1, price)
+    elif kind == "index_quote":
+        return index_packet((index << 8) | 9, price, ohlc)
+    elif kind == "index_full":
+        return index_packet((index << 8) | 9, price, ohlc, exchange_timestamp=EXCHANGE_TIMESTAMP)
+    elif kind == "quote":
+        return quote_packet((index << 8) | 1, price, ohlc, volume_traded=rnd.randint(0, 10 ** 7))
+    elif kind == "full":
+        depth = [(rnd.randint(1, 5000), price - rnd.randint(0, 500), rnd.randint(1, 50)) for _ in range(10)]
+        return quote_packet((index << 8) | 1, price, ohlc, volume_traded=rnd.randint(0, 10 ** 7),
+                            last_trade_time=EXCHANGE_TIMESTAMP, oi=rnd.randint(0, 10 ** 6),
+                            exchange_timestamp=EXCHANGE_TIMESTAMP, depth=depth)
+
+    raise ValueError("Unknown packet kind: {}".format(kind))
+
+
+def packet_frame(kind, count, seed=1):
+    """Frame of `count` packets of one kind."""
+    rnd = random.Random(seed)
+    return ticker_frame([packet(kind, i, rnd) for i in range(count)])
+
+
+def mixed_frame(count, seed=1):
+    """Frame with a realistic blend of packets, mostly quote and full mode instruments."""
+    rnd = random.Random(seed)
+    kinds = ["ltp"] * 2 + ["quote"] * 4 + ["full"] * 3 + ["index_quote"]
+    return ticker_frame([packet(rnd.choice(kinds), i, rnd) for i in range(count)])
+
+
+def order_message(seed=1):
+    """Text message of an order update as sent on the ticker connection."""
+    rnd = random.Random(seed)
+    return json.dumps({
+        "type": "order",
+        "data": {
+            "account_id": "AB1234",
+            "order_id": str(rnd.randint(10 ** 14, 10 ** 15)),
+            "exchange_order_id": str(rnd.randint(10 ** 15, 10 ** 16)),
+            "status": "COMPLETE",
+            "order_timestamp": "2024-01-15 10:15:02",
+            "exchange_timestamp": "2024-01-15 10:15:02",
+            "exchange": "NSE",
+            "tradingsymbol": "INFY",
+            "instrument_token": 408065,
+            "order_type": "LIMIT",
+            "transaction_type": "BUY",
+            "validity": "DAY",
+            "product": "CNC",
+            "quantity": 10,
+            "price": 1500.5,
+            "average_price": 1500.5,
+            "filled_quantity": 10,
+            "pending_quantity": 0,
+            "cancelled_quantity": 0,
+            "tag": None,
+            "meta": {}
+        }
+    }).encode("utf-8")
+
+
+class Case(object):
+    """
+    A benchmark case.
+
+    - `name` of the case.
+    - `run` is a function of no arguments which processes the input once and returns what it produced.
+    - `items` is the number of ticks or messages processed by a `run`.
+    """
+
+    def __init__(self, name, run, items):
+        self.name = name
+        self.run = run
+        self.items = items
+
+    def measure(self, repeat=5, number=None):
+        """Run the case, returns a dict of seconds per run, items per second and blocks per item."""
+        # Aim for about 0.1 seconds per timing
+        if number is None:
+            elapsed = timeit.timeit(self.run, number=1)
+            number = max(1, int(0.1 / max(elapsed, 1e-9)))
+
+        best = min(timeit.repeat(self.run, repeat=repeat, number=number)) / number
+
+        # Blocks held by the output of a run
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        output = self.run()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        blocks = sum(s.count_diff for s in after.compare_to(before, "filename"))
+        del output
+
+        return {
+            "seconds": best,
+            "per_second": self.items / best,
+            "blocks_per_item": blocks / float(self.items)
+        }
+
+
+def collector():
+    """Ticker callback keeping the ticks of the last call, so their allocations are measured."""
+    received = []
+
+    def on_ticks(ws, ticks):
+        received[:] = ticks
+    return on_ticks, received
+
+
+def cases(packets=500):
+    """All the benchmark cases with frames of `packets` packets."""
+    ticker = KiteTicker("api_key", "access_token")
+    kinds = ["ltp", "index_quote", "index_full", "quote", "full"]
+    frames = dict((kind, packet_frame(kind, packets)) for kind in kinds)
+    frames["mixed"] = mixed_frame(packets)
+
+    result = [
+        Case("split/mixed", lambda: list(ticker._split_packets(frames["mixed"])), packets)
+    ]
+
+    for kind in kinds + ["mixed"]:
+        result.append(Case("parse/" + kind, lambda frame=frames[kind]: ticker._parse_binary(frame), packets))
+
+    # Text messages with an order update callback
+    messages = [order_message(i) for i in range(packets)]
+    updates = []
+    ticker.on_order_update = lambda ws, data: updates.append(data)
+
+    def parse_text():
+        del updates[:]
+        for message in messages:
+            ticker._parse_text_message(message)
+        return list(updates)
+    result.append(Case("text/order", parse_text, packets))
+
+    # Order updates as objects with their latest state kept
+    objects = KiteTicker("api_key", "access_token", order_updates=True)
+    objects.on_order_update = ticker.on_order_update
+
+    def parse_objects():
+        del updates[:]
+        for message in messages:
+            objects._parse_text_message(message)
+        return list(updates)
+    result.append(Case("text/order-object", parse_objects, packets))
+
+    # End to end dispatch of binary frames for each tick format
+    for name, options in [("dict", {}), ("object", {"tick_format": KiteTicker.TICK_FORMAT_OBJECT}),
+                          ("lazy", {"lazy_depth": True}), ("metrics", {"metrics": True})]:
+        dispatcher = KiteTicker("api_key", "access_token", **options)
+        dispatcher.on_ticks, received = collector()
+
+        def dispatch(dispatcher=dispatcher, received=received):
+            dispatcher._on_message(None, frames["mixed"], True)
+            return list(received)
+        result.append(Case("dispatch/" + name, dispatch, packets))
+
+    # Token callbacks of a tenth of the instruments, the other packets are skipped
+    filtered = KiteTicker("api_key", "access_token")
+    on_ticks, received = collector()
+    filtered.add_tick_callback(on_ticks, [(i << 8) | segment for i in range(0, packets, 10) for segment in (1, 9)])
+
+    def dispatch_filtered():
+        filtered._on_message(None, frames["mixed"], True)
+        return list(received)
+    result.append(Case("dispatch/callbacks", dispatch_filtered, packets))
+
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Descriptions of the cases slower or allocating more than the baseline beyond the `tolerance` ratio."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        if result["per_second"] < previous["per_second"] * (1 - tolerance):
+            regressions.append("{}: {:,.0f}/s, was {:,.0f}/s".format(
+                name, result["per_second"], previous["per_second"]))
+
+        if result["blocks_per_item"] > previous["blocks_per_item"] * (1 + tolerance) + 0.05:
+            regressions.append("{}: {:.2f} blocks/tick, was {:.2f}".format(
+                name, result["blocks_per_item"], previous["blocks_per_item"]))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ticker receive path.")
+    parser.add_argument("--packets", type=int, default=500, help="Packets per frame.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", help="Only run the cases whose name contains this text.")
+    parser.add_argument("--save", help="Save the results as JSON to this path.")
+    parser.add_argument("--compare", help="Compare against results saved with --save.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed regression ratio.")
+    args = parser.parse_args(args)
+
+    print("{:<20} {:>12} {:>14} {:>12}".format("case", "us/frame", "ticks/s", "blocks/tick"))
+
+    results = {}
+    for case in cases(args.packets):
+        if args.filter and args.filter not in case.name:
+            continue
+
+        result = results[case.name] = case.measure(repeat=args.repeat)
+        print("{:<20} {:>12.1f} {:>14,.0f} {:>12.2f}".format(case.name, result["seconds"] * 1e6,
+                                                             result["per_second"], result["blocks_per_item"]))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"packets": args.packets, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print("Regression - " + regression)
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+    async_connect.py
+
+    asyncio implementation of the Kite Connect API client.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import inspect
+import logging
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .connect import KiteConnect
+from .historical import HistoricalDownload
+
+log = logging.getLogger(__name__)
+
+
+class AsyncKiteConnect(KiteConnect):
+    """
+    The asyncio Kite Connect API client.
+
+    Same as `KiteConnect`, with the same routes, parameters, response structures and exceptions,
+    but every API method is awaitable and requests are made with a pooled `httpx.AsyncClient`,
+    so hundreds of concurrent requests can run on a single thread:
+
+        kite = AsyncKiteConnect(api_key, access_token=access_token)
+        quotes = await asyncio.gather(*[kite.quote(chunk) for chunk in chunks])
+        await kite.close()
+
+    The client can also be used as an async context manager, which closes it on exit.
+
+    Requires the `httpx` package, install it with `pip install kiteconnect[async]`.
+    """
+
+    def __init__(self, api_key, access_token=None, root=None, debug=False, timeout=None, proxies=None, pool=None,
+                 disable_ssl=False, codec=None, rate_limit=False, candle_cache=None, client=None):
+        """
+        Initialise a new asyncio Kite Connect client instance.
+
+        Accepts the arguments of `KiteConnect`, except
+
+        - `pool` is a dict of `httpx.Limits` arguments (`max_connections`, `max_keepalive_connections`,
+            `keepalive_expiry`) of the connection pool.
+        - `client` is an optional `httpx.AsyncClient` to make requests with instead of creating one. It's not
+            closed by `close()`.
+        """
+        if httpx is None:
+            raise ImportError("`httpx` is required for `AsyncKiteConnect`. Install it with `pip install kiteconnect[async]`.")
+
+        super(AsyncKiteConnect, self).__init__(api_key, access_token=access_token, root=root, debug=debug,
+                                               timeout=timeout, proxies=proxies, disable_ssl=disable_ssl, codec=codec,
+                                               rate_limit=rate_limit, candle_cache=candle_cache)
+
+        # The requests session of the parent isn't used
+        self.reqsession = None
+
+        self._owns_client = client is None
+        if client is None:
+            proxy = self.proxies.get("https") or self.proxies.get("http")
+            client = httpx.AsyncClient(limits=httpx.Limits(**pool) if pool else httpx.Limits(),
+                                       verify=not self.disable_ssl, proxy=proxy, follow_redirects=True)
+        self.client = client
+
+    async def close(self):
+        """Close the connections of the client."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _request(self, route, method, url_args=None, params=None, is_json=False, query_params=None):
+        """Make an HTTP request."""
+        url, headers, query_params, data = self._prepare_request(route, method, url_args=url_args, params=params,
+                                                                 is_json=is_json, query_params=query_params)
+
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(route)
+
+        # JSON bodies are already encoded, form data is url encoded
+        r = await self.client.request(method,
+                                      url,
+                                      content=data if isinstance(data, bytes) else None,
+                                      data=_encode_params(data) if isinstance(data, dict) else None,
+                                      params=_encode_params(query_params),
+                                      headers=headers,
+                                      timeout=self.timeout)
+
+        return self._parse_response(r.status_code, r.headers.get("content-type", ""), r.content)
+
+    def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        """Retrieve historical data (candles) for an instrument."""
+        if self.candle_cache is not None:
+            return self.candle_cache.historical_data_async(self, instrument_token, from_date, to_date, interval,
+                                                           continuous=continuous, oi=oi)
+
+        return self._historical_data(instrument_token, from_date, to_date, interval, continuous, oi)
+
+    async def historical_data_range(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False,
+                                    workers=4):
+        """Retrieve historical data (candles) for an instrument over a date range of any length with coroutines."""
+        if self.candle_cache is not None:
+            return await self.candle_cache.historical_data_async(self, instrument_token, from_date, to_date, interval,
+                                                                 continuous=continuous, oi=oi, workers=workers)
+
+        download = await HistoricalDownload(self, instrument_token, from_date, to_date, interval,
+                                            continuous=continuous, oi=oi).run_async(workers=workers)
+        download.raise_for_errors()
+        return download.candles()
+
+
+def _encode_params(params):
+    """Drop `None` values and send booleans as "True" and "False" like `requests`."""
+    if not params:
+        return None
+
+    return dict((k, str(v) if isinstance(v, bool) else v) for k, v in params.items() if v is not None)
+
+
+def _awaiting(formatter):
+    """Wrap a response formatter of `KiteConnect` to format the result of an awaitable request."""
+    def wrapper(self, data):
+        if not inspect.isawaitable(data):
+            return formatter(self, data)
+
+        async def format():
+            return formatter(self, await data)
+        return format()
+
+    wrapper.__name__ = formatter.__name__
+    wrapper.__doc__ = formatter.__doc__
+    return wrapper
+
+
+# API methods of `KiteConnect` return the result of `_request` or pass it through one of these,
+# so with an awaitable `_request` every API method returns an awaitable.
+for _name in ("_format_response", "_format_quote", "_format_historical", "_parse_instruments",
+              "_parse_mf_instruments", "_set_session", "_renew_session", "_order_id"):
+    setattr(AsyncKiteConnect, _name, _awaiting(getattr(KiteConnect, _name)))
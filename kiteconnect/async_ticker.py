@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+    async_ticker.py
+
+    asyncio implementation of the kite ticker.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import ssl
+import random
+import asyncio
+import logging
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+    from websockets.exceptions import ConnectionClosed, InvalidHandshake
+except ImportError:
+    ws_connect = None
+
+from .ticker import KiteTicker, KiteTickerClientProtocol
+
+log = logging.getLogger(__name__)
+
+
+class AsyncConnection(object):
+    """
+    Adapter of a `websockets` connection to the methods `KiteTicker` calls on its Twisted protocol.
+
+    Messages are sent from synchronous code (`subscribe()`, `set_mode()` etc.), so they're
+    queued as tasks on the event loop in the order they're sent.
+    """
+
+    STATE_OPEN = "open"
+    STATE_CLOSED = "closed"
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.state = self.STATE_OPEN
+        self._sending = None
+
+    def sendMessage(self, payload, isBinary=False):  # noqa
+        """Queue a message to be sent."""
+        if self.state != self.STATE_OPEN:
+            raise RuntimeError("Connection is closed.")
+
+        if not isBinary and isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+
+        self._sending = asyncio.ensure_future(self._send(self._sending, payload))
+
+    async def _send(self, previous, payload):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await self.connection.send(payload)
+        except ConnectionClosed:
+            pass
+
+    def sendClose(self, code=None, reason=None):  # noqa
+        """Start the closing handshake."""
+        self.state = self.STATE_CLOSED
+        asyncio.ensure_future(self.connection.close(code or 1000, reason or ""))
+
+
+class AsyncKiteTicker(KiteTicker):
+    """
+    The asyncio WebSocket client for Kite Connect's streaming quotes service.
+
+    Same as `KiteTicker`, with the same tick structures, callbacks, subscription methods
+    and reconnection behaviour, but it runs on the current asyncio event loop (including uvloop)
+    instead of the Twisted reactor. Ticks can also be consumed as an async iterator.
+
+    Requires the `websockets` package and Python 3.9 or later, install it with `pip install kiteconnect[async]`.
+
+        #!python
+        import asyncio
+        from kiteconnect import AsyncKiteTicker
+
+        async def main():
+            kws = AsyncKiteTicker("your_api_key", "your_access_token")
+            await kws.connect()
+
+            kws.subscribe([738561, 5633])
+            kws.set_mode(kws.MODE_FULL, [738561])
+
+            async for ticks in kws:
+                print(ticks)
+
+        asyncio.run(main())
+
+    `connect()` returns once the connection is open (or raises when it can't be established and
+    reconnection is off). Reconnection runs in a background task with the same exponential backoff
+    as `KiteTicker`, resubscribing all subscribed tokens on every reconnect. Iteration stops after
+    `close()` or when reconnection gives up.
+    """
+
+    # Backoff parameters, same as Twisted's `ReconnectingClientFactory`
+    _initial_delay = 1.0
+    _factor = 2.7182818284590451
+    _jitter = 0.119626565582
+
+    # Frames of ticks buffered for the async iterator, oldest frames are dropped when it's full
+    TICK_QUEUE_SIZE = 1000
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialise the asyncio websocket client instance.
+
+        Accepts all the arguments of `KiteTicker`, along with
+
+        - `tick_queue_size` is the number of frames of ticks buffered for the async iterator.
+        """
+        if ws_connect is None:
+            raise ImportError("`websockets` is required for `AsyncKiteTicker`. "
+                              "Install it with `pip install kiteconnect[async]` on Python 3.9 or later.")
+
+        self.tick_queue_size = kwargs.pop("tick_queue_size", self.TICK_QUEUE_SIZE)
+        super(AsyncKiteTicker, self).__init__(*args, **kwargs)
+
+        if self.dispatcher:
+            raise ValueError("`dispatcher` is not supported with `AsyncKiteTicker`.")
+
+        self._task = None
+        self._loop = None
+        self._stopped = False
+        self._ticks = None
+
+        # Number of frames dropped from the iterator queue
+        self.dropped = 0
+
+    async def connect(self, disable_ssl_verification=False, proxy=None):
+        """
+        Establish a websocket connection and keep it connected in a background task.
+
+        - `disable_ssl_verification` disables verification of the server certificate
+        - `proxy` is a dictionary with keys `host` and `port` which denotes the proxy settings
+        """
+        loop = self._loop = asyncio.get_event_loop()
+        self._stopped = False
+        opened = loop.create_future()
+
+        self._task = loop.create_task(self._run(opened, disable_ssl_verification, proxy))
+        await asyncio.wait([opened, self._task], return_when=asyncio.FIRST_COMPLETED)
+
+        if opened.done():
+            return True
+
+        # Connection task finished without ever opening
+        self._task.result()
+        raise ConnectionError("Unable to connect to {}".format(self.root))
+
+    def _connect_options(self, disable_ssl_verification, proxy):
+        options = {
+            "additional_headers": {"X-Kite-Version": "3"},
+            "user_agent_header": self._user_agent(),
+            "open_timeout": self.connect_timeout,
+            # Same ghost connection detection as `KiteTicker`, drop the connection on missing pongs
+            "ping_interval": KiteTickerClientProtocol.PING_INTERVAL,
+            "ping_timeout": 2 * KiteTickerClientProtocol.PING_INTERVAL,
+            "max_size": None,
+            "compression": None,
+            "proxy": "http://{host}:{port}".format(**proxy) if proxy else None
+        }
+
+        if self.socket_url.startswith("wss") and disable_ssl_verification:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            options["ssl"] = context
+
+        return options
+
+    async def _run(self, opened, disable_ssl_verification, proxy):
+        """Connect and reconnect with an exponential backoff until closed."""
+        options = self._connect_options(disable_ssl_verification, proxy)
+        retries = 0
+        delay = self._initial_delay
+
+        try:
+            while not self._stopped:
+                try:
+                    connection = await ws_connect(self.socket_url, **options)
+                except (OSError, asyncio.TimeoutError, InvalidHandshake) as e:
+                    log.error("Connection error: {}".format(e))
+                    if not self.reconnect:
+                        raise
+                else:
+                    retries = 0
+                    delay = self._initial_delay
+
+                    ws = AsyncConnection(connection)
+                    self._on_connect(ws, connection.response)
+                    self._on_open(ws)
+                    if not opened.done():
+                        opened.set_result(True)
+
+                    await self._receive(ws)
+
+                if self._stopped or not self.reconnect:
+                    break
+
+                retries += 1
+                if retries > self.reconnect_max_tries:
+                    if self.debug:
+                        log.debug("Maximum retries ({}) exhausted.".format(self.reconnect_max_tries))
+                    self._on_noreconnect()
+                    break
+
+                delay = min(delay * self._factor, self.reconnect_max_delay)
+                delay = random.normalvariate(delay, delay * self._jitter)
+
+                log.error("Retrying connection. Retry attempt count: {}. Next retry in around: {} seconds".format(
+                    retries, int(round(delay))))
+                self._on_reconnect(retries)
+
+                await asyncio.sleep(delay)
+        finally:
+            self.ws = None
+            if self._ticks is not None:
+                self._put_ticks(None)
+
+    async def _receive(self, ws):
+        """Handle messages until the connection closes."""
+        connection = ws.connection
+        try:
+            async for payload in connection:
+                is_binary = isinstance(payload, bytes)
+                self._on_message(ws, payload if is_binary else payload.encode("utf-8"), is_binary)
+        except ConnectionClosed:
+            pass
+        finally:
+            ws.state = ws.STATE_CLOSED
+
+        code, reason = connection.close_code or 1006, connection.close_reason or ""
+
+        # Closed without a closing handshake, same as an unclean close on the Twisted ticker
+        if code == 1006:
+            self._on_error(ws, code, reason or "Connection lost")
+
+        self._on_close(ws, code, reason)
+
+    async def close(self, code=None, reason=None):
+        """Close the WebSocket connection and stop reconnecting."""
+        self._stopped = True
+        self._close(code, reason)
+
+        if self._task:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), self.connect_timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+
+    def stop(self):
+        """Stop the connection task immediately without a closing handshake."""
+        self._stopped = True
+        if self._task:
+            self._task.cancel()
+
+        if self._recorder is not None:
+            self._recorder.close()
+
+    def stop_retry(self):
+        """Stop auto retry when it is in progress."""
+        self._stopped = True
+
+    def _call_later(self, delay, callback):
+        # Subscriptions are sent when the connection opens, nothing to schedule before that
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, callback)
+
+    def _tick_tokens(self):
+        # Everything is decoded when ticks are consumed through the iterator
+        if self._ticks is not None:
+            return None
+        return super(AsyncKiteTicker, self)._tick_tokens()
+
+    def _dispatch_ticks(self, ticks):
+        if self._ticks is not None:
+            self._put_ticks(ticks)
+        super(AsyncKiteTicker, self)._dispatch_ticks(ticks)
+
+    def _put_ticks(self, ticks):
+        if self._ticks.full():
+            self._ticks.get_nowait()
+            self.dropped += 1
+        self._ticks.put_nowait(ticks)
+
+    def __aiter__(self):
+        if self._ticks is None:
+            self._ticks = asyncio.Queue(maxsize=self.tick_queue_size)
+        return self
+
+    async def __anext__(self):
+        if self._task is None or (self._task.done() and self._ticks.empty()):
+            raise StopAsyncIteration
+
+        ticks = await self._ticks.get()
+        if ticks is None:
+            raise StopAsyncIteration
+        return ticks
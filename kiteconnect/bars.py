@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+    bars.py
+
+    Incremental OHLCV bars built from ticker ticks.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import re
+import time
+from array import array
+from datetime import datetime, timedelta, tzinfo
+
+_interval_pattern = re.compile(r"^(\d*)(second|minute|day)$")
+_interval_units = {"second": 1, "minute": 60, "day": 86400}
+
+
+class _IST(tzinfo):
+    """Indian standard time, the timezone of `KiteConnect.historical_data` candles."""
+
+    _offset = timedelta(hours=5, minutes=30)
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        return "IST"
+
+
+IST = _IST()
+
+
+def interval_seconds(interval):
+    """
+    Length of an interval in seconds.
+
+    - `interval` is a number of seconds or an interval name of `KiteConnect.historical_data`
+        (`minute`, `5minute`, `day` etc.) along with `second` and `Nsecond`.
+    """
+    if isinstance(interval, (int, float)):
+        seconds = int(interval)
+    else:
+        match = _interval_pattern.match(interval)
+        if not match:
+            raise ValueError("Invalid interval: {}".format(interval))
+        seconds = int(match.group(1) or 1) * _interval_units[match.group(2)]
+
+    if seconds < 1:
+        raise ValueError("Interval should be at least a second: {}".format(interval))
+    return seconds
+
+
+class _Series(object):
+    """Current bar of every instrument for a single interval, stored in parallel arrays indexed by slot."""
+
+    def __init__(self, interval, seconds, origin):
+        self.interval = interval
+        self.seconds = seconds
+        self.origin = origin
+
+        # Instrument token -> slot
+        self.slots = {}
+        self.tokens = array("q")
+        # Bar start as epoch seconds, -1 if the slot has no bar yet and
+        # `-start - 2` once the bar is completed by `flush()`
+        self.start = array("q")
+        self.open = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.close = array("d")
+        self.volume = array("q")
+        # Cumulative day volume up to the previous tick added to a bar
+        self.cumulative = array("q")
+
+    def add(self, instrument_token):
+        slot = self.slots[instrument_token] = len(self.tokens)
+        self.tokens.append(instrument_token)
+        self.start.append(-1)
+        self.open.append(0.0)
+        self.high.append(0.0)
+        self.low.append(0.0)
+        self.close.append(0.0)
+        self.volume.append(0)
+        self.cumulative.append(-1)
+        return slot
+
+    def bar(self, slot):
+        return {
+            "instrument_token": self.tokens[slot],
+            "interval": self.interval,
+            "date": datetime.fromtimestamp(self.start[slot], IST),
+            "open": self.open[slot],
+            "high": self.high[slot],
+            "low": self.low[slot],
+            "close": self.close[slot],
+            "volume": self.volume[slot]
+        }
+
+
+class BarAggregator(object):
+    """
+    Build OHLCV bars of several intervals for any number of instruments from ticks.
+
+        #!python
+        from kiteconnect import KiteTicker
+        from kiteconnect.bars import BarAggregator
+
+        def on_bar(bar):
+            print(bar["instrument_token"], bar["interval"], bar["date"], bar["close"], bar["volume"])
+
+        bars = BarAggregator(["minute", "5minute"], on_bar=on_bar)
+
+        kws = KiteTicker("your_api_key", "your_access_token", raw_timestamps=True)
+        kws.on_ticks = bars.on_ticks
+
+    Completed bars are passed to `on_bar` as dicts with the same keys as `KiteConnect.historical_data`
+    candles (`date`, `open`, `high`, `low`, `close`, `volume`) along with `instrument_token` and `interval`.
+    `date` is the bar's start time in IST.
+
+    Bars are aligned to `origin`, which defaults to 09:15 IST (market open), so they line up with historical
+    candles for every interval including `60minute`, and `day` bars start at midnight IST. A bar is completed when a tick of a later bar arrives for
+    the same instrument, or by `flush()` once its time is over. Intervals without any ticks don't produce bars.
+
+    A tick's time is its `exchange_timestamp`, else its `last_trade_time`, else the time it was received.
+    Prices are `last_price`. Volume is the difference in the cumulative `volume_traded` of the day, so the
+    first bar of an instrument only counts volume traded after its first tick. LTP mode ticks have no volume.
+
+    Current bars are kept in typed arrays per interval rather than a dict per instrument, so thousands of
+    instruments take little memory and the per tick update only touches a few array slots.
+    """
+
+    # 09:15 IST as seconds since midnight UTC
+    ORIGIN = 3 * 3600 + 45 * 60
+    # Midnight IST, day bars are aligned to it like daily historical candles
+    DAY_ORIGIN = -(5 * 3600 + 30 * 60)
+
+    def __init__(self, intervals=("minute",), on_bar=None, origin=ORIGIN):
+        """
+        Initialise the aggregator.
+
+        - `intervals` is a list of bar intervals, names of `KiteConnect.historical_data` intervals
+            (`minute`, `3minute`, `day` etc.), `second`, `Nsecond` or a number of seconds.
+        - `on_bar` is called with every completed bar.
+        - `origin` in seconds is the offset from midnight UTC bars are aligned to. Bars of whole days are
+            always aligned to midnight IST.
+        """
+        self.on_bar = on_bar
+        self._series = []
+        for interval in intervals:
+            seconds = interval_seconds(interval)
+            self._series.append(_Series(interval, seconds, self.DAY_ORIGIN if seconds % 86400 == 0 else origin))
+
+        # Last converted timestamp, ticks of a frame mostly share the same second
+        self._last_datetime = None
+        self._last_epoch = None
+
+    def on_ticks(self, ws, ticks):
+        """`KiteTicker` callback, assign it to `on_ticks` or register it with `add_tick_callback`."""
+        self.update(ticks)
+
+    def update(self, ticks):
+        """Add a list of dict ticks or `kiteconnect.ticks.Tick` objects to the bars."""
+        now = None
+
+        for tick in ticks:
+            timestamp = tick.get("exchange_timestamp") or tick.get("last_trade_time")
+            if timestamp is None:
+                if now is None:
+                    now = int(time.time())
+                timestamp = now
+            elif isinstance(timestamp, datetime):
+                timestamp = self._epoch(timestamp)
+
+            self.add(tick["instrument_token"], timestamp, tick["last_price"], tick.get("volume_traded"))
+
+    def add(self, instrument_token, timestamp, price, volume_traded=None):
+        """
+        Add a single trade to the bars.
+
+        - `instrument_token` is the instrument of the trade.
+        - `timestamp` is the epoch time in seconds.
+        - `price` is the traded price.
+        - `volume_traded` is the cumulative volume of the day, if known.
+        """
+        for series in self._series:
+            slot = series.slots.get(instrument_token)
+            if slot is None:
+                slot = series.add(instrument_token)
+
+            seconds = series.seconds
+            start = timestamp - (timestamp - series.origin) % seconds
+
+            # Volume since the previous tick, cumulative volume resets on a new day
+            volume = 0
+            if volume_traded is not None:
+                previous = series.cumulative[slot]
+                if previous >= 0:
+                    volume = volume_traded - previous if volume_traded >= previous else volume_traded
+
+            current = series.start[slot]
+            if start != current:
+                # Late ticks of an already completed bar are ignored, their volume is counted by the next tick
+                if current < -1:
+                    if start <= -current - 2:
+                        continue
+                elif start < current:
+                    continue
+                elif current >= 0 and self.on_bar:
+                    self.on_bar(series.bar(slot))
+
+                series.start[slot] = start
+                series.open[slot] = series.high[slot] = series.low[slot] = series.close[slot] = price
+                series.volume[slot] = volume
+            else:
+                if price > series.high[slot]:
+                    series.high[slot] = price
+                elif price < series.low[slot]:
+                    series.low[slot] = price
+                series.close[slot] = price
+                series.volume[slot] += volume
+
+            if volume_traded is not None:
+                series.cumulative[slot] = volume_traded
+
+    def flush(self, now=None):
+        """
+        Complete bars whose time is over, for instruments which haven't ticked since. Returns the number of bars.
+
+        Call it periodically, for example every second from a timer.
+
+        - `now` is the current epoch time in seconds, defaults to the current time.
+        """
+        now = time.time() if now is None else now
+        completed = 0
+
+        for series in self._series:
+            starts = series.start
+            for slot in range(len(starts)):
+                if starts[slot] >= 0 and starts[slot] + series.seconds <= now:
+                    if self.on_bar:
+                        self.on_bar(series.bar(slot))
+                    # Keep the start so late ticks of the bar are still ignored
+                    starts[slot] = -starts[slot] - 2
+                    completed += 1
+
+        return completed
+
+    def current(self, instrument_token, interval=None):
+        """
+        Get the bar in progress of an instrument or `None`.
+
+        - `interval` is one of the intervals of the aggregator, defaults to the first one.
+        """
+        for series in self._series:
+            if interval is None or series.interval == interval:
+                slot = series.slots.get(instrument_token)
+                if slot is None or series.start[slot] < 0:
+                    return None
+                return series.bar(slot)
+
+        raise ValueError("Unknown interval: {}".format(interval))
+
+    def _epoch(self, timestamp):
+        """Convert a naive local `datetime` tick timestamp back to epoch seconds."""
+        if timestamp != self._last_datetime:
+            self._last_datetime = timestamp
+            self._last_epoch = int(time.mktime(timestamp.timetuple()))
+        return self._last_epoch
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+    cache.py
+
+    On disk cache of historical candles.
+
+    Candles are stored per instrument, interval and `continuous`/`oi` flags
+    in a compact columnar file along with the date ranges they cover, so a
+    request only fetches the parts of its range which aren't cached. Candles
+    of the current trading day (IST) are still forming and are never cached.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import os
+import sys
+import json
+import zlib
+import struct
+import bisect
+import logging
+import datetime
+import threading
+from array import array
+
+import dateutil.tz
+
+from .historical import HistoricalDownload, merge_candles, to_datetime
+
+log = logging.getLogger(__name__)
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30), "IST")
+# Timezone of the dates of candles parsed by `KiteConnect.historical_data`, cached candles get the same one
+_CANDLE_TZ = dateutil.tz.tzoffset(None, 19800)
+
+_MAGIC = b"KCC1"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+_SECOND = datetime.timedelta(seconds=1)
+
+# Column names and array typecodes of candle fields
+_COLUMNS = [("date", "q"), ("open", "d"), ("high", "d"), ("low", "d"), ("close", "d"), ("volume", "q")]
+_OI_COLUMN = ("oi", "q")
+
+
+def _ist(value):
+    """Naive IST datetime of a datetime, date or date string."""
+    value = to_datetime(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(IST).replace(tzinfo=None)
+    return value
+
+
+def _timestamp(value):
+    """Epoch seconds of a naive IST or an aware datetime."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=IST)
+    return int(value.timestamp())
+
+
+class CandleSeries(object):
+    """Candles of an instrument for an interval and the date ranges they cover."""
+
+    def __init__(self, oi=False):
+        self.columns = _COLUMNS + [_OI_COLUMN] if oi else list(_COLUMNS)
+        self.arrays = dict((name, array(typecode)) for name, typecode in self.columns)
+        # Sorted and disjoint (from, to) ranges of naive IST datetimes, both inclusive
+        self.coverage = []
+
+    def __len__(self):
+        return len(self.arrays["date"])
+
+    def missing(self, from_date, to_date):
+        """Ranges between the dates which aren't covered."""
+        gaps = []
+        start = from_date
+        for covered_from, covered_to in self.coverage:
+            if covered_to < start:
+                continue
+            if covered_from > to_date:
+                break
+            if covered_from > start:
+                gaps.append((start, covered_from - _SECOND))
+            start = covered_to + _SECOND
+
+        if start <= to_date:
+            gaps.append((start, to_date))
+        return gaps
+
+    def replace(self, from_date, to_date, candles):
+        """Replace the candles between the dates with `candles` and mark the range covered."""
+        dates = self.arrays["date"]
+        i = bisect.bisect_left(dates, _timestamp(from_date))
+        j = bisect.bisect_right(dates, _timestamp(to_date))
+
+        for name, typecode in self.columns:
+            if name == "date":
+                values = array(typecode, [_timestamp(c["date"]) for c in candles])
+            elif typecode == "q":
+                values = array(typecode, [int(c[name]) for c in candles])
+            else:
+                values = array(typecode, [c[name] for c in candles])
+            self.arrays[name][i:j] = values
+
+        self.cover(from_date, to_date)
+
+    def cover(self, from_date, to_date):
+        """Mark a range covered."""
+        ranges = sorted(self.coverage + [(from_date, to_date)])
+        self.coverage = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = self.coverage[-1]
+            if start <= last_end + _SECOND:
+                self.coverage[-1] = (last_start, max(last_end, end))
+            else:
+                self.coverage.append((start, end))
+
+    def candles(self, from_date, to_date):
+        """Candles between the dates in the format of `KiteConnect.historical_data`."""
+        dates = self.arrays["date"]
+        i = bisect.bisect_left(dates, _timestamp(from_date))
+        j = bisect.bisect_right(dates, _timestamp(to_date))
+
+        columns = [self.arrays[name][i:j] for name, typecode in self.columns]
+        columns[0] = [datetime.datetime.fromtimestamp(t, _CANDLE_TZ) for t in columns[0]]
+
+        # Dict displays are much faster than building dicts from names and rows
+        if len(columns) == len(_COLUMNS):
+            return [{"date": d, "open": o, "high": h, "low": low, "close": c, "volume": v}
+                    for d, o, h, low, c, v in zip(*columns)]
+        return [{"date": d, "open": o, "high": h, "low": low, "close": c, "volume": v, "oi": oi}
+                for d, o, h, low, c, v, oi in zip(*columns)]
+
+    def dumps(self):
+        """Serialise to bytes."""
+        blobs = [zlib.compress(self.arrays[name].tobytes(), 1) for name, typecode in self.columns]
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "count": len(self),
+            "columns": [[name, typecode, len(blob)] for (name, typecode), blob in zip(self.columns, blobs)],
+            "coverage": [[start.strftime(_DATE_FORMAT), end.strftime(_DATE_FORMAT)] for start, end in self.coverage]
+        }).encode("utf-8")
+
+        return b"".join([_MAGIC, struct.pack("<I", len(header)), header] + blobs)
+
+    @classmethod
+    def loads(cls, data):
+        """Deserialise from bytes."""
+        if data[:4] != _MAGIC:
+            raise ValueError("Not a candle cache file.")
+
+        length, = struct.unpack("<I", data[4:8])
+        header = json.loads(data[8:8 + length].decode("utf-8"))
+
+        series = cls(oi=any(name == "oi" for name, typecode, size in header["columns"]))
+        offset = 8 + length
+        for name, typecode, size in header["columns"]:
+            values = array(typecode)
+            values.frombytes(zlib.decompress(data[offset:offset + size]))
+            if header["byteorder"] != sys.byteorder:
+                values.byteswap()
+            series.arrays[name] = values
+            offset += size
+
+        series.coverage = [(datetime.datetime.strptime(start, _DATE_FORMAT),
+                            datetime.datetime.strptime(end, _DATE_FORMAT)) for start, end in header["coverage"]]
+        return series
+
+
+class CandleCache(object):
+    """
+    Directory of cached candles used by `KiteConnect.historical_data`:
+
+        kite = KiteConnect(api_key, access_token=access_token, candle_cache="~/.cache/kite-candles")
+
+    Only the ranges of a request which aren't cached are fetched (in chunks, like `historical_data_range`) and
+    stored. Candles from the start of the current trading day are always fetched. The cache can be shared by
+    threads and processes, when processes update the same series concurrently the last update wins.
+    """
+
+    def __init__(self, path):
+        """
+        Initialise a cache.
+
+        - `path` is the directory to store candles in. It's created if it doesn't exist.
+        """
+        self.path = os.path.expanduser(path)
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        self._lock = threading.Lock()
+        # Current time in IST
+        self.now = lambda: datetime.datetime.now(IST)
+
+    def filename(self, instrument_token, interval, continuous=False, oi=False):
+        """Path of the file of a series."""
+        name = "{}-{}{}{}.candles".format(instrument_token, interval, "-continuous" if continuous else "",
+                                          "-oi" if oi else "")
+        return os.path.join(self.path, name)
+
+    def load(self, instrument_token, interval, continuous=False, oi=False):
+        """Cached `CandleSeries` of an instrument, empty if nothing is cached."""
+        try:
+            with open(self.filename(instrument_token, interval, continuous, oi), "rb") as f:
+                return CandleSeries.loads(f.read())
+        except (IOError, OSError):
+            return CandleSeries(oi=oi)
+
+    def save(self, series, instrument_token, interval, continuous=False, oi=False):
+        """Store a `CandleSeries` of an instrument."""
+        filename = self.filename(instrument_token, interval, continuous, oi)
+        temporary = "{}.{}-{}.tmp".format(filename, os.getpid(), threading.current_thread().ident)
+        with open(temporary, "wb") as f:
+            f.write(series.dumps())
+        os.replace(temporary, filename)
+
+    def remove(self, instrument_token, interval, continuous=False, oi=False):
+        """Forget the cached candles of a series."""
+        try:
+            os.remove(self.filename(instrument_token, interval, continuous, oi))
+        except OSError:
+            pass
+
+    def _plan(self, kite, instrument_token, from_date, to_date, interval, continuous, oi):
+        """Cached series, naive IST request range, start of the trading day and downloads of the missing ranges."""
+        from_date, to_date = _ist(from_date), _ist(to_date)
+        today = datetime.datetime.combine(self.now().astimezone(IST).date(), datetime.time())
+
+        series = self.load(instrument_token, interval, continuous, oi)
+        gaps = series.missing(from_date, to_date)
+        if gaps:
+            log.debug("Fetching uncached candles of {} {}: {}".format(instrument_token, interval, gaps))
+
+        downloads = [HistoricalDownload(kite, instrument_token, start, end, interval, continuous=continuous, oi=oi)
+                     for start, end in gaps]
+        return series, from_date, to_date, today, downloads
+
+    def _store(self, downloads, instrument_token, interval, continuous, oi, today):
+        """Store the candles of fetched chunks before the trading day and return the candles from it."""
+        fresh = []
+        with self._lock:
+            # Reload in case another thread stored the series in the meanwhile
+            series = self.load(instrument_token, interval, continuous, oi)
+            changed = False
+            for download in downloads:
+                for chunk in download.chunks:
+                    if chunk not in download.results:
+                        continue
+
+                    candles = download.results[chunk]
+                    end = min(chunk[1], today - _SECOND)
+                    if chunk[0] <= end:
+                        last = _timestamp(end)
+                        series.replace(chunk[0], end, [c for c in candles if _timestamp(c["date"]) <= last])
+                        changed = True
+                    first = _timestamp(today)
+                    fresh.append([c for c in candles if _timestamp(c["date"]) >= first])
+
+            if changed:
+                self.save(series, instrument_token, interval, continuous, oi)
+
+        return series, merge_candles(fresh)
+
+    def _result(self, series, from_date, to_date, today, fresh):
+        candles = series.candles(from_date, min(to_date, today - _SECOND)) if from_date < today else []
+        return merge_candles([candles, fresh])
+
+    def historical_data(self, kite, instrument_token, from_date, to_date, interval, continuous=False, oi=False,
+                        workers=4):
+        """
+        Candles of an instrument, fetching the ranges which aren't cached with `kite`.
+
+        - `kite` is the `KiteConnect` client to fetch candles with.
+        - `workers` is the number of chunks fetched at once.
+        - The other arguments are the ones of `KiteConnect.historical_data`.
+
+        The exception of the first chunk which failed is raised after storing the chunks which didn't.
+        """
+        series, from_date, to_date, today, downloads = self._plan(kite, instrument_token, from_date, to_date,
+                                                                  interval, continuous, oi)
+        if not downloads:
+            return self._result(series, from_date, to_date, today, [])
+
+        for download in downloads:
+            download.run(workers=workers)
+
+        series, fresh = self._store(downloads, instrument_token, interval, continuous, oi, today)
+        for download in downloads:
+            download.raise_for_errors()
+
+        return self._result(series, from_date, to_date, today, fresh)
+
+    async def historical_data_async(self, kite, instrument_token, from_date, to_date, interval, continuous=False,
+                                    oi=False, workers=4):
+        """`historical_data` with an `AsyncKiteConnect` client."""
+        series, from_date, to_date, today, downloads = self._plan(kite, instrument_token, from_date, to_date,
+                                                                  interval, continuous, oi)
+        if not downloads:
+            return self._result(series, from_date, to_date, today, [])
+
+        for download in downloads:
+            await download.run_async(workers=workers)
+
+        series, fresh = self._store(downloads, instrument_token, interval, continuous, oi, today)
+        for download in downloads:
+            download.raise_for_errors()
+
+        return self._result(series, from_date, to_date, today, fresh)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+    codec.py
+
+    Pluggable JSON codecs for the REST API and the ticker.
+
+    `KiteConnect(codec=...)` and `KiteTicker(codec=...)` accept the name of a
+    codec, `"json"` (the standard library, default), `"orjson"`, `"ujson"` or
+    `"auto"` for the fastest one installed, or a `JSONCodec` built from any pair
+    of `loads` and `dumps` functions.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import json
+import importlib
+
+
+class JSONCodec(object):
+    """
+    A JSON decoder and encoder pair.
+
+    `decode` accepts bytes (straight from the network) or text and `encode` returns UTF-8 bytes.
+    """
+
+    def __init__(self, loads, dumps, name=None, loads_bytes=True):
+        """
+        Initialise a codec.
+
+        - `loads` is a function which decodes a JSON document.
+        - `dumps` is a function which encodes an object to a JSON document as text or bytes.
+        - `name` of the codec.
+        - `loads_bytes` if set, `loads` accepts UTF-8 bytes, otherwise bytes are decoded to text first.
+        """
+        self.loads = loads
+        self.dumps = dumps
+        self.name = name or getattr(loads, "__module__", None)
+        self.loads_bytes = loads_bytes
+
+    def decode(self, data):
+        """Decode a JSON document from bytes or text. Raises `ValueError` on invalid documents."""
+        if not self.loads_bytes and isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return self.loads(data)
+
+    def encode(self, obj):
+        """Encode an object to a JSON document as UTF-8 bytes."""
+        data = self.dumps(obj)
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        return data
+
+    def __repr__(self):
+        return "JSONCodec({})".format(self.name)
+
+
+def _stdlib():
+    # Bytes are only accepted by `json.loads` from Python 3.6
+    try:
+        json.loads(b"{}")
+        loads_bytes = True
+    except TypeError:
+        loads_bytes = False
+
+    return JSONCodec(json.loads, json.dumps, "json", loads_bytes=loads_bytes)
+
+
+def _orjson():
+    orjson = importlib.import_module("orjson")
+    return JSONCodec(orjson.loads, orjson.dumps, "orjson")
+
+
+def _ujson():
+    ujson = importlib.import_module("ujson")
+    return JSONCodec(ujson.loads, ujson.dumps, "ujson")
+
+
+# Codec factories by name, in order of preference for "auto"
+_codecs = [("orjson", _orjson), ("ujson", _ujson), ("json", _stdlib)]
+
+STDLIB = _stdlib()
+
+
+def get_codec(codec=None):
+    """
+    Get a codec.
+
+    - `codec` is a `JSONCodec`, the name of a codec ("json", "orjson", "ujson") or "auto" for the fastest installed
+        one. Defaults to the standard library.
+    """
+    if codec is None or codec == "json":
+        return STDLIB
+
+    if isinstance(codec, JSONCodec):
+        return codec
+
+    if codec == "auto":
+        for name, factory in _codecs:
+            try:
+                return factory()
+            except ImportError:
+                continue
+
+    for name, factory in _codecs:
+        if name == codec:
+            try:
+                return factory()
+            except ImportError:
+                raise ImportError("`{name}` is not installed. Install it with `pip install {name}`.".format(name=name))
+
+    raise ValueError("Invalid JSON codec: {}".format(codec))
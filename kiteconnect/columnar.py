@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+    columnar.py
+
+    NumPy batch decoder for kite ticker binary frames.
+
+    Packets of a frame are grouped by their length and every group is decoded
+    at once through a big-endian structured dtype. The result is a single
+    columnar batch (a dict of NumPy arrays, one row per packet) instead of a
+    list of tick dicts:
+
+        #!python
+        {
+            'instrument_token': array([408065, 738561, ...], dtype=uint32),
+            'mode': array(['full', 'quote', ...], dtype='<U5'),
+            'tradable': array([ True,  True, ...]),
+            'last_price': array([1450.25, 2415.1, ...]),
+            'volume_traded': array([1000, 251, ...]),
+            'open': ..., 'high': ..., 'low': ..., 'close': ..., 'change': ...,
+            'last_trade_time': array([1700000000, 0, ...]),
+            'exchange_timestamp': array([1700000001, 0, ...]),
+            'depth_buy_price': array([[1450.0, 1449.95, ...], ...]),  # shape (n, 5)
+            'depth_buy_quantity': ..., 'depth_buy_orders': ...,
+            'depth_sell_price': ..., 'depth_sell_quantity': ..., 'depth_sell_orders': ...,
+            ...
+        }
+
+    Rows are ordered by packet length and then by their position in the frame.
+    Fields which are not part of a packet's mode are `nan` for prices and `0`
+    for quantities and timestamps. Timestamps are epoch seconds.
+
+    Requires `numpy` (`pip install kiteconnect[numpy]`).
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import numpy as np
+
+from .ticker import KiteTicker
+
+# Big-endian layouts for every packet length, keyed by field name.
+_depth_dtype = np.dtype({
+    "names": ["quantity", "price", "orders"],
+    "formats": [">u4", ">u4", ">u2"],
+    "offsets": [0, 4, 8],
+    "itemsize": 12
+})
+
+_quote_fields = [
+    ("instrument_token", 0), ("last_price", 4), ("last_traded_quantity", 8), ("average_traded_price", 12),
+    ("volume_traded", 16), ("total_buy_quantity", 20), ("total_sell_quantity", 24),
+    ("open", 28), ("high", 32), ("low", 36), ("close", 40)
+]
+
+_full_fields = _quote_fields + [
+    ("last_trade_time", 44), ("oi", 48), ("oi_day_high", 52), ("oi_day_low", 56), ("exchange_timestamp", 60)
+]
+
+_index_fields = [
+    ("instrument_token", 0), ("last_price", 4), ("high", 8), ("low", 12), ("open", 16), ("close", 20)
+]
+
+
+def _packet_dtype(fields, itemsize, depth=False):
+    names = [f[0] for f in fields]
+    formats = [">u4"] * len(fields)
+    offsets = [f[1] for f in fields]
+
+    if depth:
+        names.append("depth")
+        formats.append((_depth_dtype, (10,)))
+        offsets.append(64)
+
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": itemsize})
+
+
+_packet_dtypes = {
+    8: _packet_dtype([("instrument_token", 0), ("last_price", 4)], 8),
+    28: _packet_dtype(_index_fields, 28),
+    32: _packet_dtype(_index_fields + [("exchange_timestamp", 28)], 32),
+    44: _packet_dtype(_quote_fields, 44),
+    184: _packet_dtype(_full_fields, 184, depth=True),
+}
+
+_packet_modes = {
+    8: KiteTicker.MODE_LTP,
+    28: KiteTicker.MODE_QUOTE,
+    32: KiteTicker.MODE_FULL,
+    44: KiteTicker.MODE_QUOTE,
+    184: KiteTicker.MODE_FULL,
+}
+
+# Output columns which are prices (scaled by the segment divisor) and plain integers.
+_price_columns = ["last_price", "average_traded_price", "open", "high", "low", "close"]
+_int_columns = [
+    "last_traded_quantity", "volume_traded", "total_buy_quantity", "total_sell_quantity",
+    "last_trade_time", "oi", "oi_day_high", "oi_day_low", "exchange_timestamp"
+]
+_depth_columns = ["quantity", "price", "orders"]
+
+
+def group_packets(packets):
+    """Group `(offset, length)` packet pairs to a dict of `length -> [offsets]` preserving frame order."""
+    groups = {}
+    for offset, length in packets:
+        if length in _packet_dtypes:
+            groups.setdefault(length, []).append(offset)
+
+    return groups
+
+
+def _records(buf, length, offsets):
+    """Structured array view of all the packets of `length` at `offsets` in the frame."""
+    dtype = _packet_dtypes[length]
+    count = len(offsets)
+    first = offsets[0]
+
+    # Packets laid back to back in the frame (the common case) are viewed in place
+    # by striding over the 2 byte length header between them.
+    if offsets[-1] - first == (count - 1) * (length + 2):
+        return np.ndarray((count,), dtype=dtype, buffer=buf, offset=first, strides=(length + 2,))
+
+    index = np.asarray(offsets, dtype=np.intp)[:, None] + np.arange(length)
+    return buf[index].view(dtype).reshape(count)
+
+
+def parse_binary(frame, packets):
+    """
+    Decode the `(offset, length)` `packets` of a binary `frame` to a columnar batch.
+
+    Returns a dict of NumPy arrays as described in the module documentation.
+    """
+    buf = np.frombuffer(frame, dtype=np.uint8)
+    groups = group_packets(packets)
+    total = sum(len(offsets) for offsets in groups.values())
+
+    batch = {
+        "instrument_token": np.empty(total, dtype=np.uint32),
+        "mode": np.empty(total, dtype="<U5"),
+        "tradable": np.empty(total, dtype=bool),
+        "change": np.full(total, np.nan),
+    }
+
+    for column in _price_columns:
+        batch[column] = np.full(total, np.nan)
+
+    for column in _int_columns:
+        batch[column] = np.zeros(total, dtype=np.int64)
+
+    for side in ("buy", "sell"):
+        for column in _depth_columns:
+            if column == "price":
+                batch["depth_{}_{}".format(side, column)] = np.full((total, 5), np.nan)
+            else:
+                batch["depth_{}_{}".format(side, column)] = np.zeros((total, 5), dtype=np.int64)
+
+    start = 0
+    for length in sorted(groups):
+        records = _records(buf, length, groups[length])
+        end = start + len(records)
+        rows = slice(start, end)
+
+        tokens = records["instrument_token"]
+        segment = tokens & 0xff
+        divisor = np.full(len(records), 100.0)
+        for seg, seg_divisor in KiteTicker._segment_divisors.items():
+            divisor[segment == seg] = seg_divisor
+
+        batch["instrument_token"][rows] = tokens
+        batch["mode"][rows] = _packet_modes[length]
+        batch["tradable"][rows] = segment != KiteTicker._segment_indices
+
+        names = records.dtype.names
+        for column in _price_columns:
+            if column in names:
+                batch[column][rows] = records[column] / divisor
+
+        for column in _int_columns:
+            if column in names:
+                batch[column][rows] = records[column]
+
+        if "close" in names:
+            last_price = batch["last_price"][rows]
+            close = batch["close"][rows]
+            # Change is 0 when close price is not available, same as the dict ticks
+            with np.errstate(divide="ignore", invalid="ignore"):
+                batch["change"][rows] = np.where(close != 0, (last_price - close) * 100 / close, 0)
+
+        if "depth" in names:
+            depth = records["depth"]
+            for side, levels in (("buy", slice(0, 5)), ("sell", slice(5, 10))):
+                batch["depth_{}_quantity".format(side)][rows] = depth["quantity"][:, levels]
+                batch["depth_{}_price".format(side)][rows] = depth["price"][:, levels] / divisor[:, None]
+                batch["depth_{}_orders".format(side)][rows] = depth["orders"][:, levels]
+
+        start = end
+
+    return batch
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+    conflation.py
+
+    Latest value buffer of ticks for pull based consumers.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import threading
+
+
+class ConflatingBuffer(object):
+    """
+    Thread safe per instrument "latest tick" slots.
+
+    The producer (ticker's reactor thread) only overwrites the slot of every
+    received tick and marks it dirty. Consumers read at their own pace, either
+    the newest tick of a token with `latest()` or all the ticks updated since
+    the previous call with `drain()`. Ticks which are overwritten before they
+    are drained are dropped, so memory is bounded by the number of instruments
+    and a slow consumer always gets the freshest prices instead of a backlog.
+    """
+
+    def __init__(self):
+        """Initialise an empty buffer."""
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+        # Latest tick of every token seen so far
+        self._latest = {}
+        # Ticks updated since the last drain, token -> tick
+        self._dirty = {}
+
+        # Number of ticks received and ticks overwritten before being drained
+        self.updates = 0
+        self.conflated = 0
+
+    def update(self, ticks):
+        """Store a list of ticks, a newer tick of the same token replaces the previous one."""
+        with self._lock:
+            latest = self._latest
+            dirty = self._dirty
+            dirty_count = len(dirty)
+
+            for tick in ticks:
+                token = tick["instrument_token"]
+                latest[token] = tick
+                dirty[token] = tick
+
+            self.updates += len(ticks)
+            self.conflated += len(ticks) - (len(dirty) - dirty_count)
+
+            if dirty:
+                self._updated.notify_all()
+
+    def latest(self, instrument_token):
+        """Newest tick of `instrument_token` or None if nothing has been received yet."""
+        return self._latest.get(instrument_token)
+
+    def drain(self, timeout=0):
+        """
+        Get the newest tick of every token updated since the last drain and clear the dirty flags.
+
+        - `timeout` in seconds to wait for an update if there are none. Defaults to not waiting, `None` waits forever.
+        """
+        with self._lock:
+            if not self._dirty and timeout != 0:
+                self._updated.wait(timeout)
+
+            dirty = self._dirty
+            self._dirty = {}
+
+        return list(dirty.values())
+
+    def pending(self):
+        """Number of tokens updated since the last drain."""
+        return len(self._dirty)
+
+    def clear(self):
+        """Forget all the ticks."""
+        with self._lock:
+            self._latest = {}
+            self._dirty = {}
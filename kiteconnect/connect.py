@@ -7,10 +7,9 @@
     :copyright: (c) 2021 by Zerodha Technology.
     :license: see LICENSE for details.
 """
-from six import StringIO, PY2
+from six import StringIO, PY2, string_types
 from six.moves.urllib.parse import urljoin
 import csv
-import json
 import dateutil.parser
 import hashlib
 import logging
@@ -19,6 +18,10 @@ import requests
 import warnings
 
 from .__version__ import __version__, __title__
+from .codec import get_codec
+from .ratelimit import RateLimiter
+from .historical import HistoricalDownload
+from .cache import CandleCache
 import kiteconnect.exceptions as ex
 
 log = logging.getLogger(__name__)
@@ -176,7 +179,10 @@ class KiteConnect(object):
                  timeout=None,
                  proxies=None,
                  pool=None,
-                 disable_ssl=False):
+                 disable_ssl=False,
+                 codec=None,
+                 rate_limit=False,
+                 candle_cache=None):
         """
         Initialise a new Kite Connect client instance.
 
@@ -198,6 +204,14 @@ class KiteConnect(object):
         - `pool` is manages request pools. It takes a dict of params accepted by HTTPAdapter as described here in [python requests documentation](http://docs.python-requests.org/en/master/api/#requests.adapters.HTTPAdapter)
         - `disable_ssl` disables the SSL verification while making a request.
         If set requests won't throw SSLError if its set to custom `root` url without SSL.
+        - `codec` is the JSON codec to decode responses and encode JSON request bodies with. Either the name of a
+        codec ("json", "orjson", "ujson", "auto" for the fastest installed one) or a `kiteconnect.codec.JSONCodec`.
+        Defaults to the standard library `json`.
+        - `rate_limit`, if set to True, makes requests wait for their turn under the per second limits of Kite Connect
+        instead of failing with 429 `NetworkException`s. Also accepts a `kiteconnect.ratelimit.RateLimiter` with
+        custom limits, which can be shared by clients. Wait times are in `rate_limiter.summary()`.
+        - `candle_cache` is a directory or a `kiteconnect.cache.CandleCache` to cache the candles of `historical_data`
+        on disk, so only the ranges which aren't cached are fetched.
         """
         self.debug = debug
         self.api_key = api_key
@@ -209,6 +223,15 @@ class KiteConnect(object):
         self.root = root or self._default_root_uri
         self.timeout = timeout or self._default_timeout
 
+        # JSON codec of responses and JSON request bodies
+        self.codec = get_codec(codec)
+
+        # Client side rate limits by route group
+        self.rate_limiter = RateLimiter() if rate_limit is True else (rate_limit or None)
+
+        # On disk cache of historical candles
+        self.candle_cache = CandleCache(candle_cache) if isinstance(candle_cache, string_types) else candle_cache
+
         # Create requests session by default
         # Same session to be used by pool connections
         self.reqsession = requests.Session()
@@ -260,15 +283,22 @@ class KiteConnect(object):
         - `request_token` is the token obtained from the GET paramers after a successful login redirect.
         - `api_secret` is the API api_secret issued with the API key.
         """
-        h = hashlib.sha256(self.api_key.encode("utf-8") + request_token.encode("utf-8") + api_secret.encode("utf-8"))
+        return self._set_session(
+            self._post("api.token", params=self._token_params("request_token", request_token, api_secret)))
+
+    def _token_params(self, key, token, api_secret):
+        """Parameters of a token exchange, with the checksum of the `api_key`, token and `api_secret`."""
+        h = hashlib.sha256(self.api_key.encode("utf-8") + token.encode("utf-8") + api_secret.encode("utf-8"))
         checksum = h.hexdigest()
 
-        resp = self._post("api.token", params={
+        return {
             "api_key": self.api_key,
-            "request_token": request_token,
+            key: token,
             "checksum": checksum
-        })
+        }
 
+    def _set_session(self, resp):
+        """Set the access token of a session response and parse its login time."""
         if "access_token" in resp:
             self.set_access_token(resp["access_token"])
 
@@ -296,15 +326,11 @@ class KiteConnect(object):
         - `refresh_token` is the token obtained from previous successful login flow.
         - `api_secret` is the API api_secret issued with the API key.
         """
-        h = hashlib.sha256(self.api_key.encode("utf-8") + refresh_token.encode("utf-8") + api_secret.encode("utf-8"))
-        checksum = h.hexdigest()
-
-        resp = self._post("api.token.renew", params={
-            "api_key": self.api_key,
-            "refresh_token": refresh_token,
-            "checksum": checksum
-        })
+        return self._renew_session(
+            self._post("api.token.renew", params=self._token_params("refresh_token", refresh_token, api_secret)))
 
+    def _renew_session(self, resp):
+        """Set the access token of a renewed session response."""
         if "access_token" in resp:
             self.set_access_token(resp["access_token"])
 
@@ -365,9 +391,9 @@ class KiteConnect(object):
             if params[k] is None:
                 del (params[k])
 
-        return self._post("order.place",
-                          url_args={"variety": variety},
-                          params=params)["order_id"]
+        return self._order_id(self._post("order.place",
+                                         url_args={"variety": variety},
+                                         params=params))
 
     def place_autoslice_order(self,
                               variety,
@@ -431,20 +457,23 @@ class KiteConnect(object):
             if params[k] is None:
                 del (params[k])
 
-        return self._put("order.modify",
-                         url_args={"variety": variety, "order_id": order_id},
-                         params=params)["order_id"]
+        return self._order_id(self._put("order.modify",
+                                        url_args={"variety": variety, "order_id": order_id},
+                                        params=params))
 
     def cancel_order(self, variety, order_id, parent_order_id=None):
         """Cancel an order."""
-        return self._delete("order.cancel",
-                            url_args={"variety": variety, "order_id": order_id},
-                            params={"parent_order_id": parent_order_id})["order_id"]
+        return self._order_id(self._delete("order.cancel",
+                                           url_args={"variety": variety, "order_id": order_id},
+                                           params={"parent_order_id": parent_order_id}))
 
     def exit_order(self, variety, order_id, parent_order_id=None):
         """Exit a CO order."""
         return self.cancel_order(variety, order_id, parent_order_id=parent_order_id)
 
+    def _order_id(self, data):
+        return data["order_id"]
+
     def _format_response(self, data):
         """Parse and format responses."""
 
@@ -624,13 +653,19 @@ class KiteConnect(object):
 
         - `instruments` is a list of instruments, Instrument are in the format of `exchange:tradingsymbol`. For example NSE:INFY
         """
+        return self._format_quote(self._get("market.quote", params={"i": self._instruments_param(instruments)}))
+
+    def _instruments_param(self, instruments):
+        """List of instruments from the arguments of `quote()`, `ohlc()` and `ltp()`."""
         ins = list(instruments)
 
         # If first element is a list then accept it as instruments list for legacy reason
         if len(instruments) > 0 and type(instruments[0]) == list:
             ins = instruments[0]
 
-        data = self._get("market.quote", params={"i": ins})
+        return ins
+
+    def _format_quote(self, data):
         return {key: self._format_response(data[key]) for key in data}
 
     def ohlc(self, *instruments):
@@ -639,13 +674,7 @@ class KiteConnect(object):
 
         - `instruments` is a list of instruments, Instrument are in the format of `exchange:tradingsymbol`. For example NSE:INFY
         """
-        ins = list(instruments)
-
-        # If first element is a list then accept it as instruments list for legacy reason
-        if len(instruments) > 0 and type(instruments[0]) == list:
-            ins = instruments[0]
-
-        return self._get("market.quote.ohlc", params={"i": ins})
+        return self._get("market.quote.ohlc", params={"i": self._instruments_param(instruments)})
 
     def ltp(self, *instruments):
         """
@@ -653,13 +682,7 @@ class KiteConnect(object):
 
         - `instruments` is a list of instruments, Instrument are in the format of `exchange:tradingsymbol`. For example NSE:INFY
         """
-        ins = list(instruments)
-
-        # If first element is a list then accept it as instruments list for legacy reason
-        if len(instruments) > 0 and type(instruments[0]) == list:
-            ins = instruments[0]
-
-        return self._get("market.quote.ltp", params={"i": ins})
+        return self._get("market.quote.ltp", params={"i": self._instruments_param(instruments)})
 
     def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
         """
@@ -676,21 +699,54 @@ class KiteConnect(object):
         - `continuous` is a boolean flag to get continuous data for futures and options instruments.
         - `oi` is a boolean flag to get open interest.
         """
+        if self.candle_cache is not None:
+            return self.candle_cache.historical_data(self, instrument_token, from_date, to_date, interval,
+                                                     continuous=continuous, oi=oi)
+
+        return self._historical_data(instrument_token, from_date, to_date, interval, continuous, oi)
+
+    def _historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        """Fetch candles without the candle cache."""
+        return self._format_historical(self._get("market.historical",
+                                                 url_args={"instrument_token": instrument_token, "interval": interval},
+                                                 params=self._historical_params(from_date, to_date, interval,
+                                                                                continuous, oi)))
+
+    def historical_data_range(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False,
+                              workers=4):
+        """
+        Retrieve historical data (candles) for an instrument over a date range of any length.
+
+        The range is split into chunks of the maximum number of days the API returns per request for the interval,
+        which are fetched concurrently under the historical data rate limit and merged, with the client's rate
+        limiter if it has one. The exception of the first chunk which failed is raised, use
+        `kiteconnect.historical.HistoricalDownload` to keep the fetched chunks and resume after failures.
+
+        - `workers` is the number of chunks fetched at once.
+        - The other arguments are the ones of `historical_data`.
+        """
+        if self.candle_cache is not None:
+            return self.candle_cache.historical_data(self, instrument_token, from_date, to_date, interval,
+                                                     continuous=continuous, oi=oi, workers=workers)
+
+        download = HistoricalDownload(self, instrument_token, from_date, to_date, interval,
+                                      continuous=continuous, oi=oi).run(workers=workers)
+        download.raise_for_errors()
+        return download.candles()
+
+    def _historical_params(self, from_date, to_date, interval, continuous, oi):
+        """Query parameters of a historical data request."""
         date_string_format = "%Y-%m-%d %H:%M:%S"
         from_date_string = from_date.strftime(date_string_format) if type(from_date) == datetime.datetime else from_date
         to_date_string = to_date.strftime(date_string_format) if type(to_date) == datetime.datetime else to_date
 
-        data = self._get("market.historical",
-                         url_args={"instrument_token": instrument_token, "interval": interval},
-                         params={
-                             "from": from_date_string,
-                             "to": to_date_string,
-                             "interval": interval,
-                             "continuous": 1 if continuous else 0,
-                             "oi": 1 if oi else 0
-                         })
-
-        return self._format_historical(data)
+        return {
+            "from": from_date_string,
+            "to": to_date_string,
+            "interval": interval,
+            "continuous": 1 if continuous else 0,
+            "oi": 1 if oi else 0
+        }
 
     def _format_historical(self, data):
         records = []
@@ -784,8 +840,8 @@ class KiteConnect(object):
         condition, gtt_orders = self._get_gtt_payload(trigger_type, tradingsymbol, exchange, trigger_values, last_price, orders)
 
         return self._post("gtt.place", params={
-            "condition": json.dumps(condition),
-            "orders": json.dumps(gtt_orders),
+            "condition": self.codec.encode(condition).decode("utf-8"),
+            "orders": self.codec.encode(gtt_orders).decode("utf-8"),
             "type": trigger_type})
 
     def modify_gtt(
@@ -809,8 +865,8 @@ class KiteConnect(object):
         return self._put("gtt.modify",
                          url_args={"trigger_id": trigger_id},
                          params={
-                             "condition": json.dumps(condition),
-                             "orders": json.dumps(gtt_orders),
+                             "condition": self.codec.encode(condition).decode("utf-8"),
+                             "orders": self.codec.encode(gtt_orders).decode("utf-8"),
                              "type": trigger_type})
 
     def delete_gtt(self, trigger_id):
@@ -925,6 +981,30 @@ class KiteConnect(object):
 
     def _request(self, route, method, url_args=None, params=None, is_json=False, query_params=None):
         """Make an HTTP request."""
+        url, headers, query_params, data = self._prepare_request(route, method, url_args=url_args, params=params,
+                                                                 is_json=is_json, query_params=query_params)
+
+        if self.rate_limiter:
+            self.rate_limiter.acquire(route)
+
+        try:
+            r = self.reqsession.request(method,
+                                        url,
+                                        data=data,
+                                        params=query_params,
+                                        headers=headers,
+                                        verify=not self.disable_ssl,
+                                        allow_redirects=True,
+                                        timeout=self.timeout,
+                                        proxies=self.proxies)
+        # Any requests lib related exceptions are raised here - https://requests.readthedocs.io/en/latest/api/#exceptions
+        except Exception as e:
+            raise e
+
+        return self._parse_response(r.status_code, r.headers["content-type"], r.content)
+
+    def _prepare_request(self, route, method, url_args=None, params=None, is_json=False, query_params=None):
+        """URL, headers, query params and body of an HTTP request."""
         # Form a restful URL
         if url_args:
             uri = self._routes[route].format(**url_args)
@@ -951,46 +1031,44 @@ class KiteConnect(object):
         if method in ["GET", "DELETE"]:
             query_params = params
 
-        try:
-            r = self.reqsession.request(method,
-                                        url,
-                                        json=params if (method in ["POST", "PUT"] and is_json) else None,
-                                        data=params if (method in ["POST", "PUT"] and not is_json) else None,
-                                        params=query_params,
-                                        headers=headers,
-                                        verify=not self.disable_ssl,
-                                        allow_redirects=True,
-                                        timeout=self.timeout,
-                                        proxies=self.proxies)
-        # Any requests lib related exceptions are raised here - https://requests.readthedocs.io/en/latest/api/#exceptions
-        except Exception as e:
-            raise e
+        # Form data or a JSON body encoded with the codec
+        data = None
+        if method in ["POST", "PUT"]:
+            if is_json:
+                data = self.codec.encode(params) if params is not None else None
+                headers["Content-Type"] = "application/json"
+            else:
+                data = params
+
+        return url, headers, query_params, data
 
+    def _parse_response(self, status_code, content_type, content):
+        """Parse the body of an HTTP response, raising the `kiteconnect.exceptions` of API errors."""
         if self.debug:
-            log.debug("Response: {code} {content}".format(code=r.status_code, content=r.content))
+            log.debug("Response: {code} {content}".format(code=status_code, content=content))
 
         # Validate the content type.
-        if "json" in r.headers["content-type"]:
+        if "json" in content_type:
             try:
-                data = r.json()
+                data = self.codec.decode(content)
             except ValueError:
                 raise ex.DataException("Couldn't parse the JSON response received from the server: {content}".format(
-                    content=r.content))
+                    content=content))
 
             # api error
             if data.get("status") == "error" or data.get("error_type"):
                 # Call session hook if its registered and TokenException is raised
-                if self.session_expiry_hook and r.status_code == 403 and data["error_type"] == "TokenException":
+                if self.session_expiry_hook and status_code == 403 and data["error_type"] == "TokenException":
                     self.session_expiry_hook()
 
                 # native Kite errors
                 exp = getattr(ex, data.get("error_type"), ex.GeneralException)
-                raise exp(data["message"], code=r.status_code)
+                raise exp(data["message"], code=status_code)
 
             return data["data"]
-        elif "csv" in r.headers["content-type"]:
-            return r.content
+        elif "csv" in content_type:
+            return content
         else:
             raise ex.DataException("Unknown Content-Type ({content_type}) with response: ({content})".format(
-                content_type=r.headers["content-type"],
-                content=r.content))
+                content_type=content_type,
+                content=content))
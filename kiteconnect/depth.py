@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+    depth.py
+
+    Per instrument market depth state updated in place from full mode packets.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+from .ticks import DepthLevel
+from .packets import struct_full
+
+# Names of the first 16 fields of a full mode packet (`kiteconnect.packets.struct_full`)
+FIELDS = (
+    "instrument_token",
+    "last_price",
+    "last_traded_quantity",
+    "average_traded_price",
+    "volume_traded",
+    "total_buy_quantity",
+    "total_sell_quantity",
+    "open",
+    "high",
+    "low",
+    "close",
+    "last_trade_time",
+    "oi",
+    "oi_day_high",
+    "oi_day_low",
+    "exchange_timestamp"
+)
+
+_depth_start = len(FIELDS)
+# (side, index) of the ten depth entries in the order they're in the packet
+_levels = tuple(("buy", i) for i in range(5)) + tuple(("sell", i) for i in range(5))
+
+
+def _field(index, price=False):
+    """Property which reads a field of the packet, prices are divided by the segment's divisor."""
+    if price:
+        def getter(self):
+            return None if self._values is None else self._values[index] / self._divisor
+    else:
+        def getter(self):
+            return None if self._values is None else self._values[index]
+
+    getter.__name__ = FIELDS[index]
+    return property(getter)
+
+
+class MarketDepth(object):
+    """
+    Latest full mode state of an instrument which is updated in place.
+
+    `buy` and `sell` are tuples of five `kiteconnect.ticks.DepthLevel` objects, the same objects
+    are updated by every packet so references to them stay current. Packet fields are attributes
+    with the names of dict tick keys, `open`, `high`, `low` and `close` are flat attributes and
+    `last_trade_time` and `exchange_timestamp` are epoch seconds.
+
+    After every update
+
+    - `changed_fields` is a tuple of names of the fields which changed.
+    - `changed_levels` is a tuple of `(side, index)` of the depth levels which changed,
+        for example `("buy", 0)` for the best bid.
+
+    Both are empty if the packet was identical to the previous one.
+    """
+
+    __slots__ = ("instrument_token", "buy", "sell", "changed_fields", "changed_levels", "updates",
+                 "_values", "_divisor")
+
+    def __init__(self, instrument_token, divisor=100.0):
+        """
+        Initialise an empty depth state.
+
+        - `instrument_token` is the instrument the state is of.
+        - `divisor` is the price divisor of the instrument's segment.
+        """
+        self.instrument_token = instrument_token
+        self.buy = tuple(DepthLevel(0, 0.0, 0) for i in range(5))
+        self.sell = tuple(DepthLevel(0, 0.0, 0) for i in range(5))
+        self.changed_fields = ()
+        self.changed_levels = ()
+
+        # Number of packets applied
+        self.updates = 0
+
+        self._values = None
+        self._divisor = divisor
+
+    last_price = _field(1, price=True)
+    last_traded_quantity = _field(2)
+    average_traded_price = _field(3, price=True)
+    volume_traded = _field(4)
+    total_buy_quantity = _field(5)
+    total_sell_quantity = _field(6)
+    open = _field(7, price=True)
+    high = _field(8, price=True)
+    low = _field(9, price=True)
+    close = _field(10, price=True)
+    last_trade_time = _field(11)
+    oi = _field(12)
+    oi_day_high = _field(13)
+    oi_day_low = _field(14)
+    exchange_timestamp = _field(15)
+
+    def update(self, frame, offset):
+        """
+        Apply the full mode packet at `offset` in `frame`. Returns True if anything changed.
+
+        Fields are compared as the raw integers of the packet and only the depth levels which
+        differ from the previous packet are written, unchanged levels are left untouched.
+        """
+        values = struct_full.unpack_from(frame, offset)
+        previous = self._values
+        self.updates += 1
+
+        if previous == values:
+            self.changed_fields = ()
+            self.changed_levels = ()
+            return False
+
+        if previous is None:
+            changed_fields = FIELDS[1:]
+            changed_levels = range(10)
+        else:
+            changed_fields = tuple(FIELDS[i] for i in range(1, _depth_start) if values[i] != previous[i])
+            changed_levels = []
+            for level in range(10):
+                j = _depth_start + 3 * level
+                if values[j:j + 3] != previous[j:j + 3]:
+                    changed_levels.append(level)
+
+        divisor = self._divisor
+        for level in changed_levels:
+            j = _depth_start + 3 * level
+            entry = self.buy[level] if level < 5 else self.sell[level - 5]
+            entry.quantity = values[j]
+            entry.price = values[j + 1] / divisor
+            entry.orders = values[j + 2]
+
+        self._values = values
+        self.changed_fields = changed_fields
+        self.changed_levels = tuple(_levels[level] for level in changed_levels)
+        return True
+
+    def __repr__(self):
+        return "MarketDepth(instrument_token={}, last_price={}, buy={!r}, sell={!r})".format(
+            self.instrument_token, self.last_price, self.buy, self.sell)
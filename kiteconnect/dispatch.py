@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+    dispatch.py
+
+    Off the event loop dispatch of ticks to user callbacks.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import logging
+import threading
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class TickDispatcher(object):
+    """
+    Hand decoded tick frames to a pool of worker threads through a bounded queue.
+
+    Pass an instance to `KiteTicker(dispatcher=...)` and `on_ticks` (and token
+    callbacks) run on the worker threads instead of the Twisted reactor thread,
+    so heavy handlers don't delay heartbeats. With more than one worker frames
+    may be handled concurrently and out of order.
+
+    When the queue is full the `overflow` policy decides what happens to a new frame:
+
+    - `OVERFLOW_BLOCK` blocks the event loop until a worker frees up space (or `block_timeout`
+        seconds pass, after which the frame is dropped).
+    - `OVERFLOW_DROP_OLDEST` drops the oldest queued frame.
+    - `OVERFLOW_CONFLATE` merges the ticks into the newest queued frame, replacing older ticks of
+        the same instrument token. Not supported with columnar ticks.
+
+    Counters:
+
+    - `queue_depth` - number of frames waiting to be handled.
+    - `max_queue_depth` - highest queue depth seen.
+    - `dispatched` - number of frames handled by the workers.
+    - `dropped` - number of frames dropped on overflow.
+    - `conflated` - number of frames merged into a queued frame on overflow.
+    """
+
+    OVERFLOW_BLOCK = "block"
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_CONFLATE = "conflate"
+
+    def __init__(self, workers=1, maxsize=1000, overflow=OVERFLOW_DROP_OLDEST, block_timeout=None):
+        """
+        Initialise the dispatcher.
+
+        - `workers` is the number of worker threads. Defaults to 1 which keeps frames in order.
+        - `maxsize` is the maximum number of frames waiting in the queue.
+        - `overflow` is the policy on a full queue. One of `OVERFLOW_BLOCK`, `OVERFLOW_DROP_OLDEST`
+            or `OVERFLOW_CONFLATE`.
+        - `block_timeout` in seconds is the maximum time to block with `OVERFLOW_BLOCK`. Defaults to no limit.
+        """
+        if overflow not in (self.OVERFLOW_BLOCK, self.OVERFLOW_DROP_OLDEST, self.OVERFLOW_CONFLATE):
+            raise ValueError("Invalid `overflow` policy: {}".format(overflow))
+
+        if workers < 1 or maxsize < 1:
+            raise ValueError("`workers` and `maxsize` should be at least 1.")
+
+        self.workers = workers
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        # Called with every frame of ticks on a worker thread
+        self.handler = None
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._threads = []
+        self._running = False
+
+        self.max_queue_depth = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    @property
+    def queue_depth(self):
+        """Number of frames waiting to be handled."""
+        return len(self._queue)
+
+    def stats(self):
+        """Get all the counters as a dict."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "conflated": self.conflated
+        }
+
+    def start(self):
+        """Start the worker threads. Called on the first `submit` if not started explicitly."""
+        with self._lock:
+            if self._running:
+                return
+
+            self._running = True
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name="kite-tick-dispatcher-{}".format(i))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, wait=True, timeout=None):
+        """
+        Stop the worker threads once the queued frames are handled.
+
+        - `wait` is a boolean to block until the workers exit.
+        - `timeout` in seconds to wait for each worker.
+        """
+        with self._lock:
+            self._running = False
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            threads = self._threads
+
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join(timeout)
+
+    def submit(self, ticks):
+        """Queue a frame of ticks to be handled by a worker."""
+        if not self._running:
+            self.start()
+
+        with self._lock:
+            queue = self._queue
+
+            if len(queue) >= self.maxsize:
+                if self.overflow == self.OVERFLOW_BLOCK:
+                    # Frames submitted while `stop()` was called would be queued to exited workers
+                    if not self._not_full.wait_for(lambda: len(queue) < self.maxsize or not self._running,
+                                                   self.block_timeout) or not self._running:
+                        self.dropped += 1
+                        return
+                elif self.overflow == self.OVERFLOW_DROP_OLDEST:
+                    queue.popleft()
+                    self.dropped += 1
+                else:
+                    queue.append(self._merge(queue.pop(), ticks))
+                    self.conflated += 1
+                    return
+
+            queue.append(ticks)
+            if len(queue) > self.max_queue_depth:
+                self.max_queue_depth = len(queue)
+
+            self._not_empty.notify()
+
+    def _merge(self, queued, ticks):
+        """Merge `ticks` into the `queued` frame keeping only the newest tick of each token."""
+        merged = {}
+        for tick in queued:
+            merged[tick["instrument_token"]] = tick
+        for tick in ticks:
+            merged[tick["instrument_token"]] = tick
+
+        return list(merged.values())
+
+    def _work(self):
+        queue = self._queue
+
+        while True:
+            with self._lock:
+                while not queue and self._running:
+                    self._not_empty.wait()
+
+                if not queue:
+                    return
+
+                ticks = queue.popleft()
+                self._not_full.notify()
+
+            try:
+                self.handler(ticks)
+            except Exception:
+                log.exception("Error in tick handler.")
+
+            with self._lock:
+                self.dispatched += 1
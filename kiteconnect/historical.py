@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+    historical.py
+
+    Chunked and concurrent historical data downloads.
+
+    The historical data API returns a limited number of days of candles per
+    request depending on the interval. `HistoricalDownload` splits a long date
+    range into chunks the API accepts, fetches them concurrently and merges
+    the candles, keeping the candles of chunks which succeeded so a download
+    can be resumed after failures.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import asyncio
+import datetime
+import logging
+import dateutil.parser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import kiteconnect.exceptions as ex
+from .ratelimit import RateLimiter, TokenBucket
+
+log = logging.getLogger(__name__)
+
+# Historical data rate limit of chunk requests by clients without a rate limiter, shared by all the
+# downloads of the process
+DEFAULT_BUCKET = TokenBucket(dict((group, rate) for group, patterns, rate in RateLimiter.DEFAULT_LIMITS)["historical"])
+
+# Maximum number of days of candles per request by interval
+MAX_DAYS = {
+    "minute": 60,
+    "3minute": 100,
+    "5minute": 100,
+    "10minute": 100,
+    "15minute": 200,
+    "30minute": 200,
+    "60minute": 400,
+    "day": 2000
+}
+
+
+def to_datetime(value):
+    """Datetime of a datetime, a date or a date string."""
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    return dateutil.parser.parse(value)
+
+
+def chunk_range(from_date, to_date, interval):
+    """
+    Split a date range into `(from_date, to_date)` chunks the historical data API accepts for an interval.
+
+    Consecutive chunks share their boundary, candles at boundaries are fetched twice and dropped when merged.
+    """
+    if interval not in MAX_DAYS:
+        raise ex.InputException("Invalid `interval` {}, must be one of {}.".format(
+            interval, ", ".join(sorted(MAX_DAYS))))
+
+    from_date, to_date = to_datetime(from_date), to_datetime(to_date)
+    if from_date > to_date:
+        raise ex.InputException("`from_date` is after `to_date`.")
+
+    span = datetime.timedelta(days=MAX_DAYS[interval])
+    chunks = []
+    start = from_date
+    while True:
+        end = min(start + span, to_date)
+        chunks.append((start, end))
+        if end >= to_date:
+            return chunks
+        start = end
+
+
+def merge_candles(chunks):
+    """Merge lists of candles in date order, dropping the candles of a list which aren't after the previous ones."""
+    merged = []
+    last = None
+    for candles in chunks:
+        for candle in candles:
+            if last is None or candle["date"] > last:
+                merged.append(candle)
+                last = candle["date"]
+
+    return merged
+
+
+class HistoricalDownload(object):
+    """
+    Historical data of an instrument over a long date range, fetched in chunks:
+
+        download = HistoricalDownload(kite, 408065, "2017-01-01", "2022-01-01", "minute").run()
+        if not download.complete:
+            # Fetch the chunks which failed again
+            download.run()
+        candles = download.candles()
+
+    Chunks are fetched by the client without its candle cache. They're rate limited by the client with
+    `rate_limit=True`, or else by `DEFAULT_BUCKET` at the historical data limit of Kite Connect.
+    """
+
+    def __init__(self, kite, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        """
+        Initialise a download.
+
+        - `kite` is a `KiteConnect` or an `AsyncKiteConnect` client.
+        - The other arguments are the ones of `KiteConnect.historical_data`.
+        """
+        self.kite = kite
+        self.instrument_token = instrument_token
+        self.interval = interval
+        self.continuous = continuous
+        self.oi = oi
+
+        # Clients with a rate limiter apply it to every request
+        self.bucket = None if getattr(kite, "rate_limiter", None) else DEFAULT_BUCKET
+
+        self.chunks = chunk_range(from_date, to_date, interval)
+        # Candles and exceptions of chunks which were fetched
+        self.results = {}
+        self.errors = {}
+
+    @property
+    def pending(self):
+        """Chunks which haven't been fetched."""
+        return [chunk for chunk in self.chunks if chunk not in self.results]
+
+    @property
+    def complete(self):
+        """True if every chunk has been fetched."""
+        return len(self.results) == len(self.chunks)
+
+    def _fetch(self, chunk):
+        if self.bucket is not None:
+            self.bucket.acquire()
+        return self._request(chunk)
+
+    def _request(self, chunk):
+        return self.kite._historical_data(self.instrument_token, chunk[0], chunk[1], self.interval,
+                                          continuous=self.continuous, oi=self.oi)
+
+    def _done(self, chunk, candles=None, error=None):
+        if error is not None:
+            log.warning("Fetching candles of {} from {} to {} failed: {}".format(
+                self.instrument_token, chunk[0], chunk[1], error))
+            self.errors[chunk] = error
+        else:
+            self.results[chunk] = candles
+            self.errors.pop(chunk, None)
+
+    def run(self, workers=4, executor=None):
+        """
+        Fetch the pending chunks with threads and return the download.
+
+        - `workers` is the number of chunks fetched at once.
+        - `executor` is an optional `concurrent.futures.Executor` to fetch with, for example to share threads between
+            downloads. `workers` is ignored with an executor.
+
+        Chunks which fail are kept in `errors` and fetched again by the next run.
+        """
+        pending = self.pending
+        if not pending:
+            return self
+
+        owned = executor is None
+        if owned:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        try:
+            futures = dict((executor.submit(self._fetch, chunk), chunk) for chunk in pending)
+            for future in as_completed(futures):
+                error = future.exception()
+                self._done(futures[future], None if error else future.result(), error)
+        finally:
+            if owned:
+                executor.shutdown()
+
+        return self
+
+    async def run_async(self, workers=4):
+        """
+        Fetch the pending chunks with an `AsyncKiteConnect` client and return the download.
+
+        - `workers` is the number of chunks fetched at once.
+        """
+        semaphore = asyncio.Semaphore(workers)
+
+        async def fetch(chunk):
+            async with semaphore:
+                if self.bucket is not None:
+                    await self.bucket.acquire_async()
+                try:
+                    candles = await self._request(chunk)
+                except Exception as e:
+                    self._done(chunk, error=e)
+                else:
+                    self._done(chunk, candles)
+
+        await asyncio.gather(*[fetch(chunk) for chunk in self.pending])
+        return self
+
+    def raise_for_errors(self):
+        """Raise the exception of the first chunk which failed, if any."""
+        for chunk in self.chunks:
+            if chunk in self.errors:
+                raise self.errors[chunk]
+
+    def candles(self):
+        """Candles of the fetched chunks in date order, without duplicates at chunk boundaries."""
+        return merge_candles(self.results[chunk] for chunk in self.chunks if chunk in self.results)
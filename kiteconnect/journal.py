@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+    journal.py
+
+    Append only on-disk journal of ticks with a per instrument index.
+
+    Every packet of a received frame is stored as a variable length record: a
+    14 byte header (receive time in nanoseconds, instrument token and packet
+    length) followed by the raw packet. Records are decoded with the ticker's
+    decoder only when read.
+
+    A sidecar index (`<path>.idx`) maps every time bucket and instrument token to
+    the offsets of its records, so readers memory-map the journal and decode only
+    the records of the requested instrument and time range. Every flush appends
+    the records written since the previous one to the index as a block.
+
+        #!python
+        from kiteconnect import KiteTicker
+        from kiteconnect.journal import TickJournal, TickJournalReader
+
+        journal = TickJournal("ticks-2021-06-01.ktj")
+        kws = KiteTicker("your_api_key", "your_access_token", journal=journal)
+        ...
+        journal.close()
+
+        with TickJournalReader("ticks-2021-06-01.ktj") as reader:
+            for received_at, tick in reader.ticks(408065, start=start_ns, end=end_ns):
+                ...
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import os
+import sys
+import mmap
+import time
+import struct
+import logging
+import threading
+from array import array
+
+from .ticker import KiteTicker
+from .packets import split_packets, struct_token
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"KTJNL\x00\x02\n"
+INDEX_MAGIC = b"KTIDX\x00\x02\n"
+
+# Receive time (ns), instrument token, packet length
+_struct_record = struct.Struct(">QIH")
+# Largest packet, a full mode packet with market depth
+_max_packet = 184
+
+# Bucket width (ns) which follows the index magic
+_struct_index_header = struct.Struct(">Q")
+# Index block of every flush: journal size and number of records it indexes up to, number of
+# (bucket, token) entries and their size in bytes
+_struct_index_block = struct.Struct(">QQII")
+# Bucket, instrument token, number of record offsets which follow
+_struct_index_entry = struct.Struct(">QII")
+
+# Record offsets are stored big endian like the rest of the file
+_swap = sys.byteorder == "little"
+
+_time_ns = getattr(time, "time_ns", lambda: int(time.time() * 1e9))
+
+
+def _index_path(path):
+    return path + ".idx"
+
+
+def _read_index(path):
+    """
+    Read a sidecar index to `(bucket_ns, size, records, end, {bucket: {token: array}})` or None if it's
+    missing or invalid. `size` and `records` are the journal size and number of records indexed, `end`
+    the size of the complete blocks of the index.
+    """
+    try:
+        with open(_index_path(path), "rb") as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+
+    if not data.startswith(INDEX_MAGIC) or len(data) < len(INDEX_MAGIC) + _struct_index_header.size:
+        return None
+
+    offset = len(INDEX_MAGIC)
+    bucket_ns, = _struct_index_header.unpack_from(data, offset)
+    offset += _struct_index_header.size
+
+    size = len(MAGIC)
+    records = 0
+    index = {}
+    # Blocks are appended by flushes, a partially written last block is ignored
+    while offset + _struct_index_block.size <= len(data):
+        block_size, block_records, entries, length = _struct_index_block.unpack_from(data, offset)
+        block_end = offset + _struct_index_block.size + length
+        if block_end > len(data):
+            break
+
+        offset += _struct_index_block.size
+        for i in range(entries):
+            bucket, token, count = _struct_index_entry.unpack_from(data, offset)
+            offset += _struct_index_entry.size
+
+            offsets = array("Q")
+            offsets.frombytes(data[offset:offset + 8 * count])
+            if _swap:
+                offsets.byteswap()
+            offset += 8 * count
+
+            tokens = index.setdefault(bucket, {})
+            if token in tokens:
+                tokens[token].extend(offsets)
+            else:
+                tokens[token] = offsets
+
+        size, records = block_size, block_records
+
+    return bucket_ns, size, records, offset, index
+
+
+class TickJournal(object):
+    """
+    Writer of a tick journal.
+
+    Pass an instance to `KiteTicker(journal=...)` to journal every received frame, or
+    call `append_frame()` directly. The records written since the last flush are appended
+    to the index on `flush()` and `close()`, records which aren't indexed when a journal is
+    reopened are indexed by the next flush. Safe to use from multiple threads.
+    """
+
+    # Default width of index time buckets in seconds
+    BUCKET_SECONDS = 60
+
+    def __init__(self, path, bucket_seconds=BUCKET_SECONDS):
+        """
+        Open a journal for appending, it's created if it doesn't exist.
+
+        - `path` is the path of the journal file, the index is written to `<path>.idx`.
+        - `bucket_seconds` is the width of index time buckets in seconds. Smaller buckets make
+            reads of short time ranges faster at the cost of a larger index.
+        """
+        self.path = path
+        self.bucket_ns = int(bucket_seconds * 1e9)
+
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self._file.close()
+                    raise ValueError("{} is not a tick journal.".format(path))
+
+        # Journal size and number of records, including the ones which aren't flushed
+        self.size = self._file.tell()
+        self.records = 0
+        # Records since the last index block, bucket -> token -> offsets
+        self._pending = {}
+        self._load_index()
+        self._closed = False
+
+    def _load_index(self):
+        """Index the records which the index doesn't cover and drop a partially written last record."""
+        existing = _read_index(self.path)
+        if existing is not None and existing[0] == self.bucket_ns and existing[1] <= self.size:
+            bucket_ns, start, self.records, end, index = existing
+            # Drop a partially written last block
+            with open(_index_path(self.path), "ab") as f:
+                f.truncate(end)
+        else:
+            if self.size > len(MAGIC):
+                log.warning("Rebuilding index of {}".format(self.path))
+            start = len(MAGIC)
+            with open(_index_path(self.path), "wb") as f:
+                f.write(INDEX_MAGIC)
+                f.write(_struct_index_header.pack(self.bucket_ns))
+
+        offset = start
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            while offset + _struct_record.size <= self.size:
+                timestamp, token, packet_length = _struct_record.unpack(f.read(_struct_record.size))
+                if offset + _struct_record.size + packet_length > self.size:
+                    break
+
+                f.seek(packet_length, os.SEEK_CUR)
+                self._add_to_index(offset, timestamp, token)
+                offset += _struct_record.size + packet_length
+
+        if offset != self.size:
+            self._file.truncate(offset)
+            self._file.seek(offset)
+            self.size = offset
+
+    def _add_to_index(self, offset, timestamp, token):
+        tokens = self._pending.get(timestamp // self.bucket_ns)
+        if tokens is None:
+            tokens = self._pending[timestamp // self.bucket_ns] = {}
+
+        offsets = tokens.get(token)
+        if offsets is None:
+            offsets = tokens[token] = array("Q")
+        offsets.append(offset)
+        self.records += 1
+
+    def append_frame(self, frame, timestamp=None):
+        """
+        Append every packet of a binary ticker frame.
+
+        - `frame` is the binary frame as received on the WebSocket.
+        - `timestamp` is the receive time in nanoseconds since epoch. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = _time_ns()
+
+        frame = memoryview(frame)
+        pack = _struct_record.pack
+        unpack_token = struct_token.unpack_from
+
+        records = []
+        packets = []
+        for offset, packet_length in split_packets(frame):
+            if packet_length < 4 or packet_length > _max_packet:
+                continue
+
+            token = unpack_token(frame, offset)[0]
+            packets.append((token, packet_length))
+            records.append(pack(timestamp, token, packet_length))
+            records.append(frame[offset:offset + packet_length])
+
+        if not packets:
+            return 0
+
+        with self._lock:
+            self._file.write(b"".join(records))
+            for token, packet_length in packets:
+                self._add_to_index(self.size, timestamp, token)
+                self.size += _struct_record.size + packet_length
+
+        return len(packets)
+
+    def flush(self):
+        """Write buffered records to disk and append them to the index."""
+        with self._lock:
+            self._file.flush()
+            self._append_index()
+
+    def _append_index(self):
+        entries = 0
+        chunks = []
+        for bucket in sorted(self._pending):
+            for token, offsets in self._pending[bucket].items():
+                if _swap:
+                    offsets.byteswap()
+                chunks.append(_struct_index_entry.pack(bucket, token, len(offsets)))
+                chunks.append(offsets.tobytes())
+                entries += 1
+
+        if not entries:
+            return
+
+        # A single write of the block, readers ignore it until it's complete
+        body = b"".join(chunks)
+        with open(_index_path(self.path), "ab") as f:
+            f.write(_struct_index_block.pack(self.size, self.records, entries, len(body)) + body)
+        self._pending = {}
+
+    def close(self):
+        """Flush and close the journal."""
+        with self._lock:
+            if self._closed:
+                return
+            self._file.flush()
+            self._append_index()
+            self._file.close()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TickJournalReader(object):
+    """
+    Memory-mapped reader of a tick journal.
+
+    Reads only use the index, so a journal which is still being written can be read
+    up to its last `flush()`. With a `lazy_depth` ticker, read the depth of ticks before
+    the reader is closed.
+    """
+
+    def __init__(self, path, ticker=None):
+        """
+        Open a journal for reading.
+
+        - `path` is the path of the journal file.
+        - `ticker` is an optional `KiteTicker` whose decoder options (`tick_format`, `raw_timestamps`,
+            `lazy_depth`) are used to decode the records. Columnar ticks are decoded as dicts.
+        """
+        index = _read_index(path)
+        if index is None:
+            raise ValueError("Missing or invalid index of journal {}".format(path))
+
+        self.path = path
+        self.bucket_ns, self.size, self.records, _, self._index = index
+
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError("{} is not a tick journal.".format(path))
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        # Decoder of the records
+        ticker = ticker or KiteTicker(None, None)
+        if ticker.tick_format == KiteTicker.TICK_FORMAT_OBJECT:
+            self._parse_packet = ticker._parse_packet_object
+        else:
+            self._parse_packet = ticker._parse_packet
+
+    def tokens(self):
+        """Set of instrument tokens in the journal."""
+        tokens = set()
+        for bucket_tokens in self._index.values():
+            tokens.update(bucket_tokens)
+        return tokens
+
+    def record_offsets(self, instrument_token, start=None, end=None):
+        """
+        Offsets of the records of `instrument_token` in buckets which overlap the time range, in order.
+
+        - `start` and `end` are receive times in nanoseconds since epoch, `end` is exclusive.
+        """
+        first = None if start is None else start // self.bucket_ns
+        last = None if end is None else (end - 1) // self.bucket_ns
+
+        offsets = []
+        for bucket in sorted(self._index):
+            if (first is not None and bucket < first) or (last is not None and bucket > last):
+                continue
+
+            bucket_offsets = self._index[bucket].get(instrument_token)
+            if bucket_offsets:
+                offsets.extend(bucket_offsets)
+
+        return offsets
+
+    def ticks(self, instrument_token, start=None, end=None):
+        """
+        Iterate over `(received_at, tick)` of an instrument in the order they were received.
+
+        - `instrument_token` is the instrument to read.
+        - `start` and `end` are receive times in nanoseconds since epoch, `end` is exclusive.
+            Defaults to the whole journal.
+        """
+        view = self._view
+        unpack_record = _struct_record.unpack_from
+        parse_packet = self._parse_packet
+
+        for offset in self.record_offsets(instrument_token, start, end):
+            timestamp, token, packet_length = unpack_record(view, offset)
+
+            if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                continue
+
+            tick = parse_packet(view, offset + _struct_record.size, packet_length)
+            if tick is not None:
+                yield timestamp, tick
+
+    def close(self):
+        """Unmap and close the journal."""
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+    metrics.py
+
+    Latency histograms of the ticker receive path.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import time
+import struct
+import threading
+from array import array
+
+# Values below 2 ** _sub_bits are exact, larger ones fall in buckets of
+# 2 ** (_sub_bits - 1) per power of two, about 6% wide.
+_sub_bits = 5
+_sub_count = 1 << _sub_bits
+_half_count = _sub_count >> 1
+# Largest power of two tracked, about 12 days in microseconds
+_max_bits = 40
+_bucket_count = _sub_count + (_max_bits - _sub_bits + 1) * _half_count
+
+_struct_timestamp = struct.Struct(">I")
+
+
+def _bucket(value):
+    """Index of the bucket of a non negative integer value."""
+    if value < _sub_count:
+        return value
+
+    shift = value.bit_length() - _sub_bits
+    return min(_sub_count + (shift - 1) * _half_count + (value >> shift) - _half_count, _bucket_count - 1)
+
+
+def _bucket_range(index):
+    """Lowest and highest value of a bucket."""
+    if index < _sub_count:
+        return index, index
+
+    shift, mantissa = divmod(index - _sub_count, _half_count)
+    shift += 1
+    mantissa += _half_count
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Histogram(object):
+    """
+    Log bucketed histogram of non negative integer values, in the style of HDR histograms.
+
+    Recording is constant time and memory is fixed, values are kept with about 6% relative
+    precision (exact below 32). Safe to record from multiple threads.
+    """
+
+    def __init__(self, unit="us"):
+        """
+        Initialise an empty histogram.
+
+        - `unit` is a label of the unit of recorded values.
+        """
+        self.unit = unit
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all the recorded values."""
+        with self._lock:
+            self._counts = array("Q", bytes(8 * _bucket_count))
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = None
+
+    def record(self, value):
+        """Record a value, negative values are recorded as 0."""
+        value = int(value) if value > 0 else 0
+
+        with self._lock:
+            self._counts[_bucket(value)] += 1
+            self.count += 1
+            self.total += value
+
+            if self.max is None or value > self.max:
+                self.max = value
+            if self.min is None or value < self.min:
+                self.min = value
+
+    @property
+    def mean(self):
+        """Mean of the recorded values or None."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile):
+        """
+        Value at a percentile or None if nothing is recorded.
+
+        - `percentile` is between 0 and 100.
+
+        The highest value of the bucket the percentile falls in is returned, capped at the maximum value.
+        """
+        if not self.count:
+            return None
+
+        target = max(1, int(round(self.count * percentile / 100.0)))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_range(index)[1], self.max)
+
+        return self.max
+
+    def summary(self):
+        """Count, min, mean, max and common percentiles as a dict."""
+        return {
+            "unit": self.unit,
+            "count": self.count,
+            "min": self.min,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max
+        }
+
+    def __repr__(self):
+        return "Histogram({})".format(self.summary())
+
+
+class TickerMetrics(object):
+    """
+    Latency metrics of a `KiteTicker`, enabled with `KiteTicker(metrics=True)`.
+
+    Histograms
+
+    - `frame_interval` - microseconds between received binary frames. Gaps show stalls in the feed or network.
+    - `decode` - microseconds spent splitting and decoding a frame to ticks.
+    - `on_ticks` - microseconds spent in `on_ticks` and token callbacks per frame, on the thread they run on.
+    - `exchange_lag` - milliseconds between the newest `exchange_timestamp` of a frame and its receive
+        time. Exchange timestamps have a resolution of a second, so lags up to 1000ms are expected and
+        a clock difference with the exchange shifts every value.
+
+    Also `frames`, the number of binary frames received and `last_received`, the epoch receive time of the last one.
+    """
+
+    def __init__(self):
+        """Initialise empty metrics."""
+        self.frame_interval = Histogram("us")
+        self.decode = Histogram("us")
+        self.on_ticks = Histogram("us")
+        self.exchange_lag = Histogram("ms")
+
+        self.frames = 0
+        self.last_received = None
+        self._last_clock = None
+
+        # Monotonic clock for durations
+        self.clock = getattr(time, "perf_counter", time.time)
+
+    def frame_received(self, frame, packets):
+        """
+        Record the arrival of a binary frame.
+
+        - `frame` is the received frame.
+        - `packets` is an iterable of `(offset, length)` of the frame's packets.
+        """
+        now = self.clock()
+        received = time.time()
+
+        if self._last_clock is not None:
+            self.frame_interval.record((now - self._last_clock) * 1e6)
+        self._last_clock = now
+        self.last_received = received
+        self.frames += 1
+
+        # Exchange timestamps are at byte 60 of full mode packets and byte 28 of full mode index packets
+        exchange_timestamp = 0
+        unpack = _struct_timestamp.unpack_from
+        for offset, packet_length in packets:
+            if packet_length == 184:
+                exchange_timestamp = max(exchange_timestamp, unpack(frame, offset + 60)[0])
+            elif packet_length == 32:
+                exchange_timestamp = max(exchange_timestamp, unpack(frame, offset + 28)[0])
+
+        if exchange_timestamp:
+            self.exchange_lag.record((received - exchange_timestamp) * 1e3)
+
+    def reset(self):
+        """Reset all the histograms and counters."""
+        for histogram in (self.frame_interval, self.decode, self.on_ticks, self.exchange_lag):
+            histogram.reset()
+
+        self.frames = 0
+        self.last_received = None
+        self._last_clock = None
+
+    def summary(self):
+        """Summaries of all the histograms as a dict."""
+        return {
+            "frames": self.frames,
+            "frame_interval": self.frame_interval.summary(),
+            "decode": self.decode.summary(),
+            "on_ticks": self.on_ticks.summary(),
+            "exchange_lag": self.exchange_lag.summary()
+        }
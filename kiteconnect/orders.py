@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+    orders.py
+
+    Compact order update objects and the latest state of orders for the kite ticker.
+
+    These are passed to `on_order_update` instead of dicts when `KiteTicker` is
+    initialised with `order_updates=True`. Timestamps are converted to `datetime`
+    like the responses of `KiteConnect.orders()`, and the latest state of every
+    order is kept in an `OrderBook`.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import six
+import threading
+from datetime import datetime
+
+import dateutil.parser
+
+# Fields converted to `datetime`, in the "2021-01-15 10:15:02" format of API responses
+_timestamp_fields = ("order_timestamp", "exchange_timestamp", "exchange_update_timestamp")
+
+# Memoized timestamp conversions, updates of a burst mostly share the same seconds
+_timestamp_cache = {}
+_timestamp_cache_size = 1024
+
+_fromisoformat = getattr(datetime, "fromisoformat", None)
+
+_missing = object()
+
+
+def parse_timestamp(value):
+    """
+    Convert an order timestamp to a `datetime`.
+
+    Strings of the fixed 19 character format are converted like `KiteConnect._format_response`,
+    other values (including `datetime` objects) are returned as they are.
+    """
+    if not isinstance(value, six.string_types) or len(value) != 19:
+        return value
+
+    try:
+        return _timestamp_cache[value]
+    except (KeyError, TypeError):
+        pass
+
+    try:
+        if _fromisoformat is not None:
+            timestamp = _fromisoformat(value)
+        else:
+            timestamp = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                 int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except (ValueError, TypeError):
+        # Anything else which looks like a timestamp
+        timestamp = dateutil.parser.parse(value)
+
+    if len(_timestamp_cache) >= _timestamp_cache_size:
+        _timestamp_cache.clear()
+
+    _timestamp_cache[value] = timestamp
+    return timestamp
+
+
+def _convert_timestamps(fields):
+    """Convert the timestamps of an order update dict in place."""
+    for key in _timestamp_fields:
+        value = fields.get(key)
+        if value:
+            # Inlined memoized lookup of `parse_timestamp`, hashable non strings aren't in the cache
+            try:
+                fields[key] = _timestamp_cache[value]
+            except (KeyError, TypeError):
+                fields[key] = parse_timestamp(value)
+
+
+class OrderUpdate(object):
+    """
+    An order update received on the ticker connection.
+
+    Fields are the same as the keys of the order update dicts and are read as attributes
+    (`update.status`) or keys (`update["status"]`). Fields missing from the update are `None`
+    as attributes. Fields unknown to this version of the library are also in `extra`.
+
+    The fields are kept in the decoded dict itself, only the timestamps are converted.
+    """
+
+    __slots__ = ("_data",)
+
+    _fields = (
+        "account_id",
+        "placed_by",
+        "order_id",
+        "exchange_order_id",
+        "parent_order_id",
+        "status",
+        "status_message",
+        "status_message_raw",
+        "order_timestamp",
+        "exchange_update_timestamp",
+        "exchange_timestamp",
+        "variety",
+        "exchange",
+        "tradingsymbol",
+        "instrument_token",
+        "order_type",
+        "transaction_type",
+        "validity",
+        "product",
+        "quantity",
+        "disclosed_quantity",
+        "price",
+        "trigger_price",
+        "average_price",
+        "filled_quantity",
+        "pending_quantity",
+        "unfilled_quantity",
+        "cancelled_quantity",
+        "market_protection",
+        "meta",
+        "tag",
+        "guid",
+        "checksum"
+    )
+    _field_set = frozenset(_fields)
+
+    def __init__(self, data=None):
+        """
+        Initialise from an order update dict.
+
+        - `data` is the `data` of an `order` text message.
+        """
+        self._data = dict(data) if data else {}
+        _convert_timestamps(self._data)
+
+    def update(self, data):
+        """Set the fields of an order update dict, converting timestamps."""
+        self._data.update(data)
+        _convert_timestamps(self._data)
+
+    def __getattr__(self, name):
+        # Only reached for names which aren't slots or methods
+        value = self._data.get(name, _missing)
+        if value is _missing:
+            if name in self._field_set:
+                return None
+            raise AttributeError(name)
+        return value
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Get a field value or `default` if it's not set."""
+        return self._data.get(key, default)
+
+    @property
+    def extra(self):
+        """Dict of the fields unknown to this version of the library or None if there are none."""
+        extra = dict((k, v) for k, v in self._data.items() if k not in self._field_set)
+        return extra or None
+
+    def keys(self):
+        """List of fields which are set."""
+        return list(self._data)
+
+    def to_dict(self):
+        """Convert to an order update dict, with converted timestamps."""
+        return dict(self._data)
+
+    def copy(self):
+        """A shallow copy of the update."""
+        other = OrderUpdate()
+        other._data.update(self._data)
+        return other
+
+    def merge(self, other):
+        """Set the fields of another `OrderUpdate` which are set on it."""
+        self._data.update(other._data)
+
+    def __eq__(self, other):
+        if isinstance(other, OrderUpdate):
+            other = other._data
+        return self._data == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "OrderUpdate({})".format(self._data)
+
+
+class OrderBook(object):
+    """
+    Latest state of orders, updated in place from order updates.
+
+    Every order has a single `OrderUpdate` which later updates of the order are merged into,
+    so references to it always see the latest state. Updates with an `exchange_update_timestamp`
+    older than the one already seen for the order arrive out of order and are ignored.
+    Safe to read from other threads.
+    """
+
+    def __init__(self):
+        self._orders = {}
+        self._lock = threading.Lock()
+
+        # Number of updates ignored for arriving out of order
+        self.stale = 0
+
+    def update(self, data):
+        """
+        Merge an order update into the state of its order and return the state.
+
+        - `data` is an order update dict or an `OrderUpdate`.
+
+        Returns None if the update is older than the state.
+        """
+        is_dict = isinstance(data, dict)
+        order_id = data.get("order_id")
+
+        with self._lock:
+            state = self._orders.get(order_id)
+            if state is None:
+                state = self._orders[order_id] = OrderUpdate(data) if is_dict else data.copy()
+                return state
+
+            # Empty timestamps are missing and other formats can't be compared
+            current = data.get("exchange_update_timestamp")
+            if current:
+                current = parse_timestamp(current)
+                previous = state._data.get("exchange_update_timestamp")
+                if isinstance(current, datetime) and isinstance(previous, datetime) and current < previous:
+                    self.stale += 1
+                    return None
+
+            if is_dict:
+                state.update(data)
+            else:
+                state.merge(data)
+            return state
+
+    def get(self, order_id, default=None):
+        """Latest state of an order or `default` if no update was received for it."""
+        return self._orders.get(order_id, default)
+
+    def __getitem__(self, order_id):
+        return self._orders[order_id]
+
+    def __contains__(self, order_id):
+        return order_id in self._orders
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __iter__(self):
+        return iter(self.orders())
+
+    def orders(self):
+        """List of the latest states of all the orders."""
+        with self._lock:
+            return list(self._orders.values())
+
+    def clear(self):
+        """Forget all the orders."""
+        with self._lock:
+            self._orders.clear()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+    packets.py
+
+    Precompiled big-endian layouts of kite ticker binary packets, shared by
+    the ticker and the modules which decode parts of full mode packets.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import struct
+
+# Number of packets in a frame and length of every packet
+struct_short = struct.Struct(">H")
+# Instrument token which leads every packet
+struct_token = struct.Struct(">I")
+# 8 - token, last price
+struct_ltp = struct.Struct(">II")
+# 28 - token, last price, high, low, open, close, (price change)
+struct_index_quote = struct.Struct(">6I4x")
+# 32 - index quote followed by exchange timestamp
+struct_index_full = struct.Struct(">6I4xI")
+# 44 - token, last price, last traded quantity, average price, volume,
+# buy quantity, sell quantity, open, high, low, close
+struct_quote = struct.Struct(">11I")
+# 184 - quote followed by last trade time, oi, oi day high, oi day low,
+# exchange timestamp and ten depth entries of (quantity, price, orders, padding)
+struct_full = struct.Struct(">16I" + "IIH2x" * 10)
+# 184 - first 64 bytes (without depth) for lazy depth ticks
+struct_full_head = struct.Struct(">16I")
+# Ten depth entries of a full mode packet, which start after its head
+struct_depth = struct.Struct(">" + "IIH2x" * 10)
+depth_offset = struct_full_head.size
+
+
+def split_packets(frame):
+    """
+    Split a binary frame to its packets.
+
+    Yields an `(offset, length)` pair for every packet in the frame (bytes or memoryview)
+    instead of copying the packets out.
+    """
+    # Ignore heartbeat data.
+    if len(frame) < 2:
+        return
+
+    unpack_short = struct_short.unpack_from
+    frame_length = len(frame)
+
+    number_of_packets = unpack_short(frame, 0)[0]
+
+    j = 2
+    for i in range(number_of_packets):
+        # Ignore a truncated trailing packet
+        if j + 2 > frame_length:
+            return
+
+        packet_length = unpack_short(frame, j)[0]
+        if j + 2 + packet_length > frame_length:
+            return
+
+        yield j + 2, packet_length
+        j = j + 2 + packet_length
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+    pool.py
+
+    Multiple kite ticker connections behind a single subscription interface.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import logging
+from collections import OrderedDict
+
+from .ticker import KiteTicker, reactor
+from .orders import OrderBook
+
+log = logging.getLogger(__name__)
+
+
+class KiteTickerPool(object):
+    """
+    Shard instrument subscriptions across several `KiteTicker` connections.
+
+    A single WebSocket connection can subscribe to a limited number of instruments.
+    The pool spreads subscribed tokens over `connections` tickers which share one
+    Twisted reactor, and merges the ticks of all of them into one `on_ticks` stream.
+
+        #!python
+        from kiteconnect import KiteTickerPool
+
+        pool = KiteTickerPool("your_api_key", "your_access_token", connections=3)
+
+        def on_ticks(pool, ticks):
+            logging.debug("Ticks: {}".format(ticks))
+
+        pool.on_ticks = on_ticks
+        pool.subscribe(tokens)
+        pool.set_mode(pool.MODE_FULL, tokens)
+        pool.connect()
+
+    Subscriptions can be made before or after connecting. Every connection sends
+    its own tokens as soon as it opens and again after a reconnect.
+
+    When unsubscribing leaves the connections unevenly loaded by more than
+    `rebalance_threshold` tokens, tokens are moved (with their modes) from the
+    busiest connections to the idle ones.
+
+    Callbacks
+    ---------
+    - `on_ticks(pool, ticks)` - Ticks received on any of the connections.
+    - `on_order_update(pool, data)` - Order updates. Every connection of the same user receives them, they're
+        forwarded from whichever connection receives an update first and its copies on the other connections
+        are dropped, so updates keep arriving while a connection reconnects.
+    - `on_connect(pool, ticker, response)`, `on_close(pool, ticker, code, reason)`,
+        `on_error(pool, ticker, code, reason)`, `on_reconnect(pool, ticker, attempts_count)` and
+        `on_noreconnect(pool, ticker)` - Same as `KiteTicker` callbacks along with the connection (`ticker`).
+    """
+
+    # Maximum number of instruments a single connection can subscribe to
+    MAX_TOKENS_PER_CONNECTION = 3000
+    # Imbalance between connections (in tokens) after which tokens are moved
+    REBALANCE_THRESHOLD = 100
+    # Number of recent order updates remembered to drop their copies from the other connections
+    ORDER_UPDATES_SEEN = 1000
+    # Fields which identify an order update
+    _order_update_fields = ("order_id", "status", "status_message", "quantity", "filled_quantity",
+                            "pending_quantity", "cancelled_quantity", "price", "trigger_price", "average_price",
+                            "order_timestamp", "exchange_update_timestamp")
+
+    # `KiteTicker` arguments which can't be shared by the connections
+    _unshared_kwargs = ("dispatcher", "record")
+
+    MODE_FULL = KiteTicker.MODE_FULL
+    MODE_QUOTE = KiteTicker.MODE_QUOTE
+    MODE_LTP = KiteTicker.MODE_LTP
+
+    def __init__(self, api_key, access_token, connections=3, max_tokens_per_connection=MAX_TOKENS_PER_CONNECTION,
+                 rebalance_threshold=REBALANCE_THRESHOLD, **kwargs):
+        """
+        Initialise the pool of ticker connections.
+
+        - `api_key` is the API key issued to you
+        - `access_token` is the token obtained after the login flow.
+        - `connections` is the number of WebSocket connections to shard the subscriptions on.
+        - `max_tokens_per_connection` is the maximum number of tokens subscribed on a single connection.
+        - `rebalance_threshold` is the difference in tokens between the busiest and the idlest connection
+            after which tokens are rebalanced.
+        - `kwargs` are passed on to every `KiteTicker`, for example `reconnect_max_tries` or `tick_format`.
+            `dispatcher` and `record` are per connection and not supported. With `order_updates=True` the
+            connections share one `kiteconnect.orders.OrderBook`, which is kept in `orders`.
+        """
+        if connections < 1:
+            raise ValueError("`connections` should be at least 1.")
+
+        for name in self._unshared_kwargs:
+            if kwargs.get(name) is not None:
+                raise ValueError("`{}` is per connection and not supported by `KiteTickerPool`.".format(name))
+
+        self.orders = kwargs.get("order_updates")
+        if self.orders is not None and not isinstance(self.orders, OrderBook):
+            self.orders = OrderBook() if self.orders else None
+        kwargs["order_updates"] = self.orders
+
+        # Recently forwarded order updates
+        self._order_updates_seen = OrderedDict()
+
+        self.max_tokens_per_connection = max_tokens_per_connection
+        self.rebalance_threshold = rebalance_threshold
+
+        self.tickers = [KiteTicker(api_key, access_token, **kwargs) for i in range(connections)]
+
+        # Token -> index of the ticker its subscribed on
+        self._assignments = {}
+
+        # Placeholders for callbacks.
+        self.on_ticks = None
+        self.on_order_update = None
+        self.on_connect = None
+        self.on_close = None
+        self.on_error = None
+        self.on_reconnect = None
+        self.on_noreconnect = None
+
+        for index, ticker in enumerate(self.tickers):
+            self._register_callbacks(index, ticker)
+
+    def _register_callbacks(self, index, ticker):
+        def on_ticks(ws, ticks):
+            if self.on_ticks:
+                self.on_ticks(self, ticks)
+
+        def on_order_update(ws, data):
+            if self.on_order_update and self._is_new_order_update(data):
+                self.on_order_update(self, data)
+
+        def on_connect(ws, response):
+            if self.on_connect:
+                self.on_connect(self, ws, response)
+
+        def on_close(ws, code, reason):
+            if self.on_close:
+                self.on_close(self, ws, code, reason)
+
+        def on_error(ws, code, reason):
+            if self.on_error:
+                self.on_error(self, ws, code, reason)
+
+        def on_reconnect(ws, attempts_count):
+            if self.on_reconnect:
+                self.on_reconnect(self, ws, attempts_count)
+
+        def on_noreconnect(ws):
+            if self.on_noreconnect:
+                self.on_noreconnect(self, ws)
+
+        ticker.on_ticks = on_ticks
+        ticker.on_order_update = on_order_update
+        ticker.on_connect = on_connect
+        ticker.on_close = on_close
+        ticker.on_error = on_error
+        ticker.on_reconnect = on_reconnect
+        ticker.on_noreconnect = on_noreconnect
+
+    def _is_new_order_update(self, data):
+        """True if an order update wasn't already received on another connection."""
+        key = tuple(data.get(field) for field in self._order_update_fields)
+        seen = self._order_updates_seen
+        if key in seen:
+            return False
+
+        seen[key] = True
+        if len(seen) > self.ORDER_UPDATES_SEEN:
+            seen.popitem(last=False)
+        return True
+
+    @property
+    def subscribed_tokens(self):
+        """Dict of all subscribed tokens and their modes across connections."""
+        tokens = {}
+        for ticker in self.tickers:
+            tokens.update(ticker.subscribed_tokens)
+        return tokens
+
+    def ticker_for(self, instrument_token):
+        """Get the `KiteTicker` connection an instrument token is subscribed on, or None."""
+        index = self._assignments.get(instrument_token)
+        return None if index is None else self.tickers[index]
+
+    def connect(self, threaded=False, disable_ssl_verification=False, proxy=None):
+        """
+        Establish all the websocket connections on a single reactor.
+
+        Arguments are the same as `KiteTicker.connect`.
+        """
+        for ticker in self.tickers:
+            ticker._connect(disable_ssl_verification=disable_ssl_verification, proxy=proxy)
+
+        self.tickers[0]._run_reactor(threaded=threaded)
+
+    def is_connected(self):
+        """Check if all the WebSocket connections are established."""
+        return all(ticker.is_connected() for ticker in self.tickers)
+
+    def close(self, code=None, reason=None):
+        """Close all the WebSocket connections."""
+        for ticker in self.tickers:
+            ticker.close(code, reason)
+
+    def stop(self):
+        """Stop the event loop shared by the connections."""
+        reactor.stop()
+
+    def stop_retry(self):
+        """Stop auto retry of all the connections."""
+        for ticker in self.tickers:
+            if getattr(ticker, "factory", None):
+                ticker.stop_retry()
+
+    def subscribe(self, instrument_tokens):
+        """
+        Subscribe to a list of instrument_tokens, spread over the connections with the fewest tokens.
+
+        - `instrument_tokens` is list of instrument instrument_tokens to subscribe
+        """
+        loads = self._loads()
+        new_tokens = [t for t in dict.fromkeys(instrument_tokens) if t not in self._assignments]
+
+        if sum(loads) + len(new_tokens) > self.max_tokens_per_connection * len(self.tickers):
+            raise ValueError("Can not subscribe to more than {} tokens with {} connections.".format(
+                self.max_tokens_per_connection * len(self.tickers), len(self.tickers)))
+
+        shards = {}
+        for token in new_tokens:
+            index = loads.index(min(loads))
+            loads[index] += 1
+            shards.setdefault(index, []).append(token)
+
+        for index, tokens in shards.items():
+            self._subscribe(index, tokens)
+
+        return True
+
+    def unsubscribe(self, instrument_tokens):
+        """
+        Unsubscribe the given list of instrument_tokens and rebalance connections if required.
+
+        - `instrument_tokens` is list of instrument_tokens to unsubscribe.
+        """
+        for index, tokens in self._group(instrument_tokens).items():
+            self._unsubscribe(index, tokens)
+
+        self.rebalance()
+        return True
+
+    def set_mode(self, mode, instrument_tokens):
+        """
+        Set streaming mode for the given list of tokens on the connections they're subscribed on.
+
+        - `mode` is the mode to set. It can be one of the following class constants:
+            MODE_LTP, MODE_QUOTE, or MODE_FULL.
+        - `instrument_tokens` is list of instrument tokens on which the mode should be applied
+        """
+        for index, tokens in self._group(instrument_tokens).items():
+            self.tickers[index].set_mode(mode, tokens)
+
+        return True
+
+    def rebalance(self, threshold=None):
+        """
+        Move tokens from the busiest to the idlest connections when they differ by more than `threshold` tokens.
+
+        - `threshold` defaults to `rebalance_threshold`.
+        """
+        threshold = self.rebalance_threshold if threshold is None else threshold
+        loads = self._loads()
+
+        if max(loads) - min(loads) <= threshold:
+            return
+
+        # Even share of tokens per connection, the first `extra` connections take one more
+        share, extra = divmod(sum(loads), len(loads))
+        targets = [share + (1 if i < extra else 0) for i in range(len(loads))]
+        # Busiest connections keep the larger share so fewer tokens move
+        order = sorted(range(len(loads)), key=lambda i: -loads[i])
+        targets = dict(zip(order, sorted(targets, reverse=True)))
+
+        moves = []
+        for index in order:
+            surplus = loads[index] - targets[index]
+            if surplus > 0:
+                tokens = list(self.tickers[index].subscribed_tokens)[-surplus:]
+                modes = dict((t, self.tickers[index].subscribed_tokens[t]) for t in tokens)
+                self._unsubscribe(index, tokens)
+                moves.append(modes)
+
+        pending = {}
+        for modes in moves:
+            pending.update(modes)
+        pending = list(pending.items())
+
+        for index in order[::-1]:
+            deficit = targets[index] - self._loads()[index]
+            if deficit > 0 and pending:
+                chunk, pending = pending[:deficit], pending[deficit:]
+                self._subscribe(index, [t for t, _ in chunk])
+
+                by_mode = {}
+                for token, mode in chunk:
+                    if mode != KiteTicker.MODE_QUOTE:
+                        by_mode.setdefault(mode, []).append(token)
+                for mode, tokens in by_mode.items():
+                    self.set_mode(mode, tokens)
+
+        if self.tickers[0].debug:
+            log.debug("Rebalanced ticker connections from {} to {}".format(loads, self._loads()))
+
+    def _loads(self):
+        return [len(ticker.subscribed_tokens) for ticker in self.tickers]
+
+    def _group(self, instrument_tokens):
+        """Group subscribed tokens by the index of their connection."""
+        shards = {}
+        for token in instrument_tokens:
+            index = self._assignments.get(token)
+            if index is not None:
+                shards.setdefault(index, []).append(token)
+        return shards
+
+    def _subscribe(self, index, tokens):
+        for token in tokens:
+            self._assignments[token] = index
+
+        # Sent right away or when the connection opens
+        self.tickers[index].subscribe(tokens)
+
+    def _unsubscribe(self, index, tokens):
+        for token in tokens:
+            self._assignments.pop(token, None)
+
+        self.tickers[index].unsubscribe(tokens)
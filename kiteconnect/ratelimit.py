@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+    ratelimit.py
+
+    Client side rate limiting of API requests.
+
+    Kite Connect limits the number of requests per second by endpoint (quotes,
+    historical candles, orders and everything else) and rejects requests over
+    the limit with a 429 `NetworkException`. `KiteConnect(rate_limit=True)` makes
+    requests wait for their turn instead, so a client gets the highest allowed
+    throughput without rejected requests.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import time
+import asyncio
+import fnmatch
+import threading
+
+from .metrics import Histogram
+
+
+class TokenBucket(object):
+    """
+    Token bucket of `rate` requests per second with bursts of up to `burst` requests.
+
+    Callers reserve the next free slot and wait until it's due, so waiting callers are served in the
+    order they arrived and spread evenly `1 / rate` seconds apart. Safe to use from multiple threads
+    and from coroutines, with `acquire()` and `acquire_async()` respectively.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Initialise a bucket.
+
+        - `rate` is the number of requests allowed per second.
+        - `burst` is the number of requests allowed at once after being idle. Defaults to 1, which spaces all the
+            requests evenly.
+        """
+        if rate <= 0:
+            raise ValueError("`rate` must be positive.")
+        if burst < 1:
+            raise ValueError("`burst` must be at least 1.")
+
+        self.rate = rate
+        self.burst = burst
+        self._interval = 1.0 / rate
+        self._tolerance = (burst - 1) * self._interval
+        # Time at which the next request is due if requests arrived one interval apart
+        self._due = 0
+
+        self._lock = threading.Lock()
+        self.clock = getattr(time, "monotonic", time.time)
+        self.sleep = time.sleep
+
+        # Microseconds requests waited for their turn
+        self.wait = Histogram("us")
+
+    def reserve(self):
+        """Reserve the next slot and return the seconds to wait until it's due."""
+        with self._lock:
+            now = self.clock()
+            due = max(self._due, now)
+            delay = max(0, due - self._tolerance - now)
+            self._due = due + self._interval
+
+        self.wait.record(delay * 1e6)
+        return delay
+
+    def acquire(self):
+        """Block until a request is allowed. Returns the seconds waited."""
+        delay = self.reserve()
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        """Wait on the event loop until a request is allowed. Returns the seconds waited."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class RateLimiter(object):
+    """
+    Token buckets of API routes by route group.
+
+    `limits` is a list of `(group, patterns, rate)` where `patterns` are `fnmatch` patterns of the route names
+    of `KiteConnect._routes` (for example "market.quote*") and `rate` is the number of requests per second. Routes
+    take the first group they match and routes matching no group aren't limited. The default limits are the ones
+    documented by Kite Connect.
+    """
+
+    DEFAULT_LIMITS = [
+        ("quote", ["market.quote*"], 1),
+        ("historical", ["market.historical"], 3),
+        ("order", ["order.*"], 10),
+        ("default", ["*"], 10)
+    ]
+
+    def __init__(self, limits=None, burst=1):
+        """
+        Initialise a limiter.
+
+        - `limits` is a list of `(group, patterns, rate)`. Defaults to `DEFAULT_LIMITS`.
+        - `burst` is the burst size of every bucket.
+        """
+        self.limits = limits or self.DEFAULT_LIMITS
+        self.buckets = dict((group, TokenBucket(rate, burst=burst)) for group, patterns, rate in self.limits)
+
+        # Route -> bucket, resolved on first use
+        self._routes = {}
+
+    def group(self, route):
+        """Name of the group of a route or None if it isn't limited."""
+        for group, patterns, rate in self.limits:
+            for pattern in patterns:
+                if fnmatch.fnmatchcase(route, pattern):
+                    return group
+        return None
+
+    def bucket(self, route):
+        """Token bucket of a route or None if it isn't limited."""
+        try:
+            return self._routes[route]
+        except KeyError:
+            pass
+
+        group = self.group(route)
+        bucket = self._routes[route] = self.buckets[group] if group is not None else None
+        return bucket
+
+    def acquire(self, route):
+        """Block until a request to `route` is allowed. Returns the seconds waited."""
+        bucket = self.bucket(route)
+        return bucket.acquire() if bucket is not None else 0
+
+    async def acquire_async(self, route):
+        """Wait on the event loop until a request to `route` is allowed. Returns the seconds waited."""
+        bucket = self.bucket(route)
+        return await bucket.acquire_async() if bucket is not None else 0
+
+    def summary(self):
+        """Wait time summaries of every group as a dict."""
+        return dict((group, bucket.wait.summary()) for group, bucket in self.buckets.items())
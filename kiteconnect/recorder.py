@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+    recorder.py
+
+    Record raw ticker WebSocket frames and replay them later.
+
+    A recording is a file which starts with `MAGIC`, followed by one record per
+    received frame: a 13 byte header (receive time in nanoseconds since epoch,
+    a binary flag and the payload length, all big endian) and the payload as it
+    was received.
+
+        #!python
+        from kiteconnect import KiteTicker
+        from kiteconnect.recorder import TickReplayer
+
+        # Record every frame of a session
+        kws = KiteTicker("your_api_key", "your_access_token", record="session.ktr")
+
+        # Replay it later without a connection, at twice the original speed
+        kws = KiteTicker("your_api_key", "your_access_token")
+        kws.on_ticks = on_ticks
+        TickReplayer("session.ktr", kws, speed=2).run()
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import time
+import struct
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"KTREC\x00\x01\n"
+
+# Receive time (ns), binary flag, payload length
+_struct_header = struct.Struct(">QBI")
+
+_time_ns = getattr(time, "time_ns", lambda: int(time.time() * 1e9))
+
+
+class FrameRecorder(object):
+    """
+    Append raw WebSocket frames to a recording file.
+
+    Frames are written through a buffered file, call `flush()` to force them to
+    disk and `close()` when done. Safe to use from multiple threads.
+    """
+
+    def __init__(self, path, buffering=1 << 16):
+        """
+        Open a recording for writing, frames are appended if it already exists.
+
+        - `path` is the path of the recording file.
+        - `buffering` is the write buffer size in bytes.
+        """
+        self.path = path
+        self._file = open(path, "ab", buffering)
+        self._lock = threading.Lock()
+
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+        # Number of frames and payload bytes recorded
+        self.frames = 0
+        self.bytes = 0
+
+    def write(self, payload, is_binary, timestamp=None):
+        """
+        Record a frame.
+
+        - `payload` is the raw frame payload.
+        - `is_binary` is True for binary (tick) frames and False for text frames.
+        - `timestamp` is the receive time in nanoseconds since epoch. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = _time_ns()
+
+        header = _struct_header.pack(timestamp, 1 if is_binary else 0, len(payload))
+
+        with self._lock:
+            self._file.write(header)
+            self._file.write(payload)
+            self.frames += 1
+            self.bytes += len(payload)
+
+    def flush(self):
+        """Write buffered frames to the file."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the recording."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_frames(path):
+    """
+    Iterate over the frames of a recording as `(timestamp, is_binary, payload)` tuples.
+
+    - `path` is the path of the recording file.
+
+    A truncated last frame (for example of a recorder which was killed) is ignored.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a ticker recording.".format(path))
+
+        header_size = _struct_header.size
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                break
+
+            timestamp, is_binary, length = _struct_header.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                log.warning("Ignoring truncated frame at the end of {}".format(path))
+                break
+
+            yield timestamp, bool(is_binary), payload
+
+
+class TickReplayer(object):
+    """
+    Feed a recording through a `KiteTicker` as if the frames were being received.
+
+    Frames go through `KiteTicker._on_message`, so the ticker's decoder, `on_ticks`,
+    token callbacks, conflation, dispatcher and `on_order_update` all behave as they
+    do on a live connection. No connection is made.
+    """
+
+    def __init__(self, path, ticker, speed=1.0):
+        """
+        Initialise the replayer.
+
+        - `path` is the path of the recording file.
+        - `ticker` is the `KiteTicker` instance the frames are fed to.
+        - `speed` is the replay speed relative to the recording, `1` replays in real time and `10` ten times
+            faster. `None` replays as fast as possible, which is useful to benchmark decoding and callbacks.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("`speed` should be greater than 0 or None.")
+
+        self.path = path
+        self.ticker = ticker
+        self.speed = speed
+
+        self._stopped = False
+
+        # Stats of the last run
+        self.frames = 0
+        self.bytes = 0
+        self.elapsed = 0
+
+    def run(self):
+        """Replay all the frames, blocks until done or `stop()` is called. Returns the number of frames replayed."""
+        self._stopped = False
+        self.frames = 0
+        self.bytes = 0
+
+        on_message = self.ticker._on_message
+        speed = self.speed
+        first = None
+        start = time.time()
+
+        for timestamp, is_binary, payload in read_frames(self.path):
+            if self._stopped:
+                break
+
+            if speed is not None:
+                if first is None:
+                    first = timestamp
+
+                # Wait until the frame's time relative to the first frame
+                delay = (timestamp - first) / 1e9 / speed - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            on_message(None, payload, is_binary)
+            self.frames += 1
+            self.bytes += len(payload)
+
+        self.elapsed = time.time() - start
+        return self.frames
+
+    def stop(self):
+        """Stop a replay in progress after the current frame."""
+        self._stopped = True
+
+    def stats(self):
+        """Stats of the last run as a dict, along with the replay rate in frames and bytes per second."""
+        elapsed = self.elapsed or float("nan")
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "elapsed": self.elapsed,
+            "frames_per_second": self.frames / elapsed,
+            "bytes_per_second": self.bytes / elapsed
+        }
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+    subscriptions.py
+
+    Coalescing of ticker subscription control messages.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class SubscriptionManager(object):
+    """
+    Keep the desired subscriptions of a ticker and send only the difference to the server.
+
+    `desired` is the state asked for with `subscribe`, `unsubscribe` and `set_mode` (token -> mode),
+    `sent` is the state already sent on the open connection. Kite doesn't acknowledge subscriptions,
+    so `sent` is the confirmed state of the connection. Every flush sends the minimal set of messages
+    which turns `sent` into `desired`: unsubscribes, subscribes and one mode message per mode, each
+    split into chunks of at most `chunk_size` tokens. Tokens subscribed in the default quote mode
+    don't need a mode message.
+
+    With a `window`, changes are collected for `window` seconds and sent together, so calling
+    `subscribe` or `set_mode` in a loop sends a handful of messages instead of one per call. After
+    a reconnect the whole desired state is sent right away in a single burst.
+    """
+
+    # Maximum number of tokens in a single message
+    CHUNK_SIZE = 1000
+
+    def __init__(self, ticker, window=0, chunk_size=CHUNK_SIZE):
+        """
+        Initialise the manager.
+
+        - `ticker` is the `KiteTicker` whose connection messages are sent on.
+        - `window` in seconds to collect changes for before sending them. 0 sends them right away.
+        - `chunk_size` is the maximum number of tokens in a message.
+        """
+        self.ticker = ticker
+        self.window = window
+        self.chunk_size = chunk_size
+
+        self.desired = {}
+        self.sent = {}
+
+        self._lock = threading.RLock()
+        self._scheduled = False
+
+        # Number of control messages sent
+        self.messages = 0
+
+    def pending(self):
+        """True if the desired state differs from the state sent to the server."""
+        return self.desired != self.sent
+
+    def subscribe(self, instrument_tokens):
+        with self._lock:
+            for token in instrument_tokens:
+                self.desired[token] = self.ticker.MODE_QUOTE
+        self._changed()
+
+    def unsubscribe(self, instrument_tokens):
+        with self._lock:
+            for token in instrument_tokens:
+                self.desired.pop(token, None)
+        self._changed()
+
+    def set_mode(self, mode, instrument_tokens):
+        with self._lock:
+            for token in instrument_tokens:
+                self.desired[token] = mode
+        self._changed()
+
+    def reset(self):
+        """Forget the sent state, for a new connection."""
+        with self._lock:
+            self.sent = {}
+
+    def _changed(self):
+        if not self.window:
+            self.flush()
+            return
+
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        self.ticker._call_later(self.window, self._flush_scheduled)
+
+    def _flush_scheduled(self):
+        with self._lock:
+            self._scheduled = False
+
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Error while sending subscriptions.")
+
+    def flush(self):
+        """Send the pending changes now if the ticker is connected. Returns the number of messages sent."""
+        if not self.ticker.is_connected():
+            return 0
+
+        with self._lock:
+            desired = self.desired
+            sent = self.sent
+            default_mode = self.ticker.MODE_QUOTE
+
+            unsubscribe = [token for token in sent if token not in desired]
+            subscribe = [token for token in desired if token not in sent]
+
+            modes = {}
+            for token, mode in desired.items():
+                # New subscriptions start in the default mode
+                if mode != sent.get(token, default_mode):
+                    modes.setdefault(mode, []).append(token)
+
+            messages = []
+            for chunk in self._chunks(unsubscribe):
+                messages.append({"a": self.ticker._message_unsubscribe, "v": chunk})
+            for chunk in self._chunks(subscribe):
+                messages.append({"a": self.ticker._message_subscribe, "v": chunk})
+            for mode, tokens in modes.items():
+                for chunk in self._chunks(tokens):
+                    messages.append({"a": self.ticker._message_setmode, "v": [mode, chunk]})
+
+            if self.ticker.debug and messages:
+                log.debug("Sending {} subscription messages: {} unsubscribed, {} subscribed, {} mode changes".format(
+                    len(messages), len(unsubscribe), len(subscribe), sum(len(t) for t in modes.values())))
+
+            ws = self.ticker.ws
+            for message in messages:
+                ws.sendMessage(self.ticker.codec.encode(message))
+                self.messages += 1
+
+            self.sent = dict(desired)
+
+        return len(messages)
+
+    def _chunks(self, tokens):
+        size = self.chunk_size
+        return [tokens[i:i + size] for i in range(0, len(tokens), size)]
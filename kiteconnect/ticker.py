@@ -7,21 +7,29 @@
     :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
     :license: see LICENSE for details.
 """
-import six
 import sys
 import time
-import json
 import struct
 import logging
 import threading
 from datetime import datetime
 from twisted.internet import reactor, ssl
 from twisted.python import log as twisted_log
+from twisted.python.threadable import isInIOThread
 from twisted.internet.protocol import ReconnectingClientFactory
 from autobahn.twisted.websocket import WebSocketClientProtocol, \
     WebSocketClientFactory, connectWS
 
 from .__version__ import __version__, __title__
+from . import packets
+from .ticks import Tick, OHLC, Depth, DepthLevel, LazyDepthTick, LazyDepthDict
+from .conflation import ConflatingBuffer
+from .recorder import FrameRecorder
+from .depth import MarketDepth
+from .metrics import TickerMetrics
+from .subscriptions import SubscriptionManager
+from .orders import OrderBook
+from .codec import get_codec
 
 log = logging.getLogger(__name__)
 
@@ -263,6 +271,15 @@ class KiteTicker(object):
         - `attempts_count` - Current reconnect attempt number.
     - `on_noreconnect(ws)` -  Triggered when number of auto reconnection attempts exceeds `reconnect_tries`.
     - `on_order_update(ws, data)` -  Triggered when there is an order update for the connected user.
+        - `data` - Order update dict, or the `kiteconnect.orders.OrderUpdate` state of the order with `order_updates=True`.
+    - `on_depth_update(ws, depths)` -  Triggered when full mode packets change the market depth state of instruments.
+        - `depths` - List of `kiteconnect.depth.MarketDepth` objects which changed, with their `changed_fields`
+            and `changed_levels`. The objects are updated in place and `market_depth(instrument_token)` returns
+            the same object. Packets are not decoded to ticks when only this callback is set.
+
+    Per instrument callbacks can be registered with `add_tick_callback(callback, instrument_tokens)`. They are called
+    as `callback(ws, ticks)` with only the ticks of the given tokens. When `on_ticks` is not set, packets of tokens
+    without a registered callback are skipped before they are decoded.
 
 
     Tick structure (passed to the `on_ticks` callback)
@@ -386,8 +403,10 @@ class KiteTicker(object):
     MODE_QUOTE = "quote"
     MODE_LTP = "ltp"
 
-    # Flag to set if its first connect
-    _is_first_connect = True
+    # Formats in which ticks are passed to `on_ticks`.
+    TICK_FORMAT_DICT = "dict"
+    TICK_FORMAT_COLUMNAR = "columnar"
+    TICK_FORMAT_OBJECT = "object"
 
     # Available actions.
     _message_code = 11
@@ -400,9 +419,32 @@ class KiteTicker(object):
     # Maximum number or retries user can set
     _maximum_reconnect_max_tries = 300
 
+    # Price divisors for segments which don't use paise, rest are divided by 100.
+    _segment_divisors = {
+        EXCHANGE_MAP["cds"]: 10000000.0,
+        EXCHANGE_MAP["bcd"]: 10000.0,
+    }
+    # All indices are not tradable
+    _segment_indices = EXCHANGE_MAP["indices"]
+
+    # Number of memoized epoch to datetime conversions
+    _datetime_cache_size = 256
+
+    # Precompiled big-endian layouts for every packet length (see `kiteconnect.packets`)
+    _struct_short = packets.struct_short
+    _struct_token = packets.struct_token
+    _struct_ltp = packets.struct_ltp
+    _struct_index_quote = packets.struct_index_quote
+    _struct_index_full = packets.struct_index_full
+    _struct_quote = packets.struct_quote
+    _struct_full = packets.struct_full
+    _struct_full_head = packets.struct_full_head
+
     def __init__(self, api_key, access_token, debug=False, root=None,
                  reconnect=True, reconnect_max_tries=RECONNECT_MAX_TRIES, reconnect_max_delay=RECONNECT_MAX_DELAY,
-                 connect_timeout=CONNECT_TIMEOUT):
+                 connect_timeout=CONNECT_TIMEOUT, tick_format=TICK_FORMAT_DICT, lazy_depth=False,
+                 raw_timestamps=False, conflate=False, dispatcher=None, record=None, journal=None, metrics=False,
+                 subscription_window=0, order_updates=False, codec=None):
         """
         Initialise websocket client instance.
 
@@ -419,6 +461,36 @@ class KiteTicker(object):
         - `reconnect_max_delay` in seconds is the maximum delay after which subsequent reconnection interval will become constant. Defaults to 60s and minimum acceptable value is 5s.
         - `reconnect_max_tries` is maximum number reconnection attempts. Defaults to 50 attempts and maximum up to 300 attempts.
         - `connect_timeout` in seconds is the maximum interval after which connection is considered as timeout. Defaults to 30s.
+        - `tick_format` is the structure in which ticks are passed to `on_ticks`. Defaults to `TICK_FORMAT_DICT`,
+            a list of tick dicts. `TICK_FORMAT_COLUMNAR` passes a dict of NumPy arrays with one row per tick instead
+            (see `kiteconnect.columnar`) and requires `numpy`. `TICK_FORMAT_OBJECT` passes a list of compact
+            `kiteconnect.ticks.Tick` objects which support both attribute and dict style field access.
+        - `lazy_depth` if set, full mode ticks keep a reference to their packet and decode market `depth` only
+            when it's accessed. Ticks keep the same structure. Has no effect on `TICK_FORMAT_COLUMNAR`. Serialisers
+            which read the storage of dicts directly, like `orjson.dumps`, leave out depth which hasn't been decoded,
+            serialise `dict(tick)` with them.
+        - `raw_timestamps` if set, `last_trade_time` and `exchange_timestamp` are passed as integer epoch seconds
+            instead of `datetime` objects. Columnar ticks always have epoch timestamps.
+        - `conflate` if set, received ticks are only stored as the latest tick of their instrument and `on_ticks`
+            and token callbacks are not called. Consumers pull ticks at their own pace from any thread with
+            `latest(instrument_token)` and `drain()`, which keeps slow consumers from blocking the event loop.
+        - `dispatcher` is an optional `kiteconnect.dispatch.TickDispatcher` which runs `on_ticks` and token callbacks
+            on its worker threads through a bounded queue instead of the event loop thread.
+        - `record` is a file path or a `kiteconnect.recorder.FrameRecorder` to record every received frame to, with its
+            receive time. Recordings can be replayed with `kiteconnect.recorder.TickReplayer`.
+        - `journal` is an optional `kiteconnect.journal.TickJournal` to append the packets of every received binary frame to.
+        - `metrics` if set, latency histograms of the receive path (frame arrival, decoding, `on_ticks` and lag behind
+            the exchange) are kept in `metrics`, a `kiteconnect.metrics.TickerMetrics`. Pass an instance to share
+            it between tickers.
+        - `subscription_window` in seconds to collect `subscribe`, `unsubscribe` and `set_mode` calls for before
+            sending them to the server as a minimal set of messages. Defaults to sending them right away.
+        - `order_updates` if set, the latest state of every order is kept in `orders`, a `kiteconnect.orders.OrderBook`,
+            and `on_order_update` receives the `kiteconnect.orders.OrderUpdate` state of the order, with `datetime`
+            timestamps, instead of a dict. States are updated in place by later updates, `copy()` keeps a snapshot.
+            Updates older than the state aren't passed on. Pass an instance to share it between tickers.
+        - `codec` is the JSON codec of text messages and subscription messages. Either the name of a codec ("json",
+            "orjson", "ujson", "auto" for the fastest installed one) or a `kiteconnect.codec.JSONCodec` of any other
+            decoder, for example `JSONCodec(loads, json.dumps)`. Defaults to the standard library `json`.
         """
         self.root = root or self.ROOT_URI
 
@@ -439,6 +511,7 @@ class KiteTicker(object):
             self.reconnect_max_delay = reconnect_max_delay
 
         self.connect_timeout = connect_timeout
+        self.reconnect = reconnect
 
         self.socket_url = "{root}?api_key={api_key}"\
             "&access_token={access_token}".format(
@@ -466,8 +539,80 @@ class KiteTicker(object):
         # Text message updates
         self.on_order_update = None
 
-        # List of current subscribed tokens
-        self.subscribed_tokens = {}
+        # JSON codec of text and control messages
+        self.codec = get_codec(codec)
+
+        # Latest state of orders from order updates
+        self.orders = None
+        # An empty `OrderBook` is falsy
+        if isinstance(order_updates, OrderBook):
+            self.orders = order_updates
+        elif order_updates:
+            self.orders = OrderBook()
+
+        # Market depth state updates
+        self.on_depth_update = None
+        self._depths = {}
+
+        # Subscriptions, sent to the server on every (re)connect
+        self._subscriptions = SubscriptionManager(self, window=subscription_window)
+
+        # List of current subscribed tokens, token -> mode
+        self.subscribed_tokens = self._subscriptions.desired
+
+        # Per instrument token callbacks, token -> [callbacks]
+        self._token_callbacks = {}
+
+        # Tick decoder for the requested format
+        if tick_format == self.TICK_FORMAT_DICT:
+            self._parse_ticks = self._parse_binary
+        elif tick_format == self.TICK_FORMAT_OBJECT:
+            self._parse_ticks = self._parse_objects
+        elif tick_format == self.TICK_FORMAT_COLUMNAR:
+            try:
+                from . import columnar
+            except ImportError:
+                raise ImportError("`numpy` is required for columnar ticks. Install it with `pip install kiteconnect[numpy]`.")
+
+            self._parse_ticks = self._parse_columnar
+            self._columnar = columnar
+        else:
+            raise ValueError("Invalid `tick_format`: {}".format(tick_format))
+
+        self.tick_format = tick_format
+        self.lazy_depth = lazy_depth
+        self.raw_timestamps = raw_timestamps
+
+        # Latest tick buffer for pull based consumption
+        self.conflate = conflate
+        self._latest_ticks = None
+        if conflate:
+            if tick_format == self.TICK_FORMAT_COLUMNAR:
+                raise ValueError("`conflate` is not supported with `TICK_FORMAT_COLUMNAR`.")
+            self._latest_ticks = ConflatingBuffer()
+
+        # Off the event loop dispatch of ticks
+        self.dispatcher = dispatcher
+        if dispatcher:
+            if tick_format == self.TICK_FORMAT_COLUMNAR and dispatcher.overflow == dispatcher.OVERFLOW_CONFLATE:
+                raise ValueError("`OVERFLOW_CONFLATE` dispatcher is not supported with `TICK_FORMAT_COLUMNAR`.")
+            dispatcher.handler = self._dispatch_ticks
+
+        # Raw frame recording
+        self._recorder = None
+        if record is not None:
+            self._recorder = record if isinstance(record, FrameRecorder) else FrameRecorder(record)
+
+        # Indexed on-disk journal of ticks
+        self._journal = journal
+
+        # Receive path latency histograms
+        self.metrics = None
+        if metrics:
+            self.metrics = metrics if isinstance(metrics, TickerMetrics) else TickerMetrics()
+
+        # Memoized epoch -> datetime conversions, ticks of a frame mostly share the same second
+        self._datetime_cache = {}
 
     def _create_connection(self, url, **kwargs):
         """Create a WebSocket client connection."""
@@ -501,6 +646,11 @@ class KiteTicker(object):
         - `disable_ssl_verification` disables building ssl context
         - `proxy` is a dictionary with keys `host` and `port` which denotes the proxy settings
         """
+        self._connect(disable_ssl_verification=disable_ssl_verification, proxy=proxy)
+        self._run_reactor(threaded=threaded)
+
+    def _connect(self, disable_ssl_verification=False, proxy=None):
+        """Initiate the websocket connection on the reactor without running it."""
         # Custom headers
         headers = {
             "X-Kite-Version": "3",  # For version 3
@@ -522,6 +672,8 @@ class KiteTicker(object):
         if self.debug:
             twisted_log.startLogging(sys.stdout)
 
+    def _run_reactor(self, threaded=False):
+        """Run the reactor if its not running already, in a separate thread if `threaded` is set."""
         # Run in seperate thread of blocking
         opts = {}
 
@@ -559,6 +711,12 @@ class KiteTicker(object):
         """
         reactor.stop()
 
+        if self.dispatcher:
+            self.dispatcher.stop(wait=False)
+
+        if self._recorder is not None:
+            self._recorder.close()
+
     def stop_retry(self):
         """Stop auto retry when it is in progress."""
         if self.factory:
@@ -571,13 +729,7 @@ class KiteTicker(object):
         - `instrument_tokens` is list of instrument instrument_tokens to subscribe
         """
         try:
-            self.ws.sendMessage(
-                six.b(json.dumps({"a": self._message_subscribe, "v": instrument_tokens}))
-            )
-
-            for token in instrument_tokens:
-                self.subscribed_tokens[token] = self.MODE_QUOTE
-
+            self._subscriptions.subscribe(instrument_tokens)
             return True
         except Exception as e:
             self._close(reason="Error while subscribe: {}".format(str(e)))
@@ -590,16 +742,7 @@ class KiteTicker(object):
         - `instrument_tokens` is list of instrument_tokens to unsubscribe.
         """
         try:
-            self.ws.sendMessage(
-                six.b(json.dumps({"a": self._message_unsubscribe, "v": instrument_tokens}))
-            )
-
-            for token in instrument_tokens:
-                try:
-                    del (self.subscribed_tokens[token])
-                except KeyError:
-                    pass
-
+            self._subscriptions.unsubscribe(instrument_tokens)
             return True
         except Exception as e:
             self._close(reason="Error while unsubscribe: {}".format(str(e)))
@@ -614,14 +757,7 @@ class KiteTicker(object):
         - `instrument_tokens` is list of instrument tokens on which the mode should be applied
         """
         try:
-            self.ws.sendMessage(
-                six.b(json.dumps({"a": self._message_setmode, "v": [mode, instrument_tokens]}))
-            )
-
-            # Update modes
-            for token in instrument_tokens:
-                self.subscribed_tokens[token] = mode
-
+            self._subscriptions.set_mode(mode, instrument_tokens)
             return True
         except Exception as e:
             self._close(reason="Error while setting mode: {}".format(str(e)))
@@ -629,25 +765,154 @@ class KiteTicker(object):
 
     def resubscribe(self):
         """Resubscribe to all current subscribed tokens."""
-        modes = {}
+        if self.debug:
+            log.debug("Resubscribe {} tokens".format(len(self.subscribed_tokens)))
 
-        for token in self.subscribed_tokens:
-            m = self.subscribed_tokens[token]
+        self._subscriptions.reset()
+        self._subscriptions.flush()
 
-            if not modes.get(m):
-                modes[m] = []
+    def _call_later(self, delay, callback):
+        """Call `callback` after `delay` seconds on the reactor thread."""
+        if isInIOThread():
+            reactor.callLater(delay, callback)
+        else:
+            reactor.callFromThread(reactor.callLater, delay, callback)
 
-            modes[m].append(token)
+    def add_tick_callback(self, callback, instrument_tokens):
+        """
+        Register a callback for ticks of the given instrument tokens.
 
-        for mode in modes:
-            if self.debug:
-                log.debug("Resubscribe and set mode: {} - {}".format(mode, modes[mode]))
+        - `callback` is called as `callback(ws, ticks)` with the ticks of `instrument_tokens` in every frame
+            which has at least one of them.
+        - `instrument_tokens` is list of instrument tokens the callback is interested in.
+        """
+        if self.tick_format == self.TICK_FORMAT_COLUMNAR:
+            raise ValueError("Per token callbacks are not supported with `TICK_FORMAT_COLUMNAR`.")
+
+        for token in instrument_tokens:
+            callbacks = self._token_callbacks.setdefault(token, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    def remove_tick_callback(self, callback, instrument_tokens=None):
+        """
+        Remove a callback registered with `add_tick_callback`.
+
+        - `instrument_tokens` is list of instrument tokens to remove the callback from. Defaults to all tokens.
+        """
+        if instrument_tokens is None:
+            instrument_tokens = list(self._token_callbacks)
+
+        for token in instrument_tokens:
+            callbacks = self._token_callbacks.get(token)
+            if callbacks and callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self._token_callbacks[token]
+
+    def latest(self, instrument_token):
+        """
+        Get the latest tick received for the given instrument token or `None`. Requires `conflate` mode.
+
+        - `instrument_token` is the instrument token to get the tick of.
+        """
+        return self._conflating_buffer().latest(instrument_token)
+
+    def drain(self, timeout=0):
+        """
+        Get the latest tick of every instrument updated since the previous `drain()`. Requires `conflate` mode.
+
+        Ticks which were updated multiple times since the previous call are returned only once with their newest value.
+
+        - `timeout` in seconds to wait for new ticks if there are none. Defaults to not waiting, `None` waits forever.
+        """
+        return self._conflating_buffer().drain(timeout)
+
+    def market_depth(self, instrument_token):
+        """
+        Get the `kiteconnect.depth.MarketDepth` state of an instrument or `None`. Requires `on_depth_update` to be set.
+
+        - `instrument_token` is the instrument token to get the market depth of.
+        """
+        return self._depths.get(instrument_token)
+
+    def _update_depths(self, payload):
+        """Apply the full mode packets of a frame to the market depth states and call `on_depth_update`."""
+        frame = memoryview(payload)
+        depths = self._depths
+        unpack_token = self._struct_token.unpack_from
+
+        changed = []
+        for offset, packet_length in self._split_packets(frame):
+            if packet_length != 184:
+                continue
+
+            instrument_token = unpack_token(frame, offset)[0]
+            depth = depths.get(instrument_token)
+            if depth is None:
+                depth = depths[instrument_token] = MarketDepth(
+                    instrument_token, self._segment_divisors.get(instrument_token & 0xff, 100.0))
+
+            if depth.update(frame, offset):
+                changed.append(depth)
+
+        if changed:
+            self.on_depth_update(self, changed)
+
+    def _conflating_buffer(self):
+        if self._latest_ticks is None:
+            raise RuntimeError("Latest ticks are only available when `KiteTicker` is initialised with `conflate=True`.")
+        return self._latest_ticks
+
+    def _tick_tokens(self):
+        """
+        Instrument tokens whose packets have to be decoded.
+
+        `None` to decode all the packets for `on_ticks`, otherwise only the tokens with registered callbacks.
+        """
+        if self.on_ticks:
+            return None
+
+        return self._token_callbacks
+
+    def _dispatch_ticks(self, ticks):
+        """Call `on_ticks` and the token callbacks with decoded ticks."""
+        metrics = self.metrics
+        if metrics is not None:
+            start = metrics.clock()
+
+        if self.on_ticks:
+            self.on_ticks(self, ticks)
+
+        if self._token_callbacks:
+            self._dispatch_token_ticks(ticks)
+
+        if metrics is not None:
+            metrics.on_ticks.record((metrics.clock() - start) * 1e6)
 
-            self.subscribe(modes[mode])
-            self.set_mode(mode, modes[mode])
+    def _dispatch_token_ticks(self, ticks):
+        """Group ticks by their registered token callbacks and call each callback once."""
+        token_callbacks = self._token_callbacks
+        batches = {}
+
+        for tick in ticks:
+            callbacks = token_callbacks.get(tick["instrument_token"])
+            if callbacks:
+                for callback in callbacks:
+                    batch = batches.get(callback)
+                    if batch is None:
+                        batches[callback] = [tick]
+                    else:
+                        batch.append(tick)
+
+        for callback, batch in batches.items():
+            callback(self, batch)
 
     def _on_connect(self, ws, response):
         self.ws = ws
+        # Nothing is subscribed on a new connection. The connection is already open here, so
+        # subscriptions made in `on_connect` are sent right away and not again by `_on_open`.
+        self._subscriptions.reset()
         if self.on_connect:
             self.on_connect(self, response)
 
@@ -667,24 +932,58 @@ class KiteTicker(object):
 
     def _on_message(self, ws, payload, is_binary):
         """Call `on_message` callback when text message is received."""
+        if self._recorder is not None:
+            self._recorder.write(payload, is_binary)
+
+        if self._journal is not None and is_binary:
+            self._journal.append_frame(payload)
+
         if self.on_message:
             self.on_message(self, payload, is_binary)
 
         # If the message is binary, parse it and send it to the callback.
-        if self.on_ticks and is_binary and len(payload) > 4:
-            self.on_ticks(self, self._parse_binary(payload))
+        if is_binary and len(payload) > 4:
+            metrics = self.metrics
+            if metrics is not None:
+                metrics.frame_received(payload, self._split_packets(payload))
+
+            if self.on_depth_update:
+                self._update_depths(payload)
+
+            if self._latest_ticks is not None:
+                # Consumers pull the ticks from the buffer
+                self._latest_ticks.update(self._decode(payload, None))
+            else:
+                tokens = self._tick_tokens()
+
+                # Skip decoding when there's no one to receive the ticks
+                if tokens is None or tokens:
+                    ticks = self._decode(payload, tokens)
+
+                    if self.dispatcher:
+                        self.dispatcher.submit(ticks)
+                    else:
+                        self._dispatch_ticks(ticks)
 
         # Parse text messages
         if not is_binary:
             self._parse_text_message(payload)
 
-    def _on_open(self, ws):
-        # Resubscribe if its reconnect
-        if not self._is_first_connect:
-            self.resubscribe()
+    def _decode(self, payload, tokens):
+        """Decode a binary frame with the ticker's parser, timing it when metrics are enabled."""
+        metrics = self.metrics
+        if metrics is None:
+            return self._parse_ticks(payload, tokens)
 
-        # Set first connect to false once its connected first time
-        self._is_first_connect = False
+        start = metrics.clock()
+        ticks = self._parse_ticks(payload, tokens)
+        metrics.decode.record((metrics.clock() - start) * 1e6)
+        return ticks
+
+    def _on_open(self, ws):
+        # Send the subscriptions not sent yet in one burst, on reconnects as well as for the
+        # tokens subscribed before the first connect
+        self._subscriptions.flush()
 
         if self.on_open:
             return self.on_open(self)
@@ -699,165 +998,314 @@ class KiteTicker(object):
 
     def _parse_text_message(self, payload):
         """Parse text message."""
-        # Decode unicode data
-        if not six.PY2 and type(payload) == bytes:
-            payload = payload.decode("utf-8")
-
         try:
-            data = json.loads(payload)
+            data = self.codec.decode(payload)
         except ValueError:
             return
 
         # Order update callback
-        if self.on_order_update and data.get("type") == "order" and data.get("data"):
-            self.on_order_update(self, data["data"])
+        if data.get("type") == "order" and data.get("data"):
+            if self.orders is not None:
+                # Stale updates are not passed on
+                update = self.orders.update(data["data"])
+                if update is not None and self.on_order_update:
+                    self.on_order_update(self, update)
+            elif self.on_order_update:
+                self.on_order_update(self, data["data"])
 
         # Custom error with websocket error code 0
         if data.get("type") == "error":
             self._on_error(self, 0, data.get("data"))
 
-    def _parse_binary(self, bin):
-        """Parse binary data to a (list of) ticks structure."""
-        packets = self._split_packets(bin)  # split data to individual ticks packet
+    def _parse_binary(self, bin, tokens=None):
+        """
+        Parse binary data to a (list of) ticks structure.
+
+        - `tokens` if given is a container of instrument tokens to decode, rest of the packets are skipped.
+        """
+        data = []
+
+        # A single view of the frame is shared by the splitter and the decoder, packets are
+        # decoded in place at their offset without being copied out of the frame.
+        frame = memoryview(bin)
+        parse_packet = self._parse_packet
+
+        packets = self._split_packets(frame)
+        if tokens is not None:
+            packets = self._filter_packets(frame, packets, tokens)
+
+        for offset, packet_length in packets:
+            tick = parse_packet(frame, offset, packet_length)
+            if tick is not None:
+                data.append(tick)
+
+        return data
+
+    def _filter_packets(self, frame, packets, tokens):
+        """Filter `(offset, length)` packet pairs to the ones whose instrument token is in `tokens`."""
+        unpack_token = self._struct_token.unpack_from
+        for offset, packet_length in packets:
+            if packet_length >= 4 and unpack_token(frame, offset)[0] in tokens:
+                yield offset, packet_length
+
+    def _parse_columnar(self, bin, tokens=None):
+        """Parse binary data to a columnar batch of NumPy arrays. Same as `_parse_binary`."""
+        frame = memoryview(bin)
+
+        packets = self._split_packets(frame)
+        if tokens is not None:
+            packets = self._filter_packets(frame, packets, tokens)
+
+        return self._columnar.parse_binary(frame, packets)
+
+    def _parse_objects(self, bin, tokens=None):
+        """Parse binary data to a list of `Tick` objects. Same as `_parse_binary`."""
         data = []
 
-        for packet in packets:
-            instrument_token = self._unpack_int(packet, 0, 4)
+        frame = memoryview(bin)
+        parse_packet = self._parse_packet_object
+
+        packets = self._split_packets(frame)
+        if tokens is not None:
+            packets = self._filter_packets(frame, packets, tokens)
+
+        for offset, packet_length in packets:
+            tick = parse_packet(frame, offset, packet_length)
+            if tick is not None:
+                data.append(tick)
+
+        return data
+
+    def _parse_packet_object(self, bin, offset, packet_length):
+        """Parse a single packet to a `Tick` object. Same as `_parse_packet` but without any dicts."""
+        if packet_length == 8:
+            instrument_token, last_price = self._struct_ltp.unpack_from(bin, offset)
+            segment = instrument_token & 0xff
+
+            return Tick(segment != self._segment_indices, self.MODE_LTP, instrument_token,
+                        last_price / self._segment_divisors.get(segment, 100.0))
+        elif packet_length == 28 or packet_length == 32:
+            if packet_length == 28:
+                mode = self.MODE_QUOTE
+                v = self._struct_index_quote.unpack_from(bin, offset)
+            else:
+                mode = self.MODE_FULL
+                v = self._struct_index_full.unpack_from(bin, offset)
+
+            instrument_token = v[0]
+            segment = instrument_token & 0xff
+            divisor = self._segment_divisors.get(segment, 100.0)
+
+            last_price = v[1] / divisor
+            close = v[5] / divisor
+
+            t = Tick(segment != self._segment_indices, mode, instrument_token, last_price)
+            t.ohlc = OHLC(v[4] / divisor, v[2] / divisor, v[3] / divisor, close)
+            t.change = (last_price - close) * 100 / close if close != 0 else 0
+
+            if packet_length == 32:
+                t.exchange_timestamp = v[6] if self.raw_timestamps else self._to_datetime(v[6])
+
+            return t
+        elif packet_length == 44 or packet_length == 184:
+            if packet_length == 44:
+                mode = self.MODE_QUOTE
+                v = self._struct_quote.unpack_from(bin, offset)
+            elif self.lazy_depth:
+                mode = self.MODE_FULL
+                v = self._struct_full_head.unpack_from(bin, offset)
+            else:
+                mode = self.MODE_FULL
+                v = self._struct_full.unpack_from(bin, offset)
+
+            instrument_token = v[0]
+            segment = instrument_token & 0xff
+            divisor = self._segment_divisors.get(segment, 100.0)
+
+            last_price = v[1] / divisor
+            close = v[10] / divisor
+
+            if packet_length == 184 and self.lazy_depth:
+                t = LazyDepthTick(segment != self._segment_indices, mode, instrument_token, last_price,
+                                  bin, offset, divisor)
+            else:
+                t = Tick(segment != self._segment_indices, mode, instrument_token, last_price)
+            t.last_traded_quantity = v[2]
+            t.average_traded_price = v[3] / divisor
+            t.volume_traded = v[4]
+            t.total_buy_quantity = v[5]
+            t.total_sell_quantity = v[6]
+            t.ohlc = OHLC(v[7] / divisor, v[8] / divisor, v[9] / divisor, close)
+            t.change = (last_price - close) * 100 / close if close != 0 else 0
+
+            if packet_length == 184:
+                t.last_trade_time = v[11] if self.raw_timestamps else self._to_datetime(v[11])
+                t.exchange_timestamp = v[15] if self.raw_timestamps else self._to_datetime(v[15])
+
+                t.oi = v[12]
+                t.oi_day_high = v[13]
+                t.oi_day_low = v[14]
+
+                if self.lazy_depth:
+                    return t
+
+                levels = tuple(DepthLevel(v[i], v[i + 1] / divisor, v[i + 2]) for i in range(16, 46, 3))
+                t.depth = Depth(levels[:5], levels[5:])
+
+            return t
+
+        return None
+
+    def _parse_packet(self, bin, offset, packet_length):
+        """Parse a single packet of `packet_length` bytes starting at `offset` in the frame."""
+        # LTP packets
+        if packet_length == 8:
+            instrument_token, last_price = self._struct_ltp.unpack_from(bin, offset)
             segment = instrument_token & 0xff  # Retrive segment constant from instrument_token
 
-            # Add price divisor based on segment
-            if segment == self.EXCHANGE_MAP["cds"]:
-                divisor = 10000000.0
-            elif segment == self.EXCHANGE_MAP["bcd"]:
-                divisor = 10000.0
+            return {
+                "tradable": segment != self._segment_indices,
+                "mode": self.MODE_LTP,
+                "instrument_token": instrument_token,
+                "last_price": last_price / self._segment_divisors.get(segment, 100.0)
+            }
+        # Indices quote and full mode
+        elif packet_length == 28 or packet_length == 32:
+            if packet_length == 28:
+                mode = self.MODE_QUOTE
+                v = self._struct_index_quote.unpack_from(bin, offset)
             else:
-                divisor = 100.0
-
-            # All indices are not tradable
-            tradable = False if segment == self.EXCHANGE_MAP["indices"] else True
-
-            # LTP packets
-            if len(packet) == 8:
-                data.append({
-                    "tradable": tradable,
-                    "mode": self.MODE_LTP,
-                    "instrument_token": instrument_token,
-                    "last_price": self._unpack_int(packet, 4, 8) / divisor
-                })
-            # Indices quote and full mode
-            elif len(packet) == 28 or len(packet) == 32:
-                mode = self.MODE_QUOTE if len(packet) == 28 else self.MODE_FULL
-
-                d = {
-                    "tradable": tradable,
-                    "mode": mode,
-                    "instrument_token": instrument_token,
-                    "last_price": self._unpack_int(packet, 4, 8) / divisor,
-                    "ohlc": {
-                        "high": self._unpack_int(packet, 8, 12) / divisor,
-                        "low": self._unpack_int(packet, 12, 16) / divisor,
-                        "open": self._unpack_int(packet, 16, 20) / divisor,
-                        "close": self._unpack_int(packet, 20, 24) / divisor
-                    }
+                mode = self.MODE_FULL
+                v = self._struct_index_full.unpack_from(bin, offset)
+
+            instrument_token = v[0]
+            segment = instrument_token & 0xff
+            divisor = self._segment_divisors.get(segment, 100.0)
+
+            last_price = v[1] / divisor
+            close = v[5] / divisor
+
+            d = {
+                "tradable": segment != self._segment_indices,
+                "mode": mode,
+                "instrument_token": instrument_token,
+                "last_price": last_price,
+                "ohlc": {
+                    "high": v[2] / divisor,
+                    "low": v[3] / divisor,
+                    "open": v[4] / divisor,
+                    "close": close
                 }
+            }
 
-                # Compute the change price using close price and last price
-                d["change"] = 0
-                if (d["ohlc"]["close"] != 0):
-                    d["change"] = (d["last_price"] - d["ohlc"]["close"]) * 100 / d["ohlc"]["close"]
-
-                # Full mode with timestamp
-                if len(packet) == 32:
-                    try:
-                        timestamp = datetime.fromtimestamp(self._unpack_int(packet, 28, 32))
-                    except Exception:
-                        timestamp = None
-
-                    d["exchange_timestamp"] = timestamp
-
-                data.append(d)
-            # Quote and full mode
-            elif len(packet) == 44 or len(packet) == 184:
-                mode = self.MODE_QUOTE if len(packet) == 44 else self.MODE_FULL
-
-                d = {
-                    "tradable": tradable,
-                    "mode": mode,
-                    "instrument_token": instrument_token,
-                    "last_price": self._unpack_int(packet, 4, 8) / divisor,
-                    "last_traded_quantity": self._unpack_int(packet, 8, 12),
-                    "average_traded_price": self._unpack_int(packet, 12, 16) / divisor,
-                    "volume_traded": self._unpack_int(packet, 16, 20),
-                    "total_buy_quantity": self._unpack_int(packet, 20, 24),
-                    "total_sell_quantity": self._unpack_int(packet, 24, 28),
-                    "ohlc": {
-                        "open": self._unpack_int(packet, 28, 32) / divisor,
-                        "high": self._unpack_int(packet, 32, 36) / divisor,
-                        "low": self._unpack_int(packet, 36, 40) / divisor,
-                        "close": self._unpack_int(packet, 40, 44) / divisor
-                    }
+            # Compute the change price using close price and last price
+            d["change"] = 0
+            if close != 0:
+                d["change"] = (last_price - close) * 100 / close
+
+            # Full mode with timestamp
+            if packet_length == 32:
+                timestamp = v[6] if self.raw_timestamps else self._to_datetime(v[6])
+
+                d["exchange_timestamp"] = timestamp
+
+            return d
+        # Quote and full mode
+        elif packet_length == 44 or packet_length == 184:
+            if packet_length == 44:
+                mode = self.MODE_QUOTE
+                v = self._struct_quote.unpack_from(bin, offset)
+            elif self.lazy_depth:
+                mode = self.MODE_FULL
+                v = self._struct_full_head.unpack_from(bin, offset)
+            else:
+                mode = self.MODE_FULL
+                v = self._struct_full.unpack_from(bin, offset)
+
+            instrument_token = v[0]
+            segment = instrument_token & 0xff
+            divisor = self._segment_divisors.get(segment, 100.0)
+
+            last_price = v[1] / divisor
+            close = v[10] / divisor
+
+            d = {
+                "tradable": segment != self._segment_indices,
+                "mode": mode,
+                "instrument_token": instrument_token,
+                "last_price": last_price,
+                "last_traded_quantity": v[2],
+                "average_traded_price": v[3] / divisor,
+                "volume_traded": v[4],
+                "total_buy_quantity": v[5],
+                "total_sell_quantity": v[6],
+                "ohlc": {
+                    "open": v[7] / divisor,
+                    "high": v[8] / divisor,
+                    "low": v[9] / divisor,
+                    "close": close
                 }
+            }
 
-                # Compute the change price using close price and last price
-                d["change"] = 0
-                if (d["ohlc"]["close"] != 0):
-                    d["change"] = (d["last_price"] - d["ohlc"]["close"]) * 100 / d["ohlc"]["close"]
-
-                # Parse full mode
-                if len(packet) == 184:
-                    try:
-                        last_trade_time = datetime.fromtimestamp(self._unpack_int(packet, 44, 48))
-                    except Exception:
-                        last_trade_time = None
-
-                    try:
-                        timestamp = datetime.fromtimestamp(self._unpack_int(packet, 60, 64))
-                    except Exception:
-                        timestamp = None
-
-                    d["last_trade_time"] = last_trade_time
-                    d["oi"] = self._unpack_int(packet, 48, 52)
-                    d["oi_day_high"] = self._unpack_int(packet, 52, 56)
-                    d["oi_day_low"] = self._unpack_int(packet, 56, 60)
-                    d["exchange_timestamp"] = timestamp
-
-                    # Market depth entries.
-                    depth = {
-                        "buy": [],
-                        "sell": []
-                    }
-
-                    # Compile the market depth lists.
-                    for i, p in enumerate(range(64, len(packet), 12)):
-                        depth["sell" if i >= 5 else "buy"].append({
-                            "quantity": self._unpack_int(packet, p, p + 4),
-                            "price": self._unpack_int(packet, p + 4, p + 8) / divisor,
-                            "orders": self._unpack_int(packet, p + 8, p + 10, byte_format="H")
-                        })
-
-                    d["depth"] = depth
-
-                data.append(d)
+            # Compute the change price using close price and last price
+            d["change"] = 0
+            if close != 0:
+                d["change"] = (last_price - close) * 100 / close
+
+            # Parse full mode
+            if packet_length == 184:
+                last_trade_time = v[11] if self.raw_timestamps else self._to_datetime(v[11])
+                timestamp = v[15] if self.raw_timestamps else self._to_datetime(v[15])
+
+                d["last_trade_time"] = last_trade_time
+                d["oi"] = v[12]
+                d["oi_day_high"] = v[13]
+                d["oi_day_low"] = v[14]
+                d["exchange_timestamp"] = timestamp
+
+                # Depth is decoded from the packet when it's accessed
+                if self.lazy_depth:
+                    return LazyDepthDict(d, bin, offset, divisor)
+
+                # Market depth entries, first five are bids and the rest are offers.
+                levels = [{
+                    "quantity": v[i],
+                    "price": v[i + 1] / divisor,
+                    "orders": v[i + 2]
+                } for i in range(16, 46, 3)]
+
+                d["depth"] = {
+                    "buy": levels[:5],
+                    "sell": levels[5:]
+                }
 
-        return data
+            return d
 
-    def _unpack_int(self, bin, start, end, byte_format="I"):
-        """Unpack binary data as unsgined interger."""
-        return struct.unpack(">" + byte_format, bin[start:end])[0]
+        return None
 
-    def _split_packets(self, bin):
-        """Split the data to individual packets of ticks."""
-        # Ignore heartbeat data.
-        if len(bin) < 2:
-            return []
+    def _to_datetime(self, epoch):
+        """Convert epoch seconds to a local `datetime`, conversions are memoized per second."""
+        cache = self._datetime_cache
+        try:
+            return cache[epoch]
+        except KeyError:
+            pass
 
-        number_of_packets = self._unpack_int(bin, 0, 2, byte_format="H")
-        packets = []
+        try:
+            timestamp = datetime.fromtimestamp(epoch)
+        except Exception:
+            timestamp = None
+
+        # Timestamps only move forward, so start afresh instead of evicting one at a time
+        if len(cache) >= self._datetime_cache_size:
+            cache.clear()
+
+        cache[epoch] = timestamp
+        return timestamp
 
-        j = 2
-        for i in range(number_of_packets):
-            packet_length = self._unpack_int(bin, j, j + 2, byte_format="H")
-            packets.append(bin[j + 2: j + 2 + packet_length])
-            j = j + 2 + packet_length
+    def _unpack_int(self, bin, start, end, byte_format="I"):
+        """Unpack binary data as unsgined interger."""
+        return struct.unpack(">" + byte_format, bin[start:end])[0]
 
-        return packets
+    # Yields an `(offset, length)` pair for every packet in a frame (see `kiteconnect.packets.split_packets`)
+    _split_packets = staticmethod(packets.split_packets)
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+    ticks.py
+
+    Compact tick objects for the kite ticker.
+
+    These are passed to `on_ticks` instead of dicts when `KiteTicker` is
+    initialised with `tick_format=KiteTicker.TICK_FORMAT_OBJECT`. Every object
+    uses `__slots__`, so a full mode tick takes a fraction of the memory of
+    the equivalent nested dicts.
+
+    Fields are read as attributes (`tick.ohlc.close`, `tick.depth.buy[0].price`)
+    or with the same keys as the dict ticks (`tick["ohlc"]["close"]`), so code
+    written for dict ticks keeps working. Fields which are not part of the
+    tick's mode are `None` as attributes and raise `KeyError` as keys.
+
+    With `lazy_depth=True` full mode ticks are `LazyDepthDict` or `LazyDepthTick`
+    instances which keep a reference to the packet in the received frame and
+    decode market depth only when it's first accessed. Serialisers which read
+    the storage of dicts directly, like `orjson.dumps`, don't see the depth of
+    a `LazyDepthDict` which hasn't been decoded. Pass them `dict(tick)` instead.
+
+    :copyright: (c) 2021 by Zerodha Technology Pvt. Ltd.
+    :license: see LICENSE for details.
+"""
+
+
+from .packets import struct_depth, depth_offset
+
+
+def _unpack_depth(frame, offset, divisor):
+    """Unpack depth of the full mode packet at `offset` in `frame` to a list of (quantity, price, orders)."""
+    v = struct_depth.unpack_from(frame, offset + depth_offset)
+    return [(v[i], v[i + 1] / divisor, v[i + 2]) for i in range(0, 30, 3)]
+
+
+class _Record(object):
+    """Base for slotted records with dict style field access."""
+
+    __slots__ = ()
+    # Public field names, same as `__slots__` of the concrete record
+    _fields = ()
+
+    def __getattr__(self, name):
+        # Only reached for slots which were never set for this mode
+        if name in self._fields:
+            return None
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def _has(self, key):
+        """True if the field `key` is set."""
+        try:
+            object.__getattribute__(self, key)
+        except AttributeError:
+            return False
+        return True
+
+    def __contains__(self, key):
+        return key in self._fields and self._has(key)
+
+    def get(self, key, default=None):
+        """Get a field value or `default` if it's not set."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """List of fields which are set."""
+        return [k for k in self._fields if self._has(k)]
+
+    def to_dict(self):
+        """Convert to the plain (nested) dict structure of dict ticks."""
+        d = {}
+        for k in self.keys():
+            v = getattr(self, k)
+            d[k] = v.to_dict() if isinstance(v, (_Record, Depth)) else v
+        return d
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(k, getattr(self, k)) for k in self.keys()))
+
+
+class DepthLevel(_Record):
+    """A single market depth entry."""
+
+    __slots__ = ("quantity", "price", "orders")
+    _fields = __slots__
+
+    def __init__(self, quantity, price, orders):
+        self.quantity = quantity
+        self.price = price
+        self.orders = orders
+
+
+class OHLC(_Record):
+    """Open, high, low and close prices of a tick."""
+
+    __slots__ = ("open", "high", "low", "close")
+    _fields = __slots__
+
+    def __init__(self, open, high, low, close):
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+
+
+class Depth(object):
+    """Five levels of bids (`buy`) and offers (`sell`) as tuples of `DepthLevel`."""
+
+    __slots__ = ("buy", "sell")
+
+    def __init__(self, buy, sell):
+        self.buy = buy
+        self.sell = sell
+
+    def __getitem__(self, key):
+        if key == "buy":
+            return self.buy
+        elif key == "sell":
+            return self.sell
+        raise KeyError(key)
+
+    def keys(self):
+        return ["buy", "sell"]
+
+    def to_dict(self):
+        """Convert to the dict structure of dict ticks."""
+        return {
+            "buy": [level.to_dict() for level in self.buy],
+            "sell": [level.to_dict() for level in self.sell]
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, Depth):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Depth(buy={!r}, sell={!r})".format(self.buy, self.sell)
+
+
+class Tick(_Record):
+    """A decoded ticker packet. Fields are the same as the keys of dict ticks."""
+
+    __slots__ = (
+        "tradable",
+        "mode",
+        "instrument_token",
+        "last_price",
+        "last_traded_quantity",
+        "average_traded_price",
+        "volume_traded",
+        "total_buy_quantity",
+        "total_sell_quantity",
+        "ohlc",
+        "change",
+        "last_trade_time",
+        "oi",
+        "oi_day_high",
+        "oi_day_low",
+        "exchange_timestamp",
+        "depth"
+    )
+    _fields = __slots__
+
+    def __init__(self, tradable, mode, instrument_token, last_price):
+        self.tradable = tradable
+        self.mode = mode
+        self.instrument_token = instrument_token
+        self.last_price = last_price
+
+
+class LazyDepthTick(Tick):
+    """Full mode `Tick` which decodes `depth` from its packet on first access."""
+
+    __slots__ = ("_frame", "_offset", "_divisor")
+
+    def __init__(self, tradable, mode, instrument_token, last_price, frame, offset, divisor):
+        super(LazyDepthTick, self).__init__(tradable, mode, instrument_token, last_price)
+        self._frame = frame
+        self._offset = offset
+        self._divisor = divisor
+
+    @property
+    def depth(self):
+        if self._frame is not None:
+            levels = tuple(DepthLevel(q, p, o) for q, p, o in _unpack_depth(self._frame, self._offset, self._divisor))
+            Tick.depth.__set__(self, Depth(levels[:5], levels[5:]))
+            self._frame = None
+
+        return Tick.depth.__get__(self, Tick)
+
+    @depth.setter
+    def depth(self, value):
+        self._frame = None
+        Tick.depth.__set__(self, value)
+
+    def _has(self, key):
+        if key != "depth":
+            return Tick._has(self, key)
+        # Check the slot without decoding
+        if self._frame is not None:
+            return True
+        try:
+            Tick.depth.__get__(self, Tick)
+        except AttributeError:
+            return False
+        return True
+
+
+def _with_depth(name):
+    """Wrap a dict method of `LazyDepthDict` which reads the whole dict to decode the depth before it's called."""
+    method = getattr(dict, name)
+
+    def wrapper(self, *args, **kwargs):
+        if self._frame is not None:
+            self._load_depth()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _with_depth_key(name):
+    """Wrap a dict method of `LazyDepthDict` which takes a key to decode the depth only if the key is `depth`."""
+    method = getattr(dict, name)
+
+    def wrapper(self, key, *args):
+        if key == "depth" and self._frame is not None:
+            self._load_depth()
+        return method(self, key, *args)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class LazyDepthDict(dict):
+    """
+    Full mode dict tick which decodes `depth` from its packet on first access.
+
+    Behaves like the regular tick dict, depth is decoded the first time the `depth`
+    key is read or the whole dict is read (iteration, `items()`, comparison, copy etc.).
+
+    Serialisers which read the storage of dicts directly instead of calling `items()`, like
+    `orjson.dumps`, leave out a depth which hasn't been decoded. Serialise `dict(tick)` with them.
+    """
+
+    __slots__ = ("_frame", "_offset", "_divisor")
+
+    def __init__(self, fields, frame, offset, divisor):
+        dict.__init__(self, fields)
+        self._frame = frame
+        self._offset = offset
+        self._divisor = divisor
+
+    def _load_depth(self):
+        levels = [{
+            "quantity": q,
+            "price": p,
+            "orders": o
+        } for q, p, o in _unpack_depth(self._frame, self._offset, self._divisor)]
+
+        self._frame = None
+        dict.__setitem__(self, "depth", {
+            "buy": levels[:5],
+            "sell": levels[5:]
+        })
+
+    def __missing__(self, key):
+        if key == "depth" and self._frame is not None:
+            self._load_depth()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == "depth" and self._frame is not None:
+            return True
+        return dict.__contains__(self, key)
+
+    def __len__(self):
+        return dict.__len__(self) + (1 if self._frame is not None else 0)
+
+    def __setitem__(self, key, value):
+        if key == "depth":
+            self._frame = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if key == "depth" and self._frame is not None:
+            self._frame = None
+            return
+        dict.__delitem__(self, key)
+
+    def __eq__(self, other):
+        if self._frame is not None:
+            self._load_depth()
+        if isinstance(other, LazyDepthDict) and other._frame is not None:
+            other._load_depth()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        # A depth set by the update replaces the packet's
+        if self._frame is not None and dict.__contains__(self, "depth"):
+            self._frame = None
+
+    def __reduce__(self):
+        # Pickle and copy as a plain dict tick
+        return (dict, (dict(self.items()),))
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+
+for _name in ("__iter__", "__repr__", "__reversed__", "keys", "items", "values", "copy", "popitem"):
+    if hasattr(dict, _name):
+        setattr(LazyDepthDict, _name, _with_depth(_name))
+
+for _name in ("get", "pop", "setdefault"):
+    setattr(LazyDepthDict, _name, _with_depth_key(_name))
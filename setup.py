@@ -53,6 +53,9 @@ setup(
     setup_requires=["pytest-runner"],
     extras_require={
         "doc": ["pdoc"],
+        "numpy": ["numpy"],
+        "orjson": ["orjson"],
+        "async": ['websockets>=15.0; python_version >= "3.9"', "httpx>=0.26"],
         ':sys_platform=="win32"': ["pywin32"]
     }
 )
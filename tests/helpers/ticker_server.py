@@ -0,0 +1,304 @@
+# coding: utf-8
+"""
+Local stand-in for the Kite ticker WebSocket server.
+
+Speaks the binary tick protocol with every packet size (LTP, index quote and full,
+quote and full with market depth), tracks `subscribe`, `unsubscribe` and `mode`
+messages of every client and streams ticks of the subscribed tokens at a fixed rate.
+Disconnects can be injected to exercise reconnection.
+
+Use it from tests, where it runs on a background thread:
+
+    server = MockTickerServer(rate=10000).start()
+    kws = KiteTicker("api_key", "access_token", root=server.root)
+    ...
+    server.stop()
+
+or standalone for load tests of a real `KiteTicker`:
+
+    python tests/helpers/ticker_server.py --port 9000 --rate 20000 --mode-mix ltp=0.2,quote=0.3,full=0.5
+
+Requires the `websockets` package.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+import utils
+
+log = logging.getLogger(__name__)
+
+MODES = ("ltp", "quote", "full")
+# Segment of index instrument tokens
+INDEX_SEGMENT = 9
+
+
+class Instrument(object):
+    """Random walk price state of a token."""
+
+    def __init__(self, token):
+        self.token = token
+        self.price = random.randint(10000, 500000)
+        self.open = self.high = self.low = self.price
+        self.close = self.price + random.randint(-1000, 1000)
+        self.volume = 0
+
+    def step(self):
+        self.price = max(5, self.price + random.randint(-10, 10) * 5)
+        self.high = max(self.high, self.price)
+        self.low = min(self.low, self.price)
+        self.volume += random.randint(1, 100)
+
+    def packet(self, mode, timestamp):
+        if mode == "ltp":
+            return utils.ltp_packet(self.token, self.price)
+
+        full = mode == "full"
+        if self.token & 0xff == INDEX_SEGMENT:
+            return utils.index_packet(self.token, self.price, (self.high, self.low, self.open, self.close),
+                                      exchange_timestamp=timestamp if full else None)
+
+        depth = None
+        if full:
+            depth = [(random.randint(1, 500), self.price - 5 * (i + 1), random.randint(1, 10)) for i in range(5)]
+            depth += [(random.randint(1, 500), self.price + 5 * (i + 1), random.randint(1, 10)) for i in range(5)]
+
+        return utils.quote_packet(self.token, self.price, (self.open, self.high, self.low, self.close),
+                                  volume_traded=self.volume, total_buy_quantity=self.volume // 2,
+                                  total_sell_quantity=self.volume // 3, last_trade_time=timestamp,
+                                  exchange_timestamp=timestamp if full else None, depth=depth)
+
+
+class MockTickerServer(object):
+    """
+    Mock Kite ticker server.
+
+    - `rate` is the number of ticks per second sent to every client.
+    - `frames_per_second` is the number of binary frames the ticks of a second are spread over.
+    - `mode_mix` is an optional dict of mode -> share (for example `{"ltp": 0.2, "full": 0.8}`) which assigns
+        every token a fixed mode instead of the mode asked for by the client, to load test a mix of packet sizes.
+    - `disconnect_every` in seconds drops all the connections periodically without a closing handshake.
+    - `heartbeat_interval` in seconds sends 1 byte heartbeat frames like the real server.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rate=1000, frames_per_second=10, mode_mix=None,
+                 disconnect_every=None, heartbeat_interval=1.0):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.frames_per_second = frames_per_second
+        self.mode_mix = mode_mix
+        self.disconnect_every = disconnect_every
+        self.heartbeat_interval = heartbeat_interval
+
+        self.clients = []
+        # Control messages received from all the clients
+        self.received = []
+        self.connections = 0
+        self.ticks_sent = 0
+        self.frames_sent = 0
+
+        self._instruments = {}
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def root(self):
+        """WebSocket URL of the server to pass as `root` to the ticker."""
+        return "ws://{}:{}".format(self.host, self.port)
+
+    def _mode(self, token, requested):
+        if not self.mode_mix:
+            return requested
+
+        # Stable mode per token spread by the shares
+        point = random.Random(token).random() * sum(self.mode_mix.values())
+        for mode in MODES:
+            point -= self.mode_mix.get(mode, 0)
+            if point < 0:
+                return mode
+        return requested
+
+    def _instrument(self, token):
+        instrument = self._instruments.get(token)
+        if instrument is None:
+            instrument = self._instruments[token] = Instrument(token)
+        return instrument
+
+    async def _handler(self, connection):
+        self.clients.append(connection)
+        self.connections += 1
+        subscriptions = {}
+
+        sender = asyncio.ensure_future(self._stream(connection, subscriptions))
+        sender.add_done_callback(self._stream_done)
+        try:
+            async for message in connection:
+                message = json.loads(message)
+                self.received.append(message)
+
+                action, value = message.get("a"), message.get("v")
+                if action == "subscribe":
+                    for token in value:
+                        subscriptions[token] = self._mode(token, "quote")
+                elif action == "unsubscribe":
+                    for token in value:
+                        subscriptions.pop(token, None)
+                elif action == "mode":
+                    mode, tokens = value
+                    for token in tokens:
+                        if token in subscriptions:
+                            subscriptions[token] = self._mode(token, mode)
+        except ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            self.clients.remove(connection)
+
+    def _stream_done(self, task):
+        if not task.cancelled() and task.exception() and not isinstance(task.exception(), ConnectionClosed):
+            log.error("Tick stream failed", exc_info=task.exception())
+
+    async def _stream(self, connection, subscriptions):
+        interval = 1.0 / self.frames_per_second
+        per_frame = max(1, self.rate // self.frames_per_second)
+        next_frame = time.time()
+        next_heartbeat = next_frame + self.heartbeat_interval
+        position = 0
+
+        while True:
+            next_frame += interval
+            await asyncio.sleep(max(0, next_frame - time.time()))
+
+            if self.heartbeat_interval and time.time() >= next_heartbeat:
+                next_heartbeat += self.heartbeat_interval
+                await connection.send(b"\x00")
+
+            if not subscriptions:
+                continue
+
+            # Round robin over the subscribed tokens
+            tokens = list(subscriptions)
+            timestamp = int(time.time())
+            packets = []
+            for i in range(per_frame):
+                token = tokens[(position + i) % len(tokens)]
+                instrument = self._instrument(token)
+                instrument.step()
+                packets.append(instrument.packet(subscriptions[token], timestamp))
+            position = (position + per_frame) % len(tokens)
+
+            await connection.send(utils.ticker_frame(packets))
+            self.ticks_sent += len(packets)
+            self.frames_sent += 1
+
+    async def _disconnect_periodically(self):
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            self._abort_all()
+
+    def _abort_all(self):
+        for connection in list(self.clients):
+            connection.transport.abort()
+
+    def _call(self, callback, *args):
+        """Run a callback on the server's event loop from any thread."""
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def disconnect(self):
+        """Drop all the client connections without a closing handshake."""
+        self._call(self._abort_all)
+
+    def close_clients(self, code=1000, reason=""):
+        """Close all the client connections with a closing handshake."""
+        def close():
+            for connection in list(self.clients):
+                asyncio.ensure_future(connection.close(code, reason))
+        self._call(close)
+
+    def send_text(self, message):
+        """Send a text message (a dict, for example an order update) to all the clients."""
+        payload = json.dumps(message)
+
+        def send():
+            for connection in list(self.clients):
+                asyncio.ensure_future(connection.send(payload))
+        self._call(send)
+
+    async def serve(self):
+        """Run the server on the current event loop until it's closed."""
+        self._loop = asyncio.get_event_loop()
+        self._server = await serve(self._handler, self.host, self.port, compression=None, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+
+        tasks = []
+        if self.disconnect_every:
+            tasks.append(asyncio.ensure_future(self._disconnect_periodically()))
+
+        try:
+            await self._server.wait_closed()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def start(self):
+        """Start the server on a background thread and return once it's listening."""
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.serve())
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="mock-ticker-server")
+        self._thread.daemon = True
+        self._thread.start()
+        self._started.wait(10)
+        return self
+
+    def stop(self):
+        """Stop a server started with `start()`."""
+        if self._server is not None:
+            self._call(self._server.close)
+        if self._thread is not None:
+            self._thread.join(10)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Mock Kite ticker WebSocket server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--rate", type=int, default=10000, help="Ticks per second per client.")
+    parser.add_argument("--frames-per-second", type=int, default=10)
+    parser.add_argument("--mode-mix", help="Mode shares, for example ltp=0.2,quote=0.3,full=0.5")
+    parser.add_argument("--disconnect-every", type=float, help="Drop connections every N seconds.")
+    args = parser.parse_args(args)
+
+    mode_mix = None
+    if args.mode_mix:
+        mode_mix = dict((mode, float(share)) for mode, share in (p.split("=") for p in args.mode_mix.split(",")))
+
+    server = MockTickerServer(args.host, args.port, rate=args.rate, frames_per_second=args.frames_per_second,
+                              mode_mix=mode_mix, disconnect_every=args.disconnect_every)
+    print("Serving ticks on {}".format(server.root))
+
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 # coding: utf-8
 import os
 import json
+import struct
 
 # Mock responses path
 responses_path = {
@@ -97,3 +98,45 @@ def merge_dicts(x, y):
     z = x.copy()
     z.update(y)
     return z
+
+
+def ltp_packet(instrument_token, last_price):
+    """Build an 8 byte LTP mode ticker packet. Prices are in paise."""
+    return struct.pack(">II", instrument_token, last_price)
+
+
+def index_packet(instrument_token, last_price, ohlc, exchange_timestamp=None):
+    """Build a 28 byte index quote packet or a 32 byte full packet if `exchange_timestamp` is given."""
+    high, low, open, close = ohlc
+    packet = struct.pack(">6Ii", instrument_token, last_price, high, low, open, close, last_price - close)
+    if exchange_timestamp is not None:
+        packet += struct.pack(">I", exchange_timestamp)
+    return packet
+
+
+def quote_packet(instrument_token, last_price, ohlc, last_traded_quantity=1, average_traded_price=None,
+                 volume_traded=0, total_buy_quantity=0, total_sell_quantity=0, last_trade_time=None,
+                 oi=0, oi_day_high=0, oi_day_low=0, exchange_timestamp=None, depth=None):
+    """
+    Build a 44 byte quote packet or a 184 byte full packet if `exchange_timestamp` is given.
+
+    `depth` is a list of ten `(quantity, price, orders)` tuples, bids first.
+    """
+    open, high, low, close = ohlc
+    packet = struct.pack(">11I", instrument_token, last_price, last_traded_quantity,
+                         average_traded_price or last_price, volume_traded, total_buy_quantity,
+                         total_sell_quantity, open, high, low, close)
+    if exchange_timestamp is not None:
+        packet += struct.pack(">5I", last_trade_time or exchange_timestamp, oi, oi_day_high, oi_day_low,
+                              exchange_timestamp)
+        for quantity, price, orders in depth or [(0, 0, 0)] * 10:
+            packet += struct.pack(">IIH2x", quantity, price, orders)
+    return packet
+
+
+def ticker_frame(packets):
+    """Build a binary ticker frame (as sent by the server) from a list of packets."""
+    frame = struct.pack(">H", len(packets))
+    for packet in packets:
+        frame += struct.pack(">H", len(packet)) + packet
+    return frame
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""Async Kite Connect tests"""
+import json
+import asyncio
+import inspect
+import datetime
+import pytest
+
+import kiteconnect.exceptions as ex
+
+httpx = pytest.importorskip("httpx")
+
+from kiteconnect.async_connect import AsyncKiteConnect  # noqa: E402
+
+INSTRUMENTS_CSV = (
+    "instrument_token,exchange_token,tradingsymbol,name,last_price,expiry,strike,tick_size,lot_size,"
+    "instrument_type,segment,exchange\n"
+    "408065,1594,INFY,INFOSYS,0,,0,0.05,1,EQ,NSE,NSE\n"
+)
+
+
+def success(data):
+    return httpx.Response(200, json={"status": "success", "data": data})
+
+
+class MockAPI(object):
+    """Kite API stand-in which records requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        path = request.url.path
+
+        if path == "/orders":
+            return success([{"order_id": "1", "order_timestamp": "2022-01-15 10:15:02", "status": "COMPLETE"}])
+        elif path.startswith("/orders/"):
+            return success({"order_id": "2"})
+        elif path == "/quote":
+            return success(dict((i, {"timestamp": "2022-01-15 10:15:02", "last_price": 100})
+                                for i in request.url.params.get_list("i")))
+        elif path.startswith("/instruments/historical/"):
+            return success({"candles": [["2022-01-15T09:15:00+0530", 1, 2, 0.5, 1.5, 100, 7]]})
+        elif path == "/instruments":
+            return httpx.Response(200, content=INSTRUMENTS_CSV.encode("utf-8"), headers={"content-type": "text/csv"})
+        elif path == "/session/token":
+            return success({"access_token": "<NEW-TOKEN>", "login_time": "2022-01-15 09:00:00"})
+        elif path == "/margins/basket":
+            return success({"initial": {"total": 10}})
+        elif path == "/user/profile":
+            return httpx.Response(403, json={"status": "error", "error_type": "TokenException", "message": "Expired"})
+
+        return httpx.Response(404, json={"status": "error", "error_type": "GeneralException", "message": "Not found"})
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def client(api):
+    kite = AsyncKiteConnect("<API-KEY>", access_token="<ACCESS-TOKEN>", root="https://kite.test",
+                            client=httpx.AsyncClient(transport=httpx.MockTransport(api)))
+    return kite
+
+
+def test_api_methods():
+    api = MockAPI()
+    kite = client(api)
+
+    async def main():
+        orders = await kite.orders()
+        order_id = await kite.place_order(kite.VARIETY_REGULAR, "NSE", "INFY", "BUY", 1, "CNC", "MARKET")
+        cancelled = await kite.cancel_order(kite.VARIETY_REGULAR, "2")
+        quote = await kite.quote(["NSE:INFY", "NSE:TCS"])
+        candles = await kite.historical_data(408065, datetime.datetime(2022, 1, 15, 9, 15), "2022-01-15 10:00:00",
+                                             "minute", oi=True)
+        instruments = await kite.instruments()
+        session = await kite.generate_session("<REQUEST-TOKEN>", "<SECRET>")
+        margins = await kite.basket_order_margins([{"tradingsymbol": "INFY"}], consider_positions=True)
+        await kite.client.aclose()
+        return orders, order_id, cancelled, quote, candles, instruments, session, margins
+
+    orders, order_id, cancelled, quote, candles, instruments, session, margins = run(main())
+
+    assert orders[0]["order_timestamp"] == datetime.datetime(2022, 1, 15, 10, 15, 2)
+    assert order_id == "2"
+    assert cancelled == "2"
+    assert set(quote) == {"NSE:INFY", "NSE:TCS"}
+    assert quote["NSE:INFY"]["timestamp"] == datetime.datetime(2022, 1, 15, 10, 15, 2)
+    assert candles[0]["oi"] == 7
+    assert instruments[0]["tradingsymbol"] == "INFY"
+    assert session["login_time"] == datetime.datetime(2022, 1, 15, 9, 0)
+    assert kite.access_token == "<NEW-TOKEN>"
+    assert margins == {"initial": {"total": 10}}
+
+    # Requests are built like the synchronous client's
+    place = api.requests[1]
+    assert place.method == "POST"
+    assert place.headers["Authorization"] == "token <API-KEY>:<ACCESS-TOKEN>"
+    assert place.headers["X-Kite-Version"] == "3"
+    assert b"price" not in place.content
+    assert b"tradingsymbol=INFY" in place.content
+
+    historical = api.requests[4]
+    assert historical.url.params["from"] == "2022-01-15 09:15:00"
+    assert historical.url.params["oi"] == "1"
+
+    basket = api.requests[-1]
+    assert basket.url.params["consider_positions"] == "True"
+    assert "mode" not in basket.url.params
+    assert basket.headers["Content-Type"] == "application/json"
+    assert json.loads(basket.content.decode("utf-8")) == [{"tradingsymbol": "INFY"}]
+
+
+def test_unformatted_api_methods_are_awaitable():
+    kite = client(MockAPI())
+
+    async def main():
+        result = kite.positions()
+        assert inspect.isawaitable(result)
+        with pytest.raises(ex.GeneralException):
+            await result
+
+        result = kite.mf_orders()
+        assert inspect.isawaitable(result)
+        with pytest.raises(ex.GeneralException):
+            await result
+
+        await kite.close()
+
+    run(main())
+
+
+def test_errors_and_session_hook():
+    kite = client(MockAPI())
+    expired = []
+    kite.set_session_expiry_hook(lambda: expired.append(True))
+
+    with pytest.raises(ex.TokenException):
+        run(kite.profile())
+
+    assert expired == [True]
+
+
+def test_concurrent_requests():
+    api = MockAPI()
+
+    async def main():
+        async with client(api) as kite:
+            return await asyncio.gather(*[kite.quote("NSE:SYM{}".format(i)) for i in range(200)])
+
+    quotes = run(main())
+    assert len(api.requests) == 200
+    assert [list(q) for q in quotes] == [["NSE:SYM{}".format(i)] for i in range(200)]
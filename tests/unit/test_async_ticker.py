@@ -0,0 +1,114 @@
+# coding: utf-8
+"""Async ticker tests"""
+import json
+import asyncio
+import pytest
+
+from kiteconnect import AsyncKiteTicker
+
+import utils
+
+serve = pytest.importorskip("websockets.asyncio.server").serve
+
+
+class MockServer(object):
+    """Replies to subscribe messages with an LTP tick of every token."""
+
+    def __init__(self):
+        self.clients = []
+        self.received = []
+
+    async def handler(self, connection):
+        self.clients.append(connection)
+        async for message in connection:
+            message = json.loads(message)
+            self.received.append(message)
+
+            if message["a"] == "subscribe":
+                await connection.send(utils.ticker_frame([utils.ltp_packet(t, 100 + t) for t in message["v"]]))
+
+    async def start(self):
+        self.server = await serve(self.handler, "127.0.0.1", 0)
+        self.root = "ws://127.0.0.1:{}".format(self.server.sockets[0].getsockname()[1])
+
+    def close(self):
+        self.server.close()
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, 10))
+    finally:
+        loop.close()
+
+
+def test_async_iterator():
+    server = MockServer()
+
+    async def main():
+        await server.start()
+        kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root=server.root, reconnect=False)
+
+        await kws.connect()
+        assert kws.is_connected()
+
+        kws.subscribe([1, 2])
+        kws.set_mode(kws.MODE_LTP, [1, 2])
+
+        received = []
+        async for ticks in kws:
+            received.extend(ticks)
+            await kws.close()
+
+        assert not kws.is_connected()
+        server.close()
+        return received
+
+    received = run(main())
+
+    assert server.received == [{"a": "subscribe", "v": [1, 2]}, {"a": "mode", "v": ["ltp", [1, 2]]}]
+    assert [(t["instrument_token"], t["last_price"]) for t in received] == [(1, 1.01), (2, 1.02)]
+
+
+def test_callbacks_and_resubscribe_on_reconnect():
+    server = MockServer()
+
+    async def main():
+        await server.start()
+        kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root=server.root)
+        kws._initial_delay = 0.01
+
+        received = []
+        reconnects = []
+        kws.on_ticks = lambda ws, ticks: received.extend(ticks)
+        kws.on_reconnect = lambda ws, attempts: reconnects.append(attempts)
+
+        await kws.connect()
+        kws.subscribe([3])
+        kws.set_mode(kws.MODE_FULL, [3])
+
+        while not received:
+            await asyncio.sleep(0.01)
+
+        # Server drops the connection
+        server.clients[0].transport.abort()
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+
+        await kws.close()
+        server.close()
+        return received, reconnects
+
+    received, reconnects = run(main())
+
+    assert reconnects == [1]
+    assert [t["instrument_token"] for t in received] == [3, 3]
+    assert server.received[-2:] == [{"a": "subscribe", "v": [3]}, {"a": "mode", "v": ["full", [3]]}]
+
+
+def test_connect_error_without_reconnect():
+    kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root="ws://127.0.0.1:1", reconnect=False)
+
+    with pytest.raises(OSError):
+        run(kws.connect())
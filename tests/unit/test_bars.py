@@ -0,0 +1,97 @@
+# coding: utf-8
+"""Bar aggregator tests"""
+import pytest
+from datetime import datetime
+
+from kiteconnect import KiteTicker
+from kiteconnect.bars import BarAggregator, interval_seconds, IST
+
+import utils
+
+# 2021-06-01 09:15:00 IST
+OPEN = 1622519100
+
+
+def test_interval_seconds():
+    assert interval_seconds("minute") == 60
+    assert interval_seconds("15minute") == 900
+    assert interval_seconds("day") == 86400
+    assert interval_seconds("second") == 1
+    assert interval_seconds(5) == 5
+
+    with pytest.raises(ValueError):
+        interval_seconds("week")
+
+
+def test_bars():
+    bars = []
+    aggregator = BarAggregator(["minute", "60minute", "day"], on_bar=bars.append)
+
+    aggregator.add(1, OPEN + 1, 100.0, 1000)
+    aggregator.add(1, OPEN + 20, 102.0, 1010)
+    aggregator.add(1, OPEN + 40, 99.0, 1025)
+    aggregator.add(1, OPEN + 59, 101.0, 1030)
+    assert bars == []
+
+    current = aggregator.current(1)
+    assert (current["open"], current["high"], current["low"], current["close"], current["volume"]) == \
+        (100.0, 102.0, 99.0, 101.0, 30)
+    assert current["date"] == datetime(2021, 6, 1, 9, 15, tzinfo=IST)
+
+    # Next minute completes the first bar
+    aggregator.add(1, OPEN + 61, 103.0, 1040)
+    minute, = bars
+    assert minute["interval"] == "minute"
+    assert minute["close"] == 101.0 and minute["volume"] == 30
+
+    # Late ticks of a completed bar are ignored
+    aggregator.add(1, OPEN + 59, 90.0, 1041)
+    assert aggregator.current(1)["low"] == 103.0
+
+    # 60minute bars line up with historical candles from market open, days from midnight
+    assert aggregator.current(1, "60minute")["date"] == datetime(2021, 6, 1, 9, 15, tzinfo=IST)
+    assert aggregator.current(1, "day")["date"] == datetime(2021, 6, 1, tzinfo=IST)
+    # The late tick still belongs to the open hourly bar
+    assert aggregator.current(1, "60minute")["low"] == 90.0
+
+    # Volume of the late tick goes to the next bar
+    aggregator.add(1, OPEN + 70, 104.0, 1050)
+    assert aggregator.current(1)["volume"] == 20
+    assert aggregator.current(1, "60minute")["volume"] == 50
+
+
+def test_flush():
+    bars = []
+    aggregator = BarAggregator(["minute"], on_bar=bars.append)
+
+    aggregator.add(1, OPEN + 1, 100.0)
+    aggregator.add(2, OPEN + 61, 200.0)
+
+    assert aggregator.flush(now=OPEN + 61) == 1
+    assert [b["instrument_token"] for b in bars] == [1]
+    assert aggregator.current(1) is None
+
+    # Already completed bar isn't reopened, a new bar starts normally
+    aggregator.add(1, OPEN + 30, 90.0)
+    assert aggregator.current(1) is None
+    aggregator.add(1, OPEN + 130, 95.0)
+    assert aggregator.current(1)["open"] == 95.0
+    assert len(bars) == 1
+
+
+def test_ticker_ticks():
+    bars = []
+    aggregator = BarAggregator(["minute"], on_bar=bars.append)
+
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ticker.on_ticks = aggregator.on_ticks
+
+    for seconds, price, volume in [(0, 1000, 10), (30, 1010, 15), (60, 1020, 25)]:
+        packet = utils.quote_packet(408065, price, (1000, 1000, 1000, 1000), volume_traded=volume,
+                                    last_trade_time=OPEN + seconds, exchange_timestamp=OPEN + seconds,
+                                    depth=[(0, 0, 0)] * 10)
+        ticker._on_message(None, utils.ticker_frame([packet]), True)
+
+    bar, = bars
+    assert bar["instrument_token"] == 408065
+    assert (bar["open"], bar["close"], bar["volume"]) == (10.0, 10.1, 5)
@@ -0,0 +1,201 @@
+# coding: utf-8
+"""Historical candle cache tests"""
+import asyncio
+import datetime
+import dateutil.parser
+import pytest
+import responses
+
+import kiteconnect.exceptions as ex
+import kiteconnect.historical
+from kiteconnect import KiteConnect
+from kiteconnect.cache import IST, CandleCache, CandleSeries
+from kiteconnect.ratelimit import TokenBucket
+
+NOW = datetime.datetime(2022, 1, 15, 11, 30, tzinfo=IST)
+
+
+class FakeKite(object):
+    """Client stand-in which returns a candle per day at 09:15 IST up to now."""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self.close = 100.0
+
+    def _historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        self.calls.append((from_date, to_date))
+        if from_date in self.failing:
+            raise ex.NetworkException("Too many requests", code=429)
+
+        candles = []
+        day = from_date.replace(hour=9, minute=15, second=0, tzinfo=IST)
+        if day < from_date.replace(tzinfo=IST):
+            day += datetime.timedelta(days=1)
+        while day <= min(to_date.replace(tzinfo=IST), NOW):
+            candle = {"date": day, "open": 1.5, "high": 2.5, "low": 0.5, "close": self.close, "volume": day.day}
+            if oi:
+                candle["oi"] = 10
+            candles.append(candle)
+            day += datetime.timedelta(days=1)
+        return candles
+
+
+class AsyncFakeKite(FakeKite):
+    async def _historical_data(self, *args, **kwargs):
+        return FakeKite._historical_data(self, *args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fast_bucket(monkeypatch):
+    """Default rate limit fast enough not to slow down the tests."""
+    monkeypatch.setattr(kiteconnect.historical, "DEFAULT_BUCKET", TokenBucket(1000))
+
+
+def cache(tmp_path):
+    cache = CandleCache(str(tmp_path / "candles"))
+    cache.now = lambda: NOW
+    return cache
+
+
+def test_series_coverage():
+    series = CandleSeries()
+    d = datetime.datetime
+
+    assert series.missing(d(2022, 1, 1), d(2022, 1, 10)) == [(d(2022, 1, 1), d(2022, 1, 10))]
+
+    series.cover(d(2022, 1, 3), d(2022, 1, 4))
+    series.cover(d(2022, 1, 6), d(2022, 1, 7))
+    assert series.missing(d(2022, 1, 1), d(2022, 1, 10)) == [
+        (d(2022, 1, 1), d(2022, 1, 2, 23, 59, 59)),
+        (d(2022, 1, 4, 0, 0, 1), d(2022, 1, 5, 23, 59, 59)),
+        (d(2022, 1, 7, 0, 0, 1), d(2022, 1, 10))
+    ]
+    assert series.missing(d(2022, 1, 3), d(2022, 1, 4)) == []
+
+    # Adjacent and overlapping ranges are merged
+    series.cover(d(2022, 1, 4, 0, 0, 1), d(2022, 1, 6, 12))
+    assert series.coverage == [(d(2022, 1, 3), d(2022, 1, 7))]
+
+
+def test_series_serialisation():
+    kite = FakeKite()
+    series = CandleSeries(oi=True)
+    from_date, to_date = datetime.datetime(2021, 12, 1), datetime.datetime(2021, 12, 31)
+    candles = kite._historical_data(1, from_date, to_date, "day", oi=True)
+    series.replace(from_date, to_date, candles)
+
+    loaded = CandleSeries.loads(series.dumps())
+    assert loaded.coverage == [(from_date, to_date)]
+    assert loaded.candles(from_date, to_date) == candles
+    assert isinstance(loaded.candles(from_date, to_date)[0]["volume"], int)
+
+    with pytest.raises(ValueError):
+        CandleSeries.loads(b"{}")
+
+
+def test_cache_fetches_missing_ranges(tmp_path):
+    kite = FakeKite()
+    c = cache(tmp_path)
+
+    candles = c.historical_data(kite, 408065, "2021-11-01", "2021-12-31 23:59:59", "day")
+    assert len(candles) == 61
+    assert len(kite.calls) == 1
+
+    # Cached ranges aren't fetched again, also by a new cache of the directory
+    kite.calls = []
+    assert cache(tmp_path).historical_data(kite, 408065, "2021-12-01", "2021-12-10", "day") == candles[30:39]
+    assert kite.calls == []
+
+    # Only the uncached ranges are fetched
+    candles = c.historical_data(kite, 408065, "2021-10-01", "2022-01-10", "day")
+    assert kite.calls == [(datetime.datetime(2021, 10, 1), datetime.datetime(2021, 10, 31, 23, 59, 59)),
+                          (datetime.datetime(2022, 1, 1), datetime.datetime(2022, 1, 10))]
+    assert len(candles) == 31 + 61 + 9
+    assert [c["date"] for c in candles] == sorted(set(c["date"] for c in candles))
+
+    # Other flags are a different series
+    kite.calls = []
+    candles = c.historical_data(kite, 408065, "2021-12-01", "2021-12-10", "day", oi=True)
+    assert len(kite.calls) == 1
+    assert candles[0]["oi"] == 10
+
+
+def test_cache_refreshes_today(tmp_path):
+    kite = FakeKite()
+    c = cache(tmp_path)
+
+    candles = c.historical_data(kite, 408065, "2022-01-10", "2022-01-15 15:30:00", "day")
+    assert candles[-1]["date"] == datetime.datetime(2022, 1, 15, 9, 15, tzinfo=IST)
+    assert c.load(408065, "day").coverage == [(datetime.datetime(2022, 1, 10),
+                                               datetime.datetime(2022, 1, 14, 23, 59, 59))]
+    assert len(c.load(408065, "day")) == 5
+
+    # Today is fetched again, the days before aren't
+    kite.calls = []
+    kite.close = 101.0
+    candles = c.historical_data(kite, 408065, "2022-01-10", "2022-01-15 15:30:00", "day")
+    assert kite.calls == [(datetime.datetime(2022, 1, 15), datetime.datetime(2022, 1, 15, 15, 30))]
+    assert candles[-1]["close"] == 101.0
+    assert candles[0]["close"] == 100.0
+    assert len(candles) == 6
+
+
+def test_cache_keeps_fetched_chunks_on_errors(tmp_path):
+    kite = FakeKite()
+    kite.failing.add(datetime.datetime(2021, 9, 1))
+    c = cache(tmp_path)
+
+    with pytest.raises(ex.NetworkException):
+        c.historical_data(kite, 408065, "2021-07-03", "2021-12-31", "minute")
+
+    assert len(c.load(408065, "minute").coverage) == 2
+
+    kite.failing.clear()
+    kite.calls = []
+    candles = c.historical_data(kite, 408065, "2021-07-03", "2021-12-31", "minute")
+    assert kite.calls == [(datetime.datetime(2021, 9, 1, 0, 0, 1), datetime.datetime(2021, 10, 30, 23, 59, 59))]
+    assert len(candles) == 181
+
+
+def test_cache_async(tmp_path):
+    kite = AsyncFakeKite()
+    c = cache(tmp_path)
+
+    loop = asyncio.new_event_loop()
+    try:
+        candles = loop.run_until_complete(c.historical_data_async(kite, 408065, "2021-12-01", NOW, "day"))
+        again = loop.run_until_complete(c.historical_data_async(kite, 408065, "2021-12-01", "2022-01-14", "day"))
+    finally:
+        loop.close()
+
+    assert len(candles) == 46
+    assert again == candles[:-2]
+    assert len(kite.calls) == 1
+
+
+def test_client_candle_cache(tmp_path):
+    kite = KiteConnect("<API-KEY>", candle_cache=str(tmp_path))
+    assert isinstance(kite.candle_cache, CandleCache)
+
+    c = cache(tmp_path)
+    assert KiteConnect("<API-KEY>", candle_cache=c).candle_cache is c
+    assert KiteConnect("<API-KEY>").candle_cache is None
+
+
+@responses.activate
+def test_client_historical_data_cached(tmp_path):
+    candles = [["2021-12-{:02d}T09:15:00+0530".format(day), 1, 2, 0.5, 1.5, 100] for day in range(1, 11)]
+    responses.add(responses.GET, "https://api.kite.trade/instruments/historical/408065/day",
+                  json={"status": "success", "data": {"candles": candles}})
+
+    kite = KiteConnect("<API-KEY>", candle_cache=cache(tmp_path))
+    first = kite.historical_data(408065, "2021-12-01 00:00:00", "2021-12-10 23:59:59", "day")
+    second = kite.historical_data_range(408065, "2021-12-01 00:00:00", "2021-12-10 23:59:59", "day")
+
+    assert len(responses.calls) == 1
+    assert len(first) == 10
+    assert first == second
+
+    # Cached dates have the timezone of fetched ones
+    assert all(c["date"].tzinfo is dateutil.parser.parse(candles[0][0]).tzinfo for c in first)
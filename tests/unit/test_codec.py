@@ -0,0 +1,83 @@
+# coding: utf-8
+"""JSON codec tests"""
+import json
+import pytest
+import responses
+from mock import Mock
+
+import kiteconnect.exceptions as ex
+from kiteconnect import KiteConnect, KiteTicker
+from kiteconnect.codec import JSONCodec, STDLIB, get_codec
+
+
+def test_get_codec():
+    assert get_codec() is STDLIB
+    assert get_codec("json") is STDLIB
+
+    codec = JSONCodec(json.loads, json.dumps, "custom")
+    assert get_codec(codec) is codec
+    assert get_codec("auto").name in ("orjson", "ujson", "json")
+
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "ujson"])
+def test_codecs(name):
+    if name != "json":
+        pytest.importorskip(name)
+
+    codec = get_codec(name)
+    document = {"status": "success", "data": [{"tradingsymbol": "INFY", "price": 1500.5, "tag": None}]}
+
+    encoded = codec.encode(document)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded.decode("utf-8")) == document
+    assert codec.decode(encoded) == document
+    assert codec.decode(encoded.decode("utf-8")) == document
+
+    with pytest.raises(ValueError):
+        codec.decode(b"{invalid")
+
+
+@responses.activate
+def test_connect_codec():
+    calls = []
+
+    def loads(data):
+        calls.append(data)
+        return json.loads(data)
+
+    kite = KiteConnect(api_key="<API-KEY>", access_token="<ACCESS-TOKEN>", codec=JSONCodec(loads, json.dumps))
+    kite.root = "http://kite_trade_test"
+
+    responses.add(responses.POST, kite.root + kite._routes["order.margins.basket"],
+                  body='{"status": "success", "data": {"initial": {"total": 10}}}', content_type="application/json")
+    responses.add(responses.GET, kite.root + kite._routes["orders"], body="{invalid", content_type="application/json")
+
+    orders = [{"exchange": "NSE", "tradingsymbol": "INFY", "quantity": 1}]
+    assert kite.basket_order_margins(orders) == {"initial": {"total": 10}}
+
+    # Decoded from the response bytes, JSON body encoded by the codec
+    assert isinstance(calls[0], bytes)
+    request = responses.calls[0].request
+    assert request.headers["Content-Type"] == "application/json"
+    assert json.loads(request.body.decode("utf-8")) == orders
+
+    with pytest.raises(ex.DataException):
+        kite.orders()
+
+
+def test_ticker_codec():
+    codec = JSONCodec(Mock(side_effect=json.loads), Mock(side_effect=json.dumps))
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", codec=codec)
+    ticker.on_order_update = updates = Mock()
+
+    ws = ticker.ws = Mock()
+    ws.state = ws.STATE_OPEN
+    ticker.subscribe([1])
+    assert ws.sendMessage.call_args[0][0] == b'{"a": "subscribe", "v": [1]}'
+
+    ticker._on_message(None, b'{"type": "order", "data": {"order_id": "1"}}', False)
+    assert codec.loads.call_count == 1
+    assert updates.call_args[0][1] == {"order_id": "1"}
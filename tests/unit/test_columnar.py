@@ -0,0 +1,78 @@
+# coding: utf-8
+"""Columnar ticker decoder tests"""
+import pytest
+
+from kiteconnect import KiteTicker
+
+import utils
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture()
+def columnar_ticker():
+    return KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format=KiteTicker.TICK_FORMAT_COLUMNAR)
+
+
+def sample_frame():
+    depth = [(10 + i, 145000 - i * 5, i + 1) for i in range(5)] + [(20 + i, 145030 + i * 5, i + 1) for i in range(5)]
+    return utils.ticker_frame([
+        utils.quote_packet(408065, 145025, (144000, 146000, 143500, 145000), volume_traded=1000,
+                           last_trade_time=1700000000, oi=7, exchange_timestamp=1700000001, depth=depth),
+        utils.ltp_packet(0x100003, 825000000),
+        utils.quote_packet(738561, 241510, (240000, 242000, 239000, 0), volume_traded=251,
+                           last_trade_time=1700000000, exchange_timestamp=1700000002, depth=depth),
+        utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000)),
+    ])
+
+
+def test_columnar_batch(columnar_ticker):
+    batch = columnar_ticker._parse_ticks(sample_frame())
+
+    # Grouped by packet length: ltp, index quote, full
+    assert batch["instrument_token"].tolist() == [0x100003, 256265, 408065, 738561]
+    assert batch["mode"].tolist() == ["ltp", "quote", "full", "full"]
+    assert batch["tradable"].tolist() == [True, False, True, True]
+    assert batch["last_price"].tolist() == [82.5, 19500.0, 1450.25, 2415.1]
+    assert batch["volume_traded"].tolist() == [0, 0, 1000, 251]
+    assert batch["exchange_timestamp"].tolist() == [0, 0, 1700000001, 1700000002]
+    assert np.isnan(batch["close"][0])
+    assert batch["change"][3] == 0
+    assert batch["depth_buy_price"].shape == (4, 5)
+    assert batch["depth_sell_quantity"][2].tolist() == [20, 21, 22, 23, 24]
+
+
+def test_columnar_matches_dict_ticks(columnar_ticker, kiteticker):
+    frame = sample_frame()
+    batch = columnar_ticker._parse_ticks(frame)
+    ticks = {t["instrument_token"]: t for t in kiteticker._parse_binary(frame)}
+
+    for row, token in enumerate(batch["instrument_token"].tolist()):
+        tick = ticks[token]
+        assert batch["last_price"][row] == tick["last_price"]
+        if "ohlc" in tick:
+            assert batch["close"][row] == tick["ohlc"]["close"]
+            assert batch["change"][row] == pytest.approx(tick["change"])
+        if "depth" in tick:
+            assert batch["depth_buy_price"][row].tolist() == [d["price"] for d in tick["depth"]["buy"]]
+            assert batch["depth_sell_orders"][row].tolist() == [d["orders"] for d in tick["depth"]["sell"]]
+
+
+def test_columnar_interleaved_packets(columnar_ticker, kiteticker):
+    # Packets of the same length which are not back to back in the frame
+    frame = utils.ticker_frame([utils.ltp_packet((i << 8) | 1, 100 * i) if i % 2 else
+                                utils.quote_packet((i << 8) | 1, 100 * i, (1, 1, 1, 1)) for i in range(6)])
+    batch = columnar_ticker._parse_ticks(frame)
+
+    assert batch["instrument_token"].tolist() == [0x101, 0x301, 0x501, 0x001, 0x201, 0x401]
+    assert batch["last_price"].tolist() == [1.0, 3.0, 5.0, 0.0, 2.0, 4.0]
+
+
+def test_columnar_empty_frame(columnar_ticker):
+    batch = columnar_ticker._parse_ticks(b"\x00\x00")
+    assert len(batch["instrument_token"]) == 0
+
+
+def test_invalid_tick_format():
+    with pytest.raises(ValueError):
+        KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format="xml")
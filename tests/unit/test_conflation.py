@@ -0,0 +1,56 @@
+# coding: utf-8
+"""Conflating tick buffer tests"""
+import threading
+import pytest
+
+from kiteconnect import KiteTicker
+from kiteconnect.conflation import ConflatingBuffer
+
+import utils
+
+
+def tick(token, price):
+    return {"instrument_token": token, "last_price": price}
+
+
+def test_conflating_buffer():
+    buffer = ConflatingBuffer()
+    buffer.update([tick(1, 10), tick(2, 20), tick(1, 11)])
+    buffer.update([tick(1, 12)])
+
+    assert buffer.latest(1)["last_price"] == 12
+    assert buffer.latest(3) is None
+    assert buffer.pending() == 2
+    assert buffer.drain() == [tick(1, 12), tick(2, 20)]
+    assert buffer.drain() == []
+    assert (buffer.updates, buffer.conflated) == (4, 2)
+
+    # Latest value is kept after draining
+    assert buffer.latest(2)["last_price"] == 20
+
+
+def test_conflating_buffer_wait():
+    buffer = ConflatingBuffer()
+    assert buffer.drain(timeout=0.01) == []
+
+    timer = threading.Timer(0.05, buffer.update, args=([tick(1, 10)],))
+    timer.start()
+    assert buffer.drain(timeout=5) == [tick(1, 10)]
+    timer.join()
+
+
+def test_ticker_conflate():
+    kws = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", conflate=True)
+    kws.on_ticks = lambda ws, ticks: pytest.fail("on_ticks is not called in conflate mode")
+
+    for price in [100, 101, 102]:
+        kws._on_message(None, utils.ticker_frame([utils.ltp_packet(408065, price), utils.ltp_packet(738561, 5)]), True)
+
+    assert kws.latest(408065)["last_price"] == 1.02
+    assert [t["last_price"] for t in kws.drain()] == [1.02, 0.05]
+    assert kws.drain() == []
+
+
+def test_ticker_without_conflate(kiteticker):
+    with pytest.raises(RuntimeError):
+        kiteticker.drain()
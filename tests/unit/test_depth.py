@@ -0,0 +1,62 @@
+# coding: utf-8
+"""Market depth state tests"""
+from kiteconnect import KiteTicker
+from kiteconnect.depth import MarketDepth
+
+import utils
+
+DEPTH = [(10 * (i + 1), 1000 - i, i + 1) for i in range(5)] + [(20 * (i + 1), 1001 + i, i + 1) for i in range(5)]
+
+
+def full_packet(last_price=1000, depth=DEPTH, volume_traded=500, token=408065):
+    return utils.quote_packet(token, last_price, (990, 1010, 980, 995), volume_traded=volume_traded,
+                              last_trade_time=1600000000, exchange_timestamp=1600000001, depth=depth)
+
+
+def test_update_in_place():
+    depth = MarketDepth(408065)
+    best_bid = depth.buy[0]
+
+    assert depth.last_price is None
+    assert depth.update(full_packet(), 0)
+    assert len(depth.changed_fields) == 15
+    assert len(depth.changed_levels) == 10
+    assert depth.last_price == 10.0
+    assert depth.close == 9.95
+    assert depth.exchange_timestamp == 1600000001
+    assert best_bid.to_dict() == {"quantity": 10, "price": 10.0, "orders": 1}
+    assert depth.sell[4].to_dict() == {"quantity": 100, "price": 10.05, "orders": 5}
+
+    # Identical packet
+    assert not depth.update(full_packet(), 0)
+    assert depth.changed_fields == ()
+    assert depth.changed_levels == ()
+
+    # Only the best bid and the third offer change
+    changed = list(DEPTH)
+    changed[0] = (15, 1000, 2)
+    changed[7] = (1, 1003, 1)
+    assert depth.update(full_packet(last_price=1001, depth=changed, volume_traded=510), 0)
+    assert depth.changed_fields == ("last_price", "average_traded_price", "volume_traded")
+    assert depth.changed_levels == (("buy", 0), ("sell", 2))
+    assert depth.buy[0] is best_bid
+    assert best_bid.quantity == 15 and best_bid.orders == 2
+    assert depth.sell[2].quantity == 1
+    assert depth.updates == 3
+
+
+def test_ticker_depth_updates():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    updates = []
+    ticker.on_depth_update = lambda ws, depths: updates.append([(d.instrument_token, d.changed_levels) for d in depths])
+
+    changed = list(DEPTH)
+    changed[5] = (1, 1001, 1)
+    frame = utils.ticker_frame([full_packet(), full_packet(token=(1 << 8) | 1), utils.ltp_packet(5, 100)])
+    ticker._on_message(None, frame, True)
+    ticker._on_message(None, utils.ticker_frame([full_packet(), full_packet(token=(1 << 8) | 1, depth=changed)]), True)
+
+    assert [token for token, _ in updates[0]] == [408065, 257]
+    assert updates[1] == [(257, (("sell", 0),))]
+    assert ticker.market_depth(257).sell[0].quantity == 1
+    assert ticker.market_depth(5) is None
@@ -0,0 +1,130 @@
+# coding: utf-8
+"""Tick dispatcher tests"""
+import time
+import threading
+import pytest
+
+from kiteconnect import KiteTicker
+from kiteconnect.dispatch import TickDispatcher
+
+import utils
+
+
+def tick(token, price):
+    return {"instrument_token": token, "last_price": price}
+
+
+class BlockedHandler(object):
+    """Handler which blocks the worker on the first frame until released."""
+
+    def __init__(self):
+        self.frames = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, ticks):
+        self.started.set()
+        self.release.wait(5)
+        self.frames.append(ticks)
+
+
+def fill(dispatcher, frames):
+    handler = BlockedHandler()
+    dispatcher.handler = handler
+
+    # First frame is picked up by the worker and blocks it
+    dispatcher.submit([tick(0, 0)])
+    assert handler.started.wait(5)
+
+    for frame in frames:
+        dispatcher.submit(frame)
+
+    return handler
+
+
+def finish(dispatcher, handler):
+    handler.release.set()
+    dispatcher.stop()
+    return handler.frames[1:]
+
+
+def test_dispatch_in_order():
+    dispatcher = TickDispatcher()
+    thread_names = []
+    frames = []
+
+    def handler(ticks):
+        thread_names.append(threading.current_thread().name)
+        frames.append(ticks)
+
+    dispatcher.handler = handler
+    for i in range(50):
+        dispatcher.submit([tick(1, i)])
+    dispatcher.stop()
+
+    assert [f[0]["last_price"] for f in frames] == list(range(50))
+    assert threading.current_thread().name not in thread_names
+    assert dispatcher.dispatched == 50
+
+
+def test_overflow_drop_oldest():
+    dispatcher = TickDispatcher(maxsize=2, overflow=TickDispatcher.OVERFLOW_DROP_OLDEST)
+    handler = fill(dispatcher, [[tick(1, i)] for i in range(5)])
+
+    assert dispatcher.queue_depth == 2
+    assert dispatcher.dropped == 3
+    assert [f[0]["last_price"] for f in finish(dispatcher, handler)] == [3, 4]
+    assert dispatcher.stats()["max_queue_depth"] == 2
+
+
+def test_overflow_conflate():
+    dispatcher = TickDispatcher(maxsize=1, overflow=TickDispatcher.OVERFLOW_CONFLATE)
+    handler = fill(dispatcher, [[tick(1, 1), tick(2, 1)], [tick(1, 2)], [tick(3, 1), tick(1, 3)]])
+
+    assert dispatcher.conflated == 2
+    assert dispatcher.dropped == 0
+    assert finish(dispatcher, handler) == [[tick(1, 3), tick(2, 1), tick(3, 1)]]
+
+
+def test_overflow_block_timeout():
+    dispatcher = TickDispatcher(maxsize=1, overflow=TickDispatcher.OVERFLOW_BLOCK, block_timeout=0.01)
+    handler = fill(dispatcher, [[tick(1, 1)], [tick(1, 2)]])
+
+    assert dispatcher.dropped == 1
+    assert finish(dispatcher, handler) == [[tick(1, 1)]]
+
+
+def test_overflow_block_stop():
+    dispatcher = TickDispatcher(maxsize=1, overflow=TickDispatcher.OVERFLOW_BLOCK)
+    handler = fill(dispatcher, [[tick(1, 1)]])
+
+    # A submit blocked when the dispatcher stops drops its frame
+    blocked = threading.Thread(target=dispatcher.submit, args=([tick(1, 2)],))
+    blocked.start()
+    time.sleep(0.05)
+    dispatcher.stop(wait=False)
+    blocked.join(5)
+
+    assert not blocked.is_alive()
+    assert dispatcher.dropped == 1
+    assert finish(dispatcher, handler) == [[tick(1, 1)]]
+
+
+def test_invalid_overflow():
+    with pytest.raises(ValueError):
+        TickDispatcher(overflow="ignore")
+
+
+def test_ticker_dispatcher():
+    dispatcher = TickDispatcher()
+    kws = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", dispatcher=dispatcher)
+    received = []
+    kws.on_ticks = lambda ws, ticks: received.append((ws, threading.current_thread(), ticks))
+
+    kws._on_message(None, utils.ticker_frame([utils.ltp_packet(408065, 100)]), True)
+    dispatcher.stop()
+
+    (ws, thread, ticks), = received
+    assert ws is kws
+    assert thread is not threading.current_thread()
+    assert ticks[0]["last_price"] == 1.0
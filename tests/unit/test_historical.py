@@ -0,0 +1,170 @@
+# coding: utf-8
+"""Chunked historical data download tests"""
+import json
+import time
+import asyncio
+import datetime
+import threading
+import pytest
+import responses
+
+import kiteconnect.exceptions as ex
+import kiteconnect.historical
+from kiteconnect import KiteConnect
+from kiteconnect.historical import HistoricalDownload, chunk_range, merge_candles
+from kiteconnect.ratelimit import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def fast_bucket(monkeypatch):
+    """Default rate limit fast enough not to slow down the tests."""
+    bucket = TokenBucket(1000)
+    monkeypatch.setattr(kiteconnect.historical, "DEFAULT_BUCKET", bucket)
+    return bucket
+
+
+def daily_candles(from_date, to_date):
+    """A candle per day from and to the dates, both inclusive like the API."""
+    candles = []
+    day = from_date
+    while day <= to_date:
+        candles.append({"date": day, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": day.toordinal()})
+        day += datetime.timedelta(days=1)
+    return candles
+
+
+class FakeKite(object):
+    """Client stand-in which returns daily candles and fails the requests of some chunks."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.times = []
+        self.lock = threading.Lock()
+
+    def _historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        with self.lock:
+            self.calls.append((from_date, to_date))
+            self.times.append(time.time())
+        if from_date in self.failing:
+            raise ex.NetworkException("Too many requests", code=429)
+        return daily_candles(from_date, to_date)
+
+
+class AsyncFakeKite(FakeKite):
+    async def _historical_data(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return FakeKite._historical_data(self, *args, **kwargs)
+
+
+def test_chunk_range():
+    chunks = chunk_range("2022-01-01", datetime.date(2022, 6, 1), "minute")
+
+    assert chunks[0] == (datetime.datetime(2022, 1, 1), datetime.datetime(2022, 3, 2))
+    assert chunks[1][0] == chunks[0][1]
+    assert chunks[-1][1] == datetime.datetime(2022, 6, 1)
+    assert len(chunks) == 3
+    assert all(end - start <= datetime.timedelta(days=60) for start, end in chunks)
+
+    assert len(chunk_range("2017-01-01", "2022-01-01", "day")) == 1
+    assert chunk_range("2022-01-01 09:15:00", "2022-01-01 09:15:00", "minute") == [
+        (datetime.datetime(2022, 1, 1, 9, 15), datetime.datetime(2022, 1, 1, 9, 15))]
+
+    with pytest.raises(ex.InputException):
+        chunk_range("2022-01-01", "2022-02-01", "2minute")
+    with pytest.raises(ex.InputException):
+        chunk_range("2022-02-01", "2022-01-01", "day")
+
+
+def test_merge_candles():
+    a = [{"date": 1}, {"date": 2}, {"date": 3}]
+    b = [{"date": 3}, {"date": 4}]
+    assert [c["date"] for c in merge_candles([a, b, []])] == [1, 2, 3, 4]
+
+
+def test_download():
+    kite = FakeKite()
+    download = HistoricalDownload(kite, 408065, "2021-01-01", "2021-12-31", "minute").run(workers=3)
+
+    assert download.complete
+    assert len(kite.calls) == len(download.chunks) == 7
+
+    candles = download.candles()
+    assert candles == daily_candles(datetime.datetime(2021, 1, 1), datetime.datetime(2021, 12, 31))
+
+
+def test_download_rate_limit(monkeypatch):
+    # Clients without a rate limiter are limited to the default rate
+    monkeypatch.setattr(kiteconnect.historical, "DEFAULT_BUCKET", TokenBucket(20))
+    kite = FakeKite()
+    HistoricalDownload(kite, 408065, "2021-01-01", "2021-12-31", "minute").run(workers=4)
+
+    times = sorted(kite.times)
+    assert len(times) == 7
+    assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+    assert times[-1] - times[0] >= 6 / 20.0 - 0.01
+
+    # Clients with a rate limiter apply their own
+    kite.rate_limiter = object()
+    assert HistoricalDownload(kite, 408065, "2021-01-01", "2021-12-31", "minute").bucket is None
+
+
+def test_download_resumes_after_failures():
+    failing = datetime.datetime(2021, 3, 2)
+    kite = FakeKite(failing=[failing])
+    download = HistoricalDownload(kite, 408065, "2021-01-01", "2021-12-31", "minute").run()
+
+    assert not download.complete
+    assert [chunk[0] for chunk in download.pending] == [failing]
+    assert list(download.errors) == download.pending
+    with pytest.raises(ex.NetworkException):
+        download.raise_for_errors()
+
+    # Only the failed chunk is fetched again
+    kite.failing.clear()
+    kite.calls = []
+    download.run()
+
+    assert kite.calls == [download.chunks[1]]
+    assert download.complete and not download.errors
+    download.raise_for_errors()
+    assert len(download.candles()) == 365
+
+
+def test_download_async():
+    kite = AsyncFakeKite(failing=[datetime.datetime(2021, 1, 1)])
+    download = HistoricalDownload(kite, 408065, "2021-01-01", "2021-12-31", "minute")
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(download.run_async(workers=2))
+        assert len(download.errors) == 1
+
+        kite.failing.clear()
+        loop.run_until_complete(download.run_async(workers=2))
+    finally:
+        loop.close()
+
+    assert download.complete
+    assert len(download.candles()) == 365
+
+
+@responses.activate
+def test_client_historical_data_range():
+    def callback(request):
+        from_date = datetime.datetime.strptime(request.params["from"], "%Y-%m-%d %H:%M:%S")
+        to_date = datetime.datetime.strptime(request.params["to"], "%Y-%m-%d %H:%M:%S")
+        candles = [[c["date"].strftime("%Y-%m-%dT%H:%M:%S+0530"), 1, 2, 0.5, 1.5, 10]
+                   for c in daily_candles(from_date, to_date)]
+        return 200, {"content-type": "application/json"}, json.dumps({"status": "success", "data": {"candles": candles}})
+
+    responses.add_callback(responses.GET, "https://api.kite.trade/instruments/historical/408065/60minute",
+                           callback=callback)
+
+    kite = KiteConnect("<API-KEY>")
+    candles = kite.historical_data_range(408065, "2020-01-01", "2021-12-31", "60minute", workers=2)
+
+    assert len(responses.calls) == 2
+    assert len(candles) == 731
+    assert candles[0]["date"].date() == datetime.date(2020, 1, 1)
+    assert candles[-1]["date"].date() == datetime.date(2021, 12, 31)
@@ -0,0 +1,105 @@
+# coding: utf-8
+"""Tick journal tests"""
+import pytest
+
+from kiteconnect import KiteTicker
+from kiteconnect.journal import TickJournal, TickJournalReader, MAGIC
+
+import utils
+
+SECOND = int(1e9)
+
+
+def write_journal(path):
+    full = utils.quote_packet(769, 300, (290, 310, 280, 295), exchange_timestamp=1600000000,
+                              last_trade_time=1600000000, depth=[(10, 300, 1)] * 10)
+
+    with TickJournal(path, bucket_seconds=10) as journal:
+        journal.append_frame(utils.ticker_frame([utils.ltp_packet(1, 100), utils.ltp_packet(2, 200)]), 1 * SECOND)
+        journal.append_frame(utils.ticker_frame([utils.ltp_packet(1, 101), full]), 15 * SECOND)
+        journal.append_frame(utils.ticker_frame([utils.ltp_packet(1, 102)]), 35 * SECOND)
+        # Heartbeats are skipped
+        assert journal.append_frame(b"\x00", 36 * SECOND) == 0
+        assert journal.records == 5
+
+
+def test_read_ranges(tmp_path):
+    path = str(tmp_path / "ticks.ktj")
+    write_journal(path)
+
+    with TickJournalReader(path) as reader:
+        assert reader.tokens() == {1, 2, 769}
+
+        ticks = list(reader.ticks(1))
+        assert [(ts // SECOND, t["last_price"]) for ts, t in ticks] == [(1, 1.0), (15, 1.01), (35, 1.02)]
+
+        # Only buckets in the range are read, records outside it are filtered
+        offset, = reader.record_offsets(1, start=12 * SECOND, end=20 * SECOND)
+        assert reader.record_offsets(1) == [len(MAGIC), offset, reader.size - 14 - 8]
+        assert [t["last_price"] for _, t in reader.ticks(1, start=16 * SECOND)] == [1.02]
+        assert [t["last_price"] for _, t in reader.ticks(1, end=15 * SECOND)] == [1.0]
+
+        (received_at, tick), = reader.ticks(769)
+        assert tick["mode"] == KiteTicker.MODE_FULL
+        assert tick["depth"]["sell"][4] == {"quantity": 10, "price": 3.0, "orders": 1}
+
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format=KiteTicker.TICK_FORMAT_OBJECT)
+    with TickJournalReader(path, ticker) as reader:
+        (received_at, tick), = reader.ticks(2)
+        assert tick.last_price == 2.0
+
+
+def test_reopen_and_rebuild_index(tmp_path):
+    path = str(tmp_path / "ticks.ktj")
+    write_journal(path)
+
+    # Stale index and a partially written record
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 10)
+
+    with TickJournal(path, bucket_seconds=10) as journal:
+        assert journal.records == 5
+        journal.append_frame(utils.ticker_frame([utils.ltp_packet(2, 201)]), 50 * SECOND)
+
+    # Records are as long as their packets, five LTP packets and a full one
+    with open(path, "rb") as f:
+        assert len(f.read()) == len(MAGIC) + 6 * 14 + 5 * 8 + 184
+
+    # Records which aren't indexed and a partially written index block
+    with open(path + ".idx", "rb") as f:
+        index = f.read()
+    with TickJournal(path, bucket_seconds=10) as journal:
+        journal.append_frame(utils.ticker_frame([utils.ltp_packet(2, 202)]), 55 * SECOND)
+    with open(path + ".idx", "wb") as f:
+        f.write(index + b"\x00" * 10)
+
+    with TickJournal(path, bucket_seconds=10) as journal:
+        assert journal.records == 7
+
+    with TickJournalReader(path) as reader:
+        assert reader.records == 7
+        assert [t["last_price"] for _, t in reader.ticks(2)] == [2.0, 2.01, 2.02]
+        assert [t["last_price"] for _, t in reader.ticks(1)] == [1.0, 1.01, 1.02]
+
+
+def test_ticker_journal(tmp_path):
+    path = str(tmp_path / "ticks.ktj")
+    journal = TickJournal(path)
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", journal=journal)
+
+    ticker._on_message(None, utils.ticker_frame([utils.ltp_packet(1, 100)]), True)
+    ticker._on_message(None, b'{"type": "message", "data": ""}', False)
+    journal.flush()
+
+    with TickJournalReader(path) as reader:
+        assert [t["last_price"] for _, t in reader.ticks(1)] == [1.0]
+
+    journal.close()
+
+    with pytest.raises(ValueError):
+        TickJournalReader(str(tmp_path / "missing.ktj"))
+
+    with open(str(tmp_path / "other.ktj"), "wb") as f:
+        f.write(b"not a journal")
+    with pytest.raises(ValueError):
+        TickJournal(str(tmp_path / "other.ktj"))
@@ -0,0 +1,65 @@
+# coding: utf-8
+"""Ticker metrics tests"""
+import time
+
+from kiteconnect import KiteTicker
+from kiteconnect.metrics import Histogram, TickerMetrics, _bucket, _bucket_range
+
+import utils
+
+
+def test_buckets():
+    previous = -1
+    for value in list(range(200)) + [10 ** 3, 10 ** 6, 10 ** 9, 2 ** 39]:
+        index = _bucket(value)
+        low, high = _bucket_range(index)
+        assert low <= value <= high
+        assert high - low <= max(1, 0.07 * value)
+        assert index >= previous
+        previous = index
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+
+    for value in range(1, 1001):
+        histogram.record(value)
+    histogram.record(-5)
+
+    assert histogram.count == 1001
+    assert histogram.min == 0
+    assert histogram.max == 1000
+    assert abs(histogram.percentile(50) - 500) <= 500 * 0.07
+    assert abs(histogram.percentile(99) - 990) <= 990 * 0.07
+    assert histogram.percentile(100) == 1000
+    assert histogram.summary()["count"] == 1001
+
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.max is None
+
+
+def test_ticker_metrics():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", metrics=True)
+    ticker.on_ticks = lambda ws, ticks: time.sleep(0.002)
+
+    exchange_timestamp = int(time.time()) - 2
+    full = utils.quote_packet(408065, 100, (100, 100, 100, 100), exchange_timestamp=exchange_timestamp,
+                              depth=[(0, 0, 0)] * 10)
+    for i in range(3):
+        ticker._on_message(None, utils.ticker_frame([utils.ltp_packet(1, 100), full]), True)
+
+    metrics = ticker.metrics
+    assert metrics.frames == 3
+    assert metrics.frame_interval.count == 2
+    assert metrics.decode.count == 3
+    assert metrics.on_ticks.count == 3
+    assert metrics.on_ticks.min >= 2000
+    assert 2000 <= metrics.exchange_lag.min <= 4000
+    assert set(metrics.summary()) == {"frames", "frame_interval", "decode", "on_ticks", "exchange_lag"}
+
+    # Shared between tickers
+    shared = TickerMetrics()
+    assert KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", metrics=shared).metrics is shared
+    assert KiteTicker("<API-KEY>", "<ACCESS-TOKEN>").metrics is None
@@ -0,0 +1,112 @@
+# coding: utf-8
+"""Order update tests"""
+import json
+from datetime import datetime
+
+from kiteconnect import KiteTicker
+from kiteconnect.codec import JSONCodec
+from kiteconnect.orders import OrderUpdate, OrderBook, parse_timestamp
+
+
+def order_message(order_id="220115000000001", status="OPEN", filled_quantity=0,
+                  exchange_update_timestamp="2022-01-15 10:15:02", **fields):
+    data = {
+        "order_id": order_id,
+        "status": status,
+        "tradingsymbol": "INFY",
+        "instrument_token": 408065,
+        "quantity": 10,
+        "filled_quantity": filled_quantity,
+        "order_timestamp": "2022-01-15 10:15:01",
+        "exchange_update_timestamp": exchange_update_timestamp,
+        "exchange_timestamp": None,
+        "meta": {}
+    }
+    data.update(fields)
+    return json.dumps({"type": "order", "data": data}).encode("utf-8")
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2022-01-15 10:15:02") == datetime(2022, 1, 15, 10, 15, 2)
+    assert parse_timestamp("2022-01-15 10:15:02") is parse_timestamp("2022-01-15 10:15:02")
+    assert parse_timestamp(None) is None
+    assert parse_timestamp("") == ""
+    assert parse_timestamp("2022-01-15") == "2022-01-15"
+
+
+def test_order_update_fields():
+    update = OrderUpdate(json.loads(order_message(new_field=1))["data"])
+
+    assert update.status == "OPEN"
+    assert update["quantity"] == 10
+    assert update.order_timestamp == datetime(2022, 1, 15, 10, 15, 1)
+    assert update.exchange_timestamp is None
+    assert update.price is None
+    assert update.extra == {"new_field": 1}
+    assert update.to_dict()["filled_quantity"] == 0
+
+
+def test_order_book_updates_in_place():
+    book = OrderBook()
+    first = book.update(json.loads(order_message())["data"])
+    filled = json.loads(order_message(status="COMPLETE", filled_quantity=10,
+                                      exchange_update_timestamp="2022-01-15 10:15:05"))["data"]
+
+    assert book.update(filled) is first
+    assert first.status == "COMPLETE"
+    assert first.filled_quantity == 10
+    assert first.exchange_update_timestamp == datetime(2022, 1, 15, 10, 15, 5)
+
+    # Older update arriving late
+    assert book.update(OrderUpdate(json.loads(order_message())["data"])) is None
+    assert first.status == "COMPLETE"
+    assert book.stale == 1
+    assert len(book) == 1
+    assert book["220115000000001"] is first
+
+    # Timestamps which can't be compared aren't stale
+    for timestamp in ["", "10:15:06"]:
+        assert book.update(dict(filled, exchange_update_timestamp=timestamp)) is first
+    assert book.stale == 1
+
+    # Objects are copied into the book
+    update = OrderUpdate(json.loads(order_message(order_id="2"))["data"])
+    assert book.update(update) == update
+    assert book.get("2") is not update
+    assert [o.order_id for o in book] == ["220115000000001", "2"]
+
+
+def test_ticker_order_updates():
+    loads = []
+
+    def json_loads(payload):
+        loads.append(payload)
+        return json.loads(payload)
+
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", codec=JSONCodec(json_loads, json.dumps, loads_bytes=False),
+                        order_updates=True)
+    updates = []
+    ticker.on_order_update = lambda ws, data: updates.append(data)
+
+    ticker._on_message(None, order_message(), False)
+    ticker._on_message(None, order_message(order_id="2", status="REJECTED"), False)
+    ticker._on_message(None, order_message(status="COMPLETE", exchange_update_timestamp="2022-01-15 10:16:00"), False)
+
+    assert len(loads) == 3
+    assert [type(u) for u in updates] == [OrderUpdate] * 3
+    # The state of the order is passed and updated in place
+    assert updates[0] is updates[2]
+    assert [u.status for u in updates] == ["COMPLETE", "REJECTED", "COMPLETE"]
+    assert ticker.orders.get("220115000000001") is updates[0]
+    assert len(ticker.orders) == 2
+
+    # Stale updates are not passed on
+    ticker._on_message(None, order_message(status="OPEN"), False)
+    assert len(updates) == 3
+
+    # Dicts by default
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ticker.on_order_update = lambda ws, data: updates.append(data)
+    ticker._on_message(None, order_message(), False)
+    assert updates[-1]["order_timestamp"] == "2022-01-15 10:15:01"
+    assert ticker.orders is None
@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Ticker pool tests"""
+import json
+import pytest
+from mock import Mock
+
+from kiteconnect import KiteTickerPool
+
+import utils
+
+
+def open_connection(pool, index):
+    """Fake an open WebSocket connection on a ticker of the pool."""
+    ticker = pool.tickers[index]
+    ws = Mock()
+    ws.state = ws.STATE_OPEN
+    # Autobahn opens the connection before calling `onConnect` and then `onOpen`
+    ticker._on_connect(ws, None)
+    ticker._on_open(ws)
+    return ws
+
+
+def sent_messages(ws):
+    return [json.loads(c[0][0].decode("utf-8")) for c in ws.sendMessage.call_args_list]
+
+
+@pytest.fixture()
+def pool():
+    return KiteTickerPool("<API-KEY>", "<ACCESS-TOKEN>", connections=3, max_tokens_per_connection=4,
+                          rebalance_threshold=1)
+
+
+def test_subscribe_shards(pool):
+    pool.subscribe(list(range(1, 8)))
+
+    assert [len(t.subscribed_tokens) for t in pool.tickers] == [3, 2, 2]
+    assert pool.ticker_for(1) is pool.tickers[0]
+    assert pool.ticker_for(2) is pool.tickers[1]
+    assert len(pool.subscribed_tokens) == 7
+
+    # Already subscribed tokens stay on their connection
+    pool.subscribe([1, 2])
+    assert [len(t.subscribed_tokens) for t in pool.tickers] == [3, 2, 2]
+
+    with pytest.raises(ValueError):
+        pool.subscribe(list(range(100, 106)))
+
+
+def test_pending_subscriptions_sent_on_open(pool):
+    pool.subscribe([1, 2, 3, 4])
+    pool.set_mode(pool.MODE_FULL, [1, 4])
+
+    ws = open_connection(pool, 0)
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 4]},
+        {"a": "mode", "v": ["full", [1, 4]]},
+    ]
+
+    # Connected tickers get the messages right away
+    pool.unsubscribe([4])
+    assert sent_messages(ws)[-1] == {"a": "unsubscribe", "v": [4]}
+
+
+def test_rebalance_on_unsubscribe(pool):
+    pool.subscribe(list(range(1, 13)))
+    pool.set_mode(pool.MODE_LTP, [3, 6, 9, 12])
+    assert [len(t.subscribed_tokens) for t in pool.tickers] == [4, 4, 4]
+
+    # Leaves the connections at 4, 1, 3
+    pool.unsubscribe([2, 5, 8, 11])
+    loads = [len(t.subscribed_tokens) for t in pool.tickers]
+    assert max(loads) - min(loads) <= 1
+    assert sorted(pool.subscribed_tokens) == [1, 3, 4, 6, 7, 9, 10, 12]
+
+    # Modes move along with the tokens
+    assert set(t for t, m in pool.subscribed_tokens.items() if m == pool.MODE_LTP) == {3, 6, 9, 12}
+    for token in pool.subscribed_tokens:
+        assert token in pool.ticker_for(token).subscribed_tokens
+
+
+def test_merged_ticks(pool):
+    received = []
+    updates = []
+    pool.on_ticks = lambda p, ticks: received.extend(t["instrument_token"] for t in ticks)
+    pool.on_order_update = lambda p, data: updates.append(data)
+
+    pool.tickers[0]._on_message(None, utils.ticker_frame([utils.ltp_packet(408065, 100)]), True)
+    pool.tickers[2]._on_message(None, utils.ticker_frame([utils.ltp_packet(738561, 100)]), True)
+    assert received == [408065, 738561]
+
+    # Order updates of the same user are sent on every connection
+    for ticker in pool.tickers:
+        ticker._on_message(None, json.dumps({"type": "order", "data": {"order_id": "1"}}).encode("utf-8"), False)
+    assert updates == [{"order_id": "1"}]
+
+    # Forwarded from any connection, for example while the first one reconnects
+    update = {"order_id": "1", "status": "COMPLETE", "exchange_update_timestamp": "2021-06-01 10:00:01"}
+    for ticker in pool.tickers[1:]:
+        ticker._on_message(None, json.dumps({"type": "order", "data": update}).encode("utf-8"), False)
+    assert updates == [{"order_id": "1"}, update]
+
+
+def test_order_book_shared():
+    pool = KiteTickerPool("<API-KEY>", "<ACCESS-TOKEN>", connections=2, order_updates=True)
+    assert all(ticker.orders is pool.orders for ticker in pool.tickers)
+
+    updates = []
+    pool.on_order_update = lambda p, data: updates.append(data)
+    for ticker in pool.tickers:
+        ticker._on_message(None, json.dumps({"type": "order", "data": {"order_id": "1"}}).encode("utf-8"), False)
+    assert updates == [pool.orders["1"]]
+
+
+@pytest.mark.parametrize("kwargs", [{"dispatcher": object()}, {"record": "frames.rec"}])
+def test_unshared_kwargs(kwargs):
+    with pytest.raises(ValueError):
+        KiteTickerPool("<API-KEY>", "<ACCESS-TOKEN>", connections=2, **kwargs)
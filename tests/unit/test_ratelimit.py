@@ -0,0 +1,159 @@
+# coding: utf-8
+"""Rate limiter tests"""
+import time
+import asyncio
+import threading
+import pytest
+import responses
+
+from kiteconnect import KiteConnect
+from kiteconnect.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock(object):
+    """Clock which only moves when slept on."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def fake_bucket(rate, burst=1):
+    bucket = TokenBucket(rate, burst=burst)
+    bucket.clock = FakeClock()
+    bucket.sleep = bucket.clock.sleep
+    return bucket
+
+
+def test_bucket_spaces_requests():
+    bucket = fake_bucket(4)
+    start = bucket.clock()
+
+    delays = [bucket.acquire() for _ in range(5)]
+    assert delays == [0, 0.25, 0.25, 0.25, 0.25]
+    assert bucket.clock() - start == 1
+
+    # Idle time doesn't accumulate more than one request
+    bucket.clock.sleep(10)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.25
+
+    wait = bucket.wait.summary()
+    assert wait["count"] == 7
+    assert wait["max"] == 250000
+
+
+def test_bucket_bursts():
+    bucket = fake_bucket(10, burst=3)
+
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.1)
+
+    bucket.clock.sleep(1)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+
+def test_bucket_reservations_queue_in_order():
+    bucket = fake_bucket(2)
+
+    # Callers arriving together are given consecutive slots
+    assert [bucket.reserve() for _ in range(4)] == [0, 0.5, 1, 1.5]
+
+
+def test_bucket_arguments():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+    with pytest.raises(ValueError):
+        TokenBucket(1, burst=0)
+
+
+def test_route_groups():
+    limiter = RateLimiter()
+
+    assert limiter.group("market.quote") == "quote"
+    assert limiter.group("market.quote.ltp") == "quote"
+    assert limiter.group("market.historical") == "historical"
+    assert limiter.group("order.place") == "order"
+    assert limiter.group("order.margins.basket") == "order"
+    assert limiter.group("portfolio.positions") == "default"
+    assert limiter.bucket("market.quote.ohlc") is limiter.buckets["quote"]
+    assert limiter.bucket("market.quote.ohlc") is limiter.bucket("market.quote")
+
+    limiter = RateLimiter([("quote", ["market.quote*"], 1)])
+    assert limiter.group("order.place") is None
+    assert limiter.acquire("order.place") == 0
+    assert set(limiter.summary()) == {"quote"}
+
+
+def test_threads_are_queued():
+    limiter = RateLimiter([("default", ["*"], 50)])
+    done = []
+
+    def worker():
+        for _ in range(2):
+            limiter.acquire("orders")
+            done.append(time.time())
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 20 requests at 50 per second, the first one immediately
+    assert len(done) == 20
+    assert max(done) - start >= 19 / 50.0 - 0.01
+    assert limiter.summary()["default"]["count"] == 20
+
+
+def test_coroutines_are_queued():
+    limiter = RateLimiter([("default", ["*"], 50)])
+
+    async def main():
+        start = time.time()
+        delays = await asyncio.gather(*[limiter.acquire_async("orders") for _ in range(10)])
+        return time.time() - start, delays
+
+    loop = asyncio.new_event_loop()
+    try:
+        elapsed, delays = loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    assert elapsed >= 9 / 50.0 - 0.01
+    assert delays == sorted(delays)
+    assert delays[0] == 0
+
+
+@responses.activate
+def test_client_rate_limit():
+    responses.add(responses.GET, "https://api.kite.trade/quote/ltp",
+                  json={"status": "success", "data": {}}, status=200)
+    responses.add(responses.GET, "https://api.kite.trade/portfolio/positions",
+                  json={"status": "success", "data": {}}, status=200)
+
+    assert KiteConnect("<API-KEY>").rate_limiter is None
+
+    kite = KiteConnect("<API-KEY>", rate_limit=True)
+    for bucket in kite.rate_limiter.buckets.values():
+        bucket.clock = FakeClock()
+        bucket.sleep = bucket.clock.sleep
+
+    for _ in range(3):
+        kite.ltp("NSE:INFY")
+    kite.positions()
+
+    summary = kite.rate_limiter.summary()
+    assert summary["quote"]["count"] == 3
+    assert summary["quote"]["max"] == 1000000
+    assert summary["default"]["count"] == 1
+
+    # Limiters can be shared by clients
+    limiter = RateLimiter()
+    assert KiteConnect("<API-KEY>", rate_limit=limiter).rate_limiter is limiter
@@ -0,0 +1,95 @@
+# coding: utf-8
+"""Frame recorder and replayer tests"""
+import time
+import json
+import pytest
+
+from kiteconnect import KiteTicker
+from kiteconnect.recorder import FrameRecorder, TickReplayer, read_frames
+
+import utils
+
+
+def test_record_and_read(tmp_path):
+    path = str(tmp_path / "session.ktr")
+    frame = utils.ticker_frame([utils.ltp_packet(1, 100)])
+
+    with FrameRecorder(path) as recorder:
+        recorder.write(frame, True, timestamp=1000)
+        recorder.write(b'{"type": "order"}', False, timestamp=2000)
+
+    # Appending to an existing recording
+    with FrameRecorder(path) as recorder:
+        recorder.write(frame, True, timestamp=3000)
+        assert recorder.frames == 1
+        assert recorder.bytes == len(frame)
+
+    assert list(read_frames(path)) == [
+        (1000, True, frame),
+        (2000, False, b'{"type": "order"}'),
+        (3000, True, frame)
+    ]
+
+
+def test_truncated_and_invalid_recordings(tmp_path):
+    path = str(tmp_path / "session.ktr")
+    with FrameRecorder(path) as recorder:
+        recorder.write(b"abcd", True, timestamp=1)
+        recorder.write(b"efgh", True, timestamp=2)
+
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 2)
+
+    assert list(read_frames(path)) == [(1, True, b"abcd")]
+
+    invalid = tmp_path / "invalid.ktr"
+    invalid.write_bytes(b"not a recording")
+    with pytest.raises(ValueError):
+        list(read_frames(str(invalid)))
+
+
+def test_ticker_records_frames(tmp_path):
+    path = str(tmp_path / "session.ktr")
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", record=path)
+
+    frame = utils.ticker_frame([utils.ltp_packet(1, 100)])
+    message = json.dumps({"type": "order", "data": {}}).encode("utf-8")
+    ticker._on_message(None, frame, True)
+    ticker._on_message(None, message, False)
+    ticker._recorder.close()
+
+    frames = list(read_frames(path))
+    assert [(f[1], f[2]) for f in frames] == [(True, frame), (False, message)]
+    assert frames[0][0] <= frames[1][0]
+    assert abs(frames[0][0] / 1e9 - time.time()) < 60
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / "session.ktr")
+    with FrameRecorder(path) as recorder:
+        recorder.write(utils.ticker_frame([utils.ltp_packet(1, 100)]), True, timestamp=0)
+        recorder.write(utils.ticker_frame([utils.ltp_packet(2, 200)]), True, timestamp=int(0.2e9))
+        recorder.write(json.dumps({"type": "order", "data": {"order_id": "1"}}).encode("utf-8"), False,
+                       timestamp=int(0.4e9))
+
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ticks, orders = [], []
+    ticker.on_ticks = lambda ws, t: ticks.extend(t)
+    ticker.on_order_update = lambda ws, data: orders.append(data)
+
+    # Real time spacing, at 4x
+    replayer = TickReplayer(path, ticker, speed=4)
+    assert replayer.run() == 3
+    assert replayer.elapsed >= 0.1
+    assert [t["instrument_token"] for t in ticks] == [1, 2]
+    assert orders == [{"order_id": "1"}]
+
+    # As fast as possible
+    replayer = TickReplayer(path, ticker, speed=None)
+    replayer.run()
+    assert replayer.elapsed < 0.1
+    assert replayer.stats()["frames"] == 3
+    assert len(ticks) == 4
+
+    with pytest.raises(ValueError):
+        TickReplayer(path, ticker, speed=0)
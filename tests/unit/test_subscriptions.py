@@ -0,0 +1,121 @@
+# coding: utf-8
+"""Subscription manager tests"""
+import json
+from mock import Mock
+
+from kiteconnect import KiteTicker
+
+
+def connect(ticker):
+    """Fake an open WebSocket connection."""
+    ws = Mock()
+    ws.state = ws.STATE_OPEN
+    # Autobahn opens the connection before calling `onConnect` and then `onOpen`
+    ticker._on_connect(ws, None)
+    ticker._on_open(ws)
+    return ws
+
+
+def sent_messages(ws):
+    messages = [json.loads(c[0][0].decode("utf-8")) for c in ws.sendMessage.call_args_list]
+    ws.sendMessage.reset_mock()
+    return messages
+
+
+def test_subscriptions_before_connect_are_sent_on_open():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ticker.subscribe([1, 2, 3])
+    ticker.set_mode(ticker.MODE_FULL, [2])
+    ticker.unsubscribe([3])
+
+    ws = connect(ticker)
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2]},
+        {"a": "mode", "v": ["full", [2]]}
+    ]
+    assert ticker.subscribed_tokens == {1: "quote", 2: "full"}
+
+
+def test_subscriptions_in_on_connect_are_sent_once():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+
+    def on_connect(ws, response):
+        ws.subscribe([1, 2])
+        ws.set_mode(ws.MODE_FULL, [1])
+
+    ticker.on_connect = on_connect
+
+    ws = connect(ticker)
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2]},
+        {"a": "mode", "v": ["full", [1]]}
+    ]
+
+    # On reconnects the state is sent again, once
+    ws = connect(ticker)
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2]},
+        {"a": "mode", "v": ["full", [1]]}
+    ]
+
+
+def test_minimal_messages_when_connected():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ws = connect(ticker)
+
+    ticker.subscribe([1, 2])
+    ticker.set_mode(ticker.MODE_LTP, [1, 2])
+    # No change
+    ticker.set_mode(ticker.MODE_LTP, [1])
+    ticker.unsubscribe([5])
+
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2]},
+        {"a": "mode", "v": ["ltp", [1, 2]]}
+    ]
+
+
+def test_window_coalesces_calls():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", subscription_window=0.05)
+    ticker._call_later = scheduled = Mock()
+    ws = connect(ticker)
+
+    for token in range(1, 6):
+        ticker.subscribe([token])
+        ticker.set_mode(ticker.MODE_FULL, [token])
+    ticker.unsubscribe([5])
+
+    assert scheduled.call_count == 1
+    assert sent_messages(ws) == []
+    assert ticker._subscriptions.pending()
+
+    delay, callback = scheduled.call_args[0]
+    assert delay == 0.05
+    callback()
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2, 3, 4]},
+        {"a": "mode", "v": ["full", [1, 2, 3, 4]]}
+    ]
+    assert not ticker._subscriptions.pending()
+
+    # Next change is scheduled again
+    ticker.unsubscribe([4])
+    assert scheduled.call_count == 2
+
+
+def test_resubscribe_burst_in_chunks():
+    ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>")
+    ticker._subscriptions.chunk_size = 2
+
+    ticker.subscribe([1, 2, 3, 4, 5])
+    ticker.set_mode(ticker.MODE_FULL, [4, 5])
+    connect(ticker)
+
+    # Reconnect sends the whole state again, quote mode tokens without a mode message
+    ws = connect(ticker)
+    assert sent_messages(ws) == [
+        {"a": "subscribe", "v": [1, 2]},
+        {"a": "subscribe", "v": [3, 4]},
+        {"a": "subscribe", "v": [5]},
+        {"a": "mode", "v": ["full", [4, 5]]}
+    ]
@@ -5,9 +5,14 @@ import json
 from mock import Mock
 from base64 import b64encode
 from hashlib import sha1
+from datetime import datetime
 
 from autobahn.websocket.protocol import WebSocketProtocol
 
+from kiteconnect import KiteTicker
+
+import utils
+
 
 class TestTicker:
 
@@ -46,3 +51,150 @@ class TestTicker:
         assert protocol.state == protocol.STATE_OPEN
 
         protocol.sendMessage(six.b(json.dumps({"message": "blah"})))
+
+    def test_parse_ltp_packet(self, kiteticker):
+        frame = utils.ticker_frame([utils.ltp_packet(408065, 145025)])
+        ticks = kiteticker._parse_binary(frame)
+
+        assert ticks == [{
+            "tradable": True,
+            "mode": kiteticker.MODE_LTP,
+            "instrument_token": 408065,
+            "last_price": 1450.25
+        }]
+
+    def test_parse_index_packets(self, kiteticker):
+        ts = 1700000000
+        frame = utils.ticker_frame([
+            utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000)),
+            utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000), exchange_timestamp=ts)
+        ])
+        quote, full = kiteticker._parse_binary(frame)
+
+        assert quote["mode"] == kiteticker.MODE_QUOTE
+        assert quote["tradable"] is False
+        assert quote["last_price"] == 19500.0
+        assert quote["ohlc"] == {"high": 19600.0, "low": 19400.0, "open": 19450.0, "close": 19000.0}
+        assert quote["change"] == (19500.0 - 19000.0) * 100 / 19000.0
+        assert "exchange_timestamp" not in quote
+
+        assert full["mode"] == kiteticker.MODE_FULL
+        assert full["exchange_timestamp"] == datetime.fromtimestamp(ts)
+
+    def test_parse_full_packet(self, kiteticker):
+        ts = 1700000000
+        depth = [(10 + i, 145000 - i * 5, i + 1) for i in range(5)] + \
+            [(20 + i, 145030 + i * 5, i + 1) for i in range(5)]
+        frame = utils.ticker_frame([
+            utils.quote_packet(408065, 145025, (144000, 146000, 143500, 0), volume_traded=1000,
+                               total_buy_quantity=50, total_sell_quantity=60, last_trade_time=ts - 1,
+                               oi=7, oi_day_high=9, oi_day_low=5, exchange_timestamp=ts, depth=depth)
+        ])
+        tick, = kiteticker._parse_binary(frame)
+
+        assert tick["mode"] == kiteticker.MODE_FULL
+        assert tick["last_price"] == 1450.25
+        assert tick["average_traded_price"] == 1450.25
+        assert tick["volume_traded"] == 1000
+        assert tick["total_buy_quantity"] == 50
+        assert tick["total_sell_quantity"] == 60
+        assert tick["change"] == 0
+        assert tick["ohlc"] == {"open": 1440.0, "high": 1460.0, "low": 1435.0, "close": 0.0}
+        assert tick["last_trade_time"] == datetime.fromtimestamp(ts - 1)
+        assert tick["exchange_timestamp"] == datetime.fromtimestamp(ts)
+        assert (tick["oi"], tick["oi_day_high"], tick["oi_day_low"]) == (7, 9, 5)
+        assert tick["depth"]["buy"][0] == {"quantity": 10, "price": 1450.0, "orders": 1}
+        assert tick["depth"]["sell"][4] == {"quantity": 24, "price": 1450.5, "orders": 5}
+        assert len(tick["depth"]["buy"]) == len(tick["depth"]["sell"]) == 5
+
+    def test_parse_segment_divisor(self, kiteticker):
+        # Currency derivatives are quoted with 7 decimals
+        tick, = kiteticker._parse_binary(utils.ticker_frame([utils.ltp_packet(0x100003, 825000000)]))
+        assert tick["last_price"] == 82.5
+
+    def test_split_packets(self, kiteticker):
+        frame = utils.ticker_frame([utils.ltp_packet(408065, 1), utils.quote_packet(408065, 1, (1, 1, 1, 1))])
+
+        assert list(kiteticker._split_packets(b"\x00")) == []
+        assert list(kiteticker._split_packets(frame)) == [(4, 8), (14, 44)]
+        assert list(kiteticker._split_packets(memoryview(frame))) == [(4, 8), (14, 44)]
+        # Truncated packets are dropped
+        assert list(kiteticker._split_packets(frame[:-1])) == [(4, 8)]
+
+    def test_parse_binary_buffers(self, kiteticker):
+        frame = utils.ticker_frame([utils.ltp_packet(408065, 145025)])
+        expected = kiteticker._parse_binary(frame)
+
+        assert kiteticker._parse_binary(bytearray(frame)) == expected
+        assert kiteticker._parse_binary(memoryview(frame)) == expected
+
+    def test_token_callbacks(self, kiteticker):
+        frame = utils.ticker_frame([utils.ltp_packet(token, 100) for token in [256265, 408065, 738561, 408065]])
+        received = {}
+
+        def nifty(ws, ticks):
+            received.setdefault("nifty", []).extend(t["instrument_token"] for t in ticks)
+
+        def stocks(ws, ticks):
+            received.setdefault("stocks", []).append([t["instrument_token"] for t in ticks])
+
+        kiteticker.add_tick_callback(nifty, [256265])
+        kiteticker.add_tick_callback(stocks, [408065, 738561])
+        kiteticker._on_message(None, frame, True)
+
+        assert received == {"nifty": [256265], "stocks": [[408065, 738561, 408065]]}
+
+        received.clear()
+        kiteticker.remove_tick_callback(stocks, [738561])
+        kiteticker.remove_tick_callback(nifty)
+        kiteticker._on_message(None, frame, True)
+
+        assert received == {"stocks": [[408065, 408065]]}
+        assert kiteticker._token_callbacks == {408065: [stocks]}
+
+    def test_token_callbacks_skip_packets(self, kiteticker):
+        frame = utils.ticker_frame([utils.ltp_packet(token, 100) for token in [256265, 408065, 738561]])
+        decoded = []
+        parse_packet = kiteticker._parse_packet
+
+        def counting_parse_packet(bin, offset, packet_length):
+            decoded.append(offset)
+            return parse_packet(bin, offset, packet_length)
+
+        kiteticker._parse_packet = counting_parse_packet
+        kiteticker.add_tick_callback(lambda ws, ticks: None, [408065])
+        kiteticker._on_message(None, frame, True)
+        assert len(decoded) == 1
+
+        # All the packets are decoded for `on_ticks` and shared with token callbacks
+        kiteticker.on_ticks = lambda ws, ticks: None
+        kiteticker._on_message(None, frame, True)
+        assert len(decoded) == 4
+
+    def test_raw_timestamps(self):
+        kws = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", raw_timestamps=True)
+        frame = utils.ticker_frame([
+            utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000), exchange_timestamp=1700000000),
+            utils.quote_packet(408065, 145025, (144000, 146000, 143500, 0), last_trade_time=1699999999,
+                               exchange_timestamp=1700000001)
+        ])
+        index, full = kws._parse_binary(frame)
+
+        assert index["exchange_timestamp"] == 1700000000
+        assert full["last_trade_time"] == 1699999999
+        assert full["exchange_timestamp"] == 1700000001
+
+    def test_memoized_timestamps(self, kiteticker):
+        frame = utils.ticker_frame([
+            utils.quote_packet(408065 + (i << 8), 145025, (1, 1, 1, 1), exchange_timestamp=1700000000)
+            for i in range(3)
+        ])
+        ticks = kiteticker._parse_binary(frame)
+
+        assert ticks[0]["exchange_timestamp"] == datetime.fromtimestamp(1700000000)
+        assert ticks[0]["exchange_timestamp"] is ticks[2]["exchange_timestamp"]
+        assert kiteticker._to_datetime(2 ** 40) is None
+
+        for epoch in range(kiteticker._datetime_cache_size + 1):
+            kiteticker._to_datetime(epoch)
+        assert len(kiteticker._datetime_cache) <= kiteticker._datetime_cache_size
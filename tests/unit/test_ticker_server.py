@@ -0,0 +1,124 @@
+# coding: utf-8
+"""Tests of the ticker against the mock ticker server"""
+import time
+import asyncio
+import pytest
+
+from kiteconnect import AsyncKiteTicker
+
+pytest.importorskip("websockets")
+
+from ticker_server import MockTickerServer  # noqa: E402
+
+# NSE equities and NSE indices (segment 9)
+EQUITIES = [408065, 738561]
+INDICES = [256265, 260105]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, 10))
+    finally:
+        loop.close()
+
+
+async def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_all_packet_types():
+    server = MockTickerServer(rate=200, frames_per_second=50).start()
+    ticks = {}
+
+    async def main():
+        kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root=server.root, reconnect=False)
+        kws.on_ticks = lambda ws, received: ticks.update((t["instrument_token"], t) for t in received)
+
+        await kws.connect()
+        kws.subscribe(EQUITIES + INDICES)
+        kws.set_mode(kws.MODE_LTP, [738561])
+        kws.set_mode(kws.MODE_FULL, [408065, 260105])
+
+        # The first ticks can be sent before the mode message
+        await wait_for(lambda: len(ticks) == 4 and ticks[408065]["mode"] == "full" and ticks[260105]["mode"] == "full")
+        ticks.clear()
+        await wait_for(lambda: len(ticks) == 4)
+        await kws.close()
+
+    try:
+        run(main())
+    finally:
+        server.stop()
+
+    assert ticks[738561]["mode"] == "ltp"
+    assert ticks[408065]["mode"] == "full"
+    assert len(ticks[408065]["depth"]["buy"]) == 5
+    assert ticks[256265]["mode"] == "quote"
+    assert ticks[256265]["tradable"] is False
+    assert ticks[260105]["mode"] == "full"
+    assert "exchange_timestamp" in ticks[260105]
+
+
+def test_load_with_mode_mix():
+    server = MockTickerServer(rate=20000, frames_per_second=20,
+                              mode_mix={"ltp": 0.4, "quote": 0.3, "full": 0.3}).start()
+    modes = set()
+    counts = []
+
+    async def main():
+        kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root=server.root, reconnect=False)
+
+        def on_ticks(ws, ticks):
+            counts.append(len(ticks))
+            modes.update(t["mode"] for t in ticks)
+        kws.on_ticks = on_ticks
+
+        await kws.connect()
+        kws.subscribe([(i << 8) | 1 for i in range(1, 501)])
+        await wait_for(lambda: sum(counts) >= 10000)
+        await kws.close()
+
+    try:
+        run(main())
+    finally:
+        server.stop()
+
+    # Server ignores the client's quote mode
+    assert modes == {"ltp", "quote", "full"}
+    assert max(counts) == 1000
+
+
+def test_disconnect_injection():
+    server = MockTickerServer(rate=100, frames_per_second=50).start()
+    reconnects = []
+    ticks = []
+
+    async def main():
+        kws = AsyncKiteTicker("<API-KEY>", "<ACCESS-TOKEN>", root=server.root)
+        kws._initial_delay = 0.01
+        kws.on_ticks = lambda ws, received: ticks.extend(received)
+        kws.on_reconnect = lambda ws, attempts: reconnects.append(attempts)
+
+        await kws.connect()
+        kws.subscribe([408065])
+        kws.set_mode(kws.MODE_LTP, [408065])
+        await wait_for(lambda: ticks)
+
+        server.disconnect()
+        await wait_for(lambda: server.connections == 2 and len(server.received) == 4)
+        del ticks[:]
+        await wait_for(lambda: ticks)
+        await kws.close()
+
+    try:
+        run(main())
+    finally:
+        server.stop()
+
+    assert reconnects == [1]
+    assert server.received[2:] == [{"a": "subscribe", "v": [408065]}, {"a": "mode", "v": ["ltp", [408065]]}]
+    assert ticks[-1]["mode"] == "ltp"
@@ -0,0 +1,135 @@
+# coding: utf-8
+"""Tick object tests"""
+import copy
+import json
+import pickle
+import pytest
+
+from kiteconnect import KiteTicker
+from kiteconnect.ticks import Tick, DepthLevel, LazyDepthTick, LazyDepthDict
+
+import utils
+
+
+@pytest.fixture()
+def object_ticker():
+    return KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format=KiteTicker.TICK_FORMAT_OBJECT)
+
+
+def sample_frame():
+    depth = [(10 + i, 145000 - i * 5, i + 1) for i in range(5)] + [(20 + i, 145030 + i * 5, i + 1) for i in range(5)]
+    return utils.ticker_frame([
+        utils.ltp_packet(408065, 145025),
+        utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000)),
+        utils.index_packet(256265, 1950000, (1960000, 1940000, 1945000, 1900000), exchange_timestamp=1700000000),
+        utils.quote_packet(408065, 145025, (144000, 146000, 143500, 145000)),
+        utils.quote_packet(408065, 145025, (144000, 146000, 143500, 145000), volume_traded=1000,
+                           last_trade_time=1700000000, oi=7, exchange_timestamp=1700000001, depth=depth),
+    ])
+
+
+def test_object_ticks_match_dict_ticks(object_ticker, kiteticker):
+    frame = sample_frame()
+    objects = object_ticker._parse_ticks(frame)
+    dicts = kiteticker._parse_binary(frame)
+
+    assert all(isinstance(t, Tick) for t in objects)
+    assert [t.to_dict() for t in objects] == dicts
+    assert objects == dicts
+
+
+def test_object_tick_access(object_ticker):
+    ltp, _, _, _, full = object_ticker._parse_ticks(sample_frame())
+
+    assert full.last_price == full["last_price"] == 1450.25
+    assert full.ohlc.close == full["ohlc"]["close"] == 1450.0
+    assert full.depth.buy[0].price == full["depth"]["buy"][0]["price"] == 1450.0
+    assert isinstance(full.depth.sell[4], DepthLevel)
+    assert "depth" in full
+
+    # Fields outside the tick's mode
+    assert ltp.ohlc is None
+    assert ltp.get("ohlc") is None
+    assert "ohlc" not in ltp
+    with pytest.raises(KeyError):
+        ltp["ohlc"]
+    with pytest.raises(AttributeError):
+        ltp.unknown_field
+
+    assert json.loads(json.dumps(ltp.to_dict())) == {
+        "tradable": True, "mode": "ltp", "instrument_token": 408065, "last_price": 1450.25}
+
+
+def test_object_ticks_are_slotted(object_ticker):
+    tick = object_ticker._parse_ticks(sample_frame())[-1]
+
+    for obj in [tick, tick.ohlc, tick.depth, tick.depth.buy[0]]:
+        assert not hasattr(obj, "__dict__")
+
+
+@pytest.mark.parametrize("tick_format", [KiteTicker.TICK_FORMAT_DICT, KiteTicker.TICK_FORMAT_OBJECT])
+def test_lazy_depth_ticks_match(kiteticker, tick_format):
+    lazy_ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format=tick_format, lazy_depth=True)
+    frame = sample_frame()
+
+    assert lazy_ticker._parse_ticks(frame) == kiteticker._parse_binary(frame)
+
+
+def test_lazy_depth_dict(kiteticker):
+    lazy_ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", lazy_depth=True)
+    frame = sample_frame()
+    expected = kiteticker._parse_binary(frame)[-1]
+
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    assert isinstance(tick, LazyDepthDict)
+    assert "depth" in tick
+    assert len(tick) == len(expected)
+    assert tick["last_price"] == expected["last_price"]
+    assert dict.get(tick, "depth") is None
+
+    assert tick["depth"] == expected["depth"]
+    assert dict.get(tick, "depth") == expected["depth"]
+
+    # Whole dict reads decode the depth
+    for read in [dict, copy.copy, lambda t: pickle.loads(pickle.dumps(t)), lambda t: dict(t.items())]:
+        tick = lazy_ticker._parse_ticks(frame)[-1]
+        assert read(tick) == expected
+
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    assert json.loads(json.dumps(tick, default=str))["depth"] == expected["depth"]
+
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    assert tick.get("depth") == expected["depth"]
+
+    # Replacing the depth drops the packet reference
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    tick["depth"] = None
+    assert tick["depth"] is None
+
+    # Other keys don't decode the depth
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    assert tick.get("last_price") == expected["last_price"]
+    assert tick.setdefault("mode", None) == "full"
+    assert tick.pop("oi") == expected["oi"]
+    assert tick._frame is not None
+    assert tick.pop("depth") == expected["depth"]
+
+    tick = lazy_ticker._parse_ticks(frame)[-1]
+    tick.update({"depth": None})
+    assert tick._frame is None
+    assert tick["depth"] is None
+
+
+def test_lazy_depth_tick(kiteticker):
+    lazy_ticker = KiteTicker("<API-KEY>", "<ACCESS-TOKEN>", tick_format=KiteTicker.TICK_FORMAT_OBJECT,
+                             lazy_depth=True)
+    tick = lazy_ticker._parse_ticks(sample_frame())[-1]
+
+    assert isinstance(tick, LazyDepthTick)
+    assert "last_price" in tick and "depth" in tick
+    assert tick.get("oi") == 7
+    assert "depth" in tick.keys()
+    assert tick._frame is not None
+    assert tick.depth.buy[0].price == 1450.0
+    assert tick._frame is None
+    assert tick["depth"]["sell"][4]["quantity"] == 24